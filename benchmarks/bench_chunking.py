@@ -0,0 +1,174 @@
+"""
+Benchmark de chunkers: compara el chunker por caracteres (1000/200, el algoritmo anterior) con el chunker
+por oraciones con límite de tokens.
+
+Para cada chunker informa:
+
+- chunks/segundo y páginas/segundo del chunking (sin embeddings).
+- cantidad de chunks y tokens por chunk (promedio, máximo y % que supera la ventana del modelo, es decir,
+  texto que el modelo trunca sin avisar).
+- recall@k de la búsqueda: para cada consulta etiquetada, si alguno de los k chunks más similares contiene
+  la respuesta completa.
+
+Sin `--pdf-dir` usa un corpus sintético de manuales con hechos conocidos (tasa, plazo y monto de cada
+producto) entre párrafos de relleno, y una consulta por hecho. Con `--pdf-dir` y `--queries` (JSONL con
+`query` y `answer`) usa documentos reales.
+
+    python benchmarks/bench_chunking.py --json chunking.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(root, 'vector-tools'))
+sys.path.append(os.path.join(root, 'utils'))
+
+from chunking import create_chunker
+from embedding_engines import create_engine
+
+FILLER = [
+    "Este documento describe el procedimiento vigente para la atención de clientes en el contact center.",
+    "El ejecutivo debe validar la identidad del cliente antes de entregar cualquier información.",
+    "Las condiciones pueden cambiar según la política comercial del banco y la normativa de la CMF.",
+    "Ante dudas, el caso debe derivarse al área de soporte mediante el formulario interno.",
+    "La información de este manual es de uso exclusivo del personal autorizado.",
+    "Los horarios de atención corresponden a días hábiles bancarios, excluyendo festivos.",
+    "Se recomienda revisar el historial de contactos del cliente en el CRM antes de responder.",
+    "Las solicitudes ingresadas fuera de horario se procesan el siguiente día hábil.",
+]
+PRODUCTS = ["Depósito a Plazo", "Cuenta Vista", "Línea de Crédito", "Tarjeta de Crédito", "Crédito Comercial",
+            "Compra de Dólares", "Pago de Línea", "Abonos Masivos", "Botón de Pago", "Boleta de Garantía"]
+
+
+def synthetic_corpus(documents: int, pages: int, seed: int = 0):
+    """Manuales sintéticos: (nombre, [(página, texto)]) y consultas con su respuesta exacta."""
+    rng = random.Random(seed)
+    corpus, queries = [], []
+    for d in range(documents):
+        product = f"{PRODUCTS[d % len(PRODUCTS)]} {d + 1}"
+        facts = [
+            (f"La tasa de interés del {product} es {rng.randint(1, 9)},{rng.randint(10, 99)}% anual.",
+             f"¿Cuál es la tasa de interés del {product}?"),
+            (f"El plazo mínimo del {product} es de {rng.randint(7, 400)} días corridos.",
+             f"¿Cuál es el plazo mínimo del {product}?"),
+            (f"El monto máximo por operación del {product} es de {rng.randint(1, 90) * 1000000:,} pesos.",
+             f"¿Cuál es el monto máximo por operación del {product}?"),
+        ]
+        doc_pages = []
+        for p in range(pages):
+            lines = []
+            for _ in range(rng.randint(12, 20)):
+                lines.append(" ".join(rng.choice(FILLER) for _ in range(rng.randint(1, 3))))
+                if rng.random() < 0.15:
+                    lines.append("")  # línea en blanco entre párrafos
+            doc_pages.append(lines)
+        for fact, query in facts:
+            page = rng.randrange(pages)
+            doc_pages[page].insert(rng.randrange(len(doc_pages[page]) + 1), fact)
+            queries.append({"query": query, "answer": fact})
+        corpus.append((f"manual_{d + 1}.pdf", [(p + 1, "\n".join(lines) + "\n") for p, lines in enumerate(doc_pages)]))
+    return corpus, queries
+
+
+def pdf_corpus(directory: str):
+    from document_utils import iter_pdf_pages
+
+    corpus = []
+    for dirpath, _, files in os.walk(directory):
+        for name in sorted(files):
+            if name.lower().endswith(".pdf"):
+                corpus.append((name, list(iter_pdf_pages(os.path.join(dirpath, name)))))
+    return corpus
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+def bench_chunker(name, chunker, corpus, queries, engine, query_embeddings, ks):
+    pages = sum(len(doc_pages) for _, doc_pages in corpus)
+    start = time.perf_counter()
+    chunks = []
+    for _, doc_pages in corpus:
+        chunks.extend(text for _, text, _ in chunker.chunk_document(iter(doc_pages))[1])
+    seconds = time.perf_counter() - start
+
+    ids = engine.tokenizer(chunks, add_special_tokens=True, verbose=False)["input_ids"]
+    tokens = np.array([len(i) for i in ids])
+    result = {
+        "chunker": name,
+        "chunks": len(chunks),
+        "chunks_per_s": round(len(chunks) / seconds, 1),
+        "pages_per_s": round(pages / seconds, 1),
+        "tokens_mean": round(float(tokens.mean()), 1),
+        "tokens_max": int(tokens.max()),
+        "truncated_pct": round(float((tokens > engine.max_seq_length).mean() * 100), 1),
+    }
+    if query_embeddings is not None:
+        embeddings = engine.encode(chunks, batch_size=64)
+        scores = query_embeddings @ embeddings.T
+        normalized_chunks = [normalize(chunk) for chunk in chunks]
+        for k in ks:
+            top = np.argsort(-scores, axis=1)[:, :k]
+            hits = sum(
+                any(normalize(q["answer"]) in normalized_chunks[i] for i in row)
+                for q, row in zip(queries, top)
+            )
+            result[f"recall@{k}"] = round(hits / len(queries), 3)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de chunkers")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--engine", default=None, help="Motor de embeddings (por defecto EMBEDDING_ENGINE)")
+    parser.add_argument("--pdf-dir", help="Directorio de PDFs reales (por defecto, corpus sintético)")
+    parser.add_argument("--queries", help="JSONL con consultas etiquetadas (`query`, `answer`) para --pdf-dir")
+    parser.add_argument("--documents", type=int, default=20, help="Documentos del corpus sintético")
+    parser.add_argument("--pages", type=int, default=8, help="Páginas por documento del corpus sintético")
+    parser.add_argument("--overlap-tokens", type=int, default=32)
+    parser.add_argument("--k", default="1,5", help="Valores de k para recall@k")
+    parser.add_argument("--no-recall", action="store_true", help="Solo mide el chunking (no genera embeddings)")
+    parser.add_argument("--json", help="Ruta donde guardar los resultados en JSON")
+    args = parser.parse_args()
+
+    engine = create_engine(args.engine, args.model)
+    if args.pdf_dir:
+        corpus = pdf_corpus(args.pdf_dir)
+        queries = []
+        if args.queries:
+            with open(args.queries, encoding="utf-8") as f:
+                queries = [json.loads(line) for line in f if line.strip()]
+    else:
+        corpus, queries = synthetic_corpus(args.documents, args.pages)
+
+    query_embeddings = None
+    if queries and not args.no_recall:
+        query_embeddings = engine.encode([q["query"] for q in queries], batch_size=64)
+    ks = [int(k) for k in args.k.split(",")]
+
+    chunkers = {
+        "chars": create_chunker("chars", chunk_size=1000, overlap=200),
+        "tokens": create_chunker("tokens", tokenizer=engine.tokenizer, max_tokens=engine.max_seq_length,
+                                 overlap_tokens=args.overlap_tokens),
+    }
+    results = []
+    for name, chunker in chunkers.items():
+        result = bench_chunker(name, chunker, corpus, queries, engine, query_embeddings, ks)
+        results.append(result)
+        print(json.dumps(result, ensure_ascii=False))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"model": args.model, "documents": len(corpus), "queries": len(queries),
+                       "results": results}, f, ensure_ascii=False, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark de los motores de embeddings: encodes/segundo y memoria residente (RSS) de cada combinación de
+motor y cuantización. Cada motor se mide en un proceso aparte, para que el RSS de uno no incluya el de otro.
+
+    python benchmarks/bench_embeddings.py --engines torch,torch-int8,onnx,onnx-int8 --threads 2 --json out.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'vector-tools'))
+
+QUERIES = [
+    "¿Cómo compro dólares desde la app?",
+    "Requisitos para un crédito comercial FOGAPE",
+    "Cuál es el horario de transferencias LBTR",
+    "Quiero aumentar mi línea de crédito",
+    "¿Cómo recupero mi clave de acceso?",
+    "Tasas de depósito a plazo",
+    "Cómo configuro el botón de pago en mi tienda",
+    "Pago de línea de crédito atrasado",
+]
+
+
+def rss_mb() -> float:
+    """RSS actual en MB (psutil si está instalado; si no, el máximo del proceso según getrusage)."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1024 ** 2
+    except ImportError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def bench_engine(spec: str, model_name: str, threads: int, texts: int, batch_size: int, single: int) -> dict:
+    from embedding_engines import create_engine
+
+    engine_name, _, quantize = spec.partition("-")
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    engine = create_engine(engine_name, model_name, quantize or "none", threads)
+    load_seconds = time.perf_counter() - start
+    engine.encode(QUERIES[:2])  # la primera inferencia incluye inicializaciones perezosas
+
+    corpus = [QUERIES[i % len(QUERIES)] + f" ({i})" for i in range(texts)]
+    start = time.perf_counter()
+    engine.encode(corpus, batch_size=batch_size)
+    batch_seconds = time.perf_counter() - start
+
+    latencies = []
+    for i in range(single):
+        start = time.perf_counter()
+        engine.encode(QUERIES[i % len(QUERIES)])
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+
+    return {
+        "engine": spec,
+        "threads": threads,
+        "load_s": round(load_seconds, 2),
+        "batch_encodes_per_s": round(texts / batch_seconds, 1),
+        "single_encodes_per_s": round(single / sum(latencies), 1),
+        "single_p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "single_p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 2),
+        "rss_mb": round(rss_mb(), 1),
+        "rss_model_mb": round(rss_mb() - rss_before, 1),
+    }
+
+
+def _worker(args, queue):
+    try:
+        queue.put(bench_engine(*args))
+    except Exception as e:
+        queue.put({"engine": args[0], "error": str(e)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de motores de embeddings")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--engines", default="torch,torch-int8,onnx,onnx-int8",
+                        help="Motores separados por coma: torch, torch-int8, onnx, onnx-int8")
+    parser.add_argument("--threads", type=int, default=0, help="Threads de inferencia (0 = valor por defecto)")
+    parser.add_argument("--texts", type=int, default=512, help="Textos del benchmark por lotes")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--single", type=int, default=200, help="Consultas sueltas para medir latencia")
+    parser.add_argument("--json", help="Ruta donde guardar los resultados en JSON")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for spec in args.engines.split(","):
+        queue = context.Queue()
+        process = context.Process(target=_worker, args=(
+            (spec.strip(), args.model, args.threads, args.texts, args.batch_size, args.single), queue))
+        process.start()
+        result = queue.get()
+        process.join()
+        results.append(result)
+        print(json.dumps(result, ensure_ascii=False))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"model": args.model, "results": results}, f, ensure_ascii=False, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Benchmark de throughput de la ingesta: corre el pipeline de `process_docs.py` (descarga, `extract_chunks` en el
+pool de procesos y `generate_embeddings` por lotes) sobre un conjunto de PDFs locales, con un sink en memoria
+en lugar de los inserts en Supabase.
+
+Informa:
+
+- páginas/segundo, chunks/segundo y embeddings/segundo del pipeline completo.
+- RSS máximo del proceso principal y de los procesos de extracción.
+- tiempo por etapa del `StageTimer` (`download`, `extract:<formato>`, `embed`, `write`). La extracción se mide
+  dentro de los procesos hijos, así que con varios workers puede sumar más que el tiempo total.
+
+Sin `--pdf-dir` genera PDFs sintéticos de distintos tamaños (`--sizes`, páginas por documento, `--copies`
+documentos de cada tamaño). Con `--pdf-dir` usa los PDFs de ese directorio.
+
+process_docs.py exige credenciales de Supabase al importarse; si no están definidas se usan valores de
+relleno, ya que el sink en memoria nunca llama a Supabase. No usa red si `--model` es una ruta local o un
+modelo que ya está en la caché de sentence-transformers.
+
+    python benchmarks/bench_ingestion.py --sizes 1,10,50 --copies 4 --extract-workers 2 --json ingestion.json
+    python benchmarks/bench_ingestion.py --pdf-dir documents/ --engine onnx
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from functools import partial
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(root, 'vector-tools'))
+
+# Sin tildes: el PDF mínimo usa la codificación estándar de Helvetica
+SENTENCES = [
+    "El ejecutivo debe validar la identidad del cliente antes de entregar informacion de sus productos.",
+    "La tasa del deposito a plazo se mantiene fija durante todo el periodo pactado.",
+    "Las transferencias LBTR se procesan en linea durante el horario bancario.",
+    "El cliente puede solicitar el aumento de su linea de credito desde la aplicacion movil.",
+    "Ante dudas, el caso debe derivarse al area de soporte mediante el formulario interno.",
+    "La tarjeta de credito permite pagar en cuotas sin interes en comercios adheridos.",
+    "Los creditos con garantia FOGAPE requieren la evaluacion comercial de la empresa.",
+    "El boton de pago se configura desde el portal de empresas con las credenciales del administrador.",
+]
+LINES_PER_PAGE = 48
+
+
+def write_pdf(path, pages):
+    """Escribe un PDF mínimo con una línea de texto (Helvetica) por elemento de `lines` de cada página."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        commands = ["BT", "/F1 10 Tf", "14 TL", "50 780 Td"]
+        for line in lines:
+            escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            commands.append(f"({escaped}) Tj T*")
+        commands.append("ET")
+        stream = "\n".join(commands).encode("latin-1")
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n".encode("latin-1") + stream + b"\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    data = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(data))
+        body = obj if isinstance(obj, bytes) else obj.encode("latin-1")
+        data += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(data)
+    data += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        data += f"{offset:010d} 00000 n \n".encode()
+    data += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def synthetic_pdfs(directory, sizes, copies, seed=0):
+    """Genera `copies` PDFs de cada tamaño de `sizes` (páginas) y devuelve los archivos con sus páginas."""
+    rng = random.Random(seed)
+    files = []
+    for size in sizes:
+        for copy in range(copies):
+            name = f"manual_{size}p_{copy + 1}.pdf"
+            path = os.path.join(directory, name)
+            write_pdf(path, [[f"Pagina {page + 1}. {rng.choice(SENTENCES)}"] +
+                             [rng.choice(SENTENCES) for _ in range(LINES_PER_PAGE - 1)]
+                             for page in range(size)])
+            files.append({"id": name, "name": name, "path": path, "pages": size})
+    return files
+
+
+def pdf_files(directory):
+    """PDFs de `directory` (recursivo) con su cantidad de páginas."""
+    import PyPDF2
+
+    files = []
+    for dirpath, _, names in os.walk(directory):
+        for name in sorted(names):
+            if name.lower().endswith(".pdf"):
+                path = os.path.join(dirpath, name)
+                try:
+                    pages = len(PyPDF2.PdfReader(path).pages)
+                except Exception:
+                    pages = 0
+                files.append({"id": path, "name": name, "path": path, "pages": pages})
+    return files
+
+
+class MemorySink:
+    """Reemplazo de `insert_documents`: cuenta las filas y embeddings recibidos sin guardarlos."""
+
+    def __init__(self):
+        self.rows = 0
+        self.embeddings = 0
+
+    def write(self, rows):
+        self.rows += len(rows)
+        self.embeddings += sum(1 for row in rows if row["embedding"])
+        return rows
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF) -> float:
+    """RSS máximo en MB según getrusage (en Linux `ru_maxrss` está en KB)."""
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de throughput de la ingesta")
+    parser.add_argument("--pdf-dir", help="Directorio de PDFs reales (por defecto, PDFs sintéticos)")
+    parser.add_argument("--sizes", default="1,5,20,50", help="Páginas de los PDFs sintéticos, separadas por coma")
+    parser.add_argument("--copies", type=int, default=2, help="PDFs sintéticos de cada tamaño")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="Modelo o ruta local de sentence-transformers")
+    parser.add_argument("--engine", help="Motor de embeddings (por defecto, EMBEDDING_ENGINE)")
+    parser.add_argument("--chunker", help="Chunker: tokens o chars (por defecto, CHUNKER)")
+    parser.add_argument("--extract-workers", type=int, help="Procesos de extracción (por defecto, EXTRACT_WORKERS)")
+    parser.add_argument("--batch-size", type=int, help="Chunks por lote de embeddings (por defecto, EMBEDDING_BATCH_SIZE)")
+    parser.add_argument("--json", help="Ruta donde guardar los resultados en JSON")
+    args = parser.parse_args()
+
+    # process_docs lee la configuración al importarse
+    os.environ.setdefault("SUPABASE_URL", "http://localhost")
+    os.environ.setdefault("SUPABASE_KEY", "bench")
+    os.environ["EMBEDDING_MODEL_NAME"] = args.model
+    if args.engine:
+        os.environ["EMBEDDING_ENGINE"] = args.engine
+    if args.chunker:
+        os.environ["CHUNKER"] = args.chunker
+
+    start = time.perf_counter()
+    import process_docs
+    from ingest_pipeline import IngestPipeline
+    from stage_timer import StageTimer
+    load_seconds = time.perf_counter() - start
+    # La primera inferencia incluye inicializaciones perezosas
+    process_docs.generate_embeddings(SENTENCES[:2])
+
+    extract_workers = process_docs.EXTRACT_WORKERS if args.extract_workers is None else args.extract_workers
+    batch_size = args.batch_size or process_docs.EMBEDDING_BATCH_SIZE
+
+    workdir = None
+    if args.pdf_dir:
+        files = pdf_files(args.pdf_dir)
+    else:
+        workdir = tempfile.mkdtemp(prefix="bench_ingestion_")
+        files = synthetic_pdfs(workdir, [int(size) for size in args.sizes.split(",")], args.copies)
+
+    sink = MemorySink()
+    timer = StageTimer()
+    pipeline = IngestPipeline(
+        download=lambda file: file["path"],
+        extract=partial(process_docs.extract_chunks, chunker=process_docs.text_chunker),
+        embed=lambda texts: process_docs.generate_embeddings(texts, batch_size),
+        write=sink.write,
+        extract_format=lambda job: process_docs.file_format(path=job.file["path"]),
+        download_workers=process_docs.DOWNLOAD_WORKERS,
+        extract_workers=extract_workers,
+        batch_size=batch_size,
+        queue_size=process_docs.PIPELINE_QUEUE_SIZE,
+        cleanup=False,
+        timer=timer,
+    )
+    try:
+        start = time.perf_counter()
+        stats = pipeline.run(files)
+        seconds = time.perf_counter() - start
+    finally:
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    pages = sum(file["pages"] for file in files)
+    result = {
+        "model": args.model,
+        "engine": os.getenv("EMBEDDING_ENGINE", "torch"),
+        "chunker": process_docs.CHUNKER,
+        "extract_workers": extract_workers,
+        "batch_size": batch_size,
+        "files": stats["files"],
+        "failed": stats["failed"],
+        "pages": pages,
+        "chunks": stats["chunks"],
+        "embeddings": sink.embeddings,
+        "load_s": round(load_seconds, 2),
+        "seconds": round(seconds, 2),
+        "pages_per_s": round(pages / seconds, 1),
+        "chunks_per_s": round(stats["chunks"] / seconds, 1),
+        "embeddings_per_s": round(sink.embeddings / seconds, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "peak_rss_workers_mb": round(peak_rss_mb(resource.RUSAGE_CHILDREN), 1),
+        "stages": {
+            stage: {"seconds": round(values["seconds"], 3), "calls": values["calls"], "items": values["items"]}
+            for stage, values in timer.summary().items()
+        },
+    }
+    print(json.dumps(result, ensure_ascii=False, indent=1))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=1)
+
+
+if __name__ == "__main__":
+    main()
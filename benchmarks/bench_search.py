@@ -0,0 +1,294 @@
+"""
+Benchmark y prueba de carga de la búsqueda, sin red: reemplaza Supabase por una réplica en memoria de las
+RPC `match_documents` / `match_documents_by_category` (similitud coseno exacta, mismo umbral y orden que
+pgvector) con una latencia de red simulada configurable.
+
+Usa un corpus sintético con un hecho por producto y tema (tasa, plazo, monto, horario, requisitos) repartido
+entre chunks de relleno, y una consulta etiquetada por hecho. Informa:
+
+- latencia p50/p95/p99 y QPS de la herramienta de búsqueda con `--concurrency` llamadas simultáneas.
+- recall@k del backend: si el chunk con el hecho está entre los k primeros resultados de su categoría.
+
+Los resultados se guardan en JSON con `--json` para comparar contra una corrida anterior.
+
+    python benchmarks/bench_search.py --target tool-async --concurrency 16 --rpc-latency-ms 20 --json search.json
+
+Objetivos (`--target`): `tool-async` (`search_documents_tool_async`, la que registra el agente), `tool`
+(`search_documents_tool`), `buscar` y `buscar-async` (`get_vector_docs` sin el agente ni sus cachés).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(root, 'vector-tools'))
+sys.path.append(os.path.join(root, 'chatbot-contact-center'))
+
+from productos_bancarios import PRODUCTOS_BANCARIOS
+
+FILLER = [
+    "Este procedimiento aplica a todos los ejecutivos del contact center.",
+    "Antes de entregar información se debe validar la identidad del cliente.",
+    "Las condiciones pueden cambiar según la política comercial vigente.",
+    "Ante dudas, el caso se deriva a la mesa de soporte mediante el formulario interno.",
+    "Las solicitudes ingresadas fuera de horario se procesan el siguiente día hábil.",
+    "Se recomienda revisar el historial de contactos del cliente en el CRM.",
+    "La información de este manual es de uso exclusivo del personal autorizado.",
+    "Toda excepción debe quedar registrada con el número de caso correspondiente.",
+]
+
+# (tema, hecho, consulta, generador del valor)
+TOPICS = [
+    ("tasa", "La tasa de interés de {p} es de {v}% anual.", "¿Cuál es la tasa de interés de {p}?",
+     lambda rng: f"{rng.randint(1, 9)},{rng.randint(10, 99)}"),
+    ("plazo", "La solicitud de {p} se tramita en un plazo de {v} días hábiles.",
+     "¿Cuánto demora la tramitación de {p}?", lambda rng: rng.randint(2, 30)),
+    ("monto", "El monto máximo por operación en {p} es de {v} pesos.",
+     "¿Cuál es el monto máximo por operación en {p}?", lambda rng: f"{rng.randint(1, 90) * 1000000:,}"),
+    ("horario", "El horario de atención para {p} es de {v} horas, de lunes a viernes.",
+     "¿En qué horario se atiende {p}?", lambda rng: f"{rng.randint(8, 10)}:00 a {rng.randint(14, 18)}:00"),
+    ("requisitos", "Para contratar {p} el cliente debe presentar {v}.",
+     "¿Qué documentos se necesitan para contratar {p}?",
+     lambda rng: rng.choice(["cédula de identidad vigente", "las últimas tres liquidaciones de sueldo",
+                             "la carpeta tributaria", "un certificado de cotizaciones"])),
+]
+
+
+def synthetic_corpus(docs_per_product: int, chunks_per_doc: int, seed: int = 0):
+    """Filas de la tabla `documents` (sin embeddings) y consultas etiquetadas con el id del chunk esperado."""
+    rng = random.Random(seed)
+    rows, queries = [], []
+    for product in PRODUCTOS_BANCARIOS:
+        slots = [(d, c) for d in range(docs_per_product) for c in range(chunks_per_doc)]
+        facts = dict(zip(rng.sample(slots, min(len(TOPICS), len(slots))), TOPICS))
+        for d in range(docs_per_product):
+            source = f"{product} - manual {d + 1}.pdf"
+            for c in range(chunks_per_doc):
+                sentences = [rng.choice(FILLER) for _ in range(rng.randint(6, 10))]
+                fact = facts.get((d, c))
+                if fact:
+                    topic, template, question, value = fact
+                    sentences.insert(rng.randrange(len(sentences) + 1), template.format(p=product, v=value(rng)))
+                    queries.append({"producto": product, "consulta": question.format(p=product), "topic": topic,
+                                    "expected_id": len(rows)})
+                rows.append({
+                    "id": len(rows),
+                    "content": " ".join(sentences),
+                    "metadata": {"source": source, "chunk_index": c, "category": product},
+                })
+    return rows, queries
+
+
+class FakeSupabaseRpc:
+    """
+    Réplica en memoria de las RPC de Supabase: `1 - (embedding <=> query) > match_threshold`, ordenado por
+    similitud y limitado a `match_count`, filtrando por `metadata->>'category'` en la versión por categoría.
+    Cada llamada espera `latency_ms` para simular la red.
+    """
+
+    name = "supabase-fake"
+
+    def __init__(self, rows, embeddings: np.ndarray, latency_ms: float = 0.0):
+        self.rows = rows
+        self.embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        self.categories = np.array([row["metadata"]["category"] for row in rows])
+        self.latency = latency_ms / 1000
+        self.calls = 0
+
+    def _rpc(self, query_embedding, match_threshold, match_count, category=None):
+        self.calls += 1
+        query = np.asarray(query_embedding, dtype=np.float32)
+        similarities = self.embeddings @ (query / np.linalg.norm(query))
+        mask = similarities > match_threshold
+        if category:
+            mask &= self.categories == category
+        candidates = np.flatnonzero(mask)
+        candidates = candidates[np.argsort(-similarities[candidates], kind="stable")][:match_count]
+        return [{**self.rows[i], "similarity": float(similarities[i])} for i in candidates]
+
+    def match(self, query_embedding, match_threshold, match_count, category=None, query_text=None):
+        time.sleep(self.latency)
+        return self._rpc(query_embedding, match_threshold, match_count, category)
+
+    async def amatch(self, query_embedding, match_threshold, match_count, category=None, query_text=None):
+        await asyncio.sleep(self.latency)
+        return self._rpc(query_embedding, match_threshold, match_count, category)
+
+
+def percentile(values, q: float) -> float:
+    """Percentil por rango más cercano de valores ya ordenados."""
+    return values[min(len(values) - 1, max(0, int(np.ceil(q / 100 * len(values))) - 1))]
+
+
+def make_target(name: str, result_cache: bool):
+    """Devuelve (función, es_async) que recibe (producto, consulta)."""
+    if name in ("tool", "tool-async"):
+        import search_tools
+        from result_cache import SemanticResultCache
+
+        # Sin la versión del índice en Supabase; sin caché de resultados salvo que se pida (umbral inalcanzable)
+        search_tools.result_cache = SemanticResultCache(threshold=0.95 if result_cache else 2.0, version_provider=None)
+        if name == "tool":
+            return search_tools.search_documents_tool, False
+        return search_tools.search_documents_tool_async, True
+
+    import get_vector_docs
+
+    def params(producto, consulta):
+        return {"consulta": f"{producto}: {consulta}", "numero_resultados": 5, "umbral_similitud": 0.1,
+                "categoria": producto}
+
+    if name == "buscar":
+        return (lambda producto, consulta: get_vector_docs.buscar_documentos(params(producto, consulta))), False
+    if name == "buscar-async":
+        return (lambda producto, consulta: get_vector_docs.buscar_documentos_async(params(producto, consulta))), True
+    raise ValueError(f"Objetivo desconocido: {name}")
+
+
+def run_load(function, is_async: bool, calls, concurrency: int):
+    """Ejecuta las llamadas con `concurrency` simultáneas; devuelve latencias (s), segundos totales y errores."""
+    latencies, errors = [], 0
+
+    def is_error(result) -> bool:
+        return isinstance(result, str) and result.startswith("Lo siento, tuve un problema")
+
+    if is_async:
+        async def _run():
+            nonlocal errors
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def _one(producto, consulta):
+                nonlocal errors
+                async with semaphore:
+                    start = time.perf_counter()
+                    try:
+                        errors += is_error(await function(producto, consulta))
+                    except Exception:
+                        errors += 1
+                    latencies.append(time.perf_counter() - start)
+
+            await asyncio.gather(*(_one(q["producto"], q["consulta"]) for q in calls))
+
+        start = time.perf_counter()
+        asyncio.run(_run())
+    else:
+        def _one(q):
+            start = time.perf_counter()
+            try:
+                error = is_error(function(q["producto"], q["consulta"]))
+            except Exception:
+                error = True
+            return time.perf_counter() - start, error
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for latency, error in executor.map(_one, calls):
+                latencies.append(latency)
+                errors += error
+    return sorted(latencies), time.perf_counter() - start, errors
+
+
+def recall_at_k(backend, embed, queries, ks):
+    top = max(ks)
+    hits = {k: 0 for k in ks}
+    for q in queries:
+        rows = backend.match(embed(f"{q['producto']}: {q['consulta']}"), 0.1, top, category=q["producto"])
+        ids = [row["id"] for row in rows]
+        for k in ks:
+            hits[k] += q["expected_id"] in ids[:k]
+    return {f"recall@{k}": round(hits[k] / len(queries), 3) for k in ks}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de búsqueda con Supabase simulado en memoria")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--engine", default=None, help="Motor de embeddings (por defecto EMBEDDING_ENGINE)")
+    parser.add_argument("--target", default="tool-async", choices=["tool-async", "tool", "buscar", "buscar-async"])
+    parser.add_argument("--backend", default="fake-rpc", choices=["fake-rpc", "local"],
+                        help="fake-rpc: réplica de las RPC de Supabase; local: LocalBackend sobre un snapshot")
+    parser.add_argument("--docs-per-product", type=int, default=3)
+    parser.add_argument("--chunks-per-doc", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=3, help="Veces que se repite el set de consultas")
+    parser.add_argument("--rpc-latency-ms", type=float, default=20.0, help="Latencia simulada de cada RPC")
+    parser.add_argument("--result-cache", action="store_true", help="Habilita la caché de resultados del agente")
+    parser.add_argument("--k", default="1,3,5", help="Valores de k para recall@k")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Ruta donde guardar los resultados en JSON")
+    args = parser.parse_args()
+
+    import get_vector_docs
+    from embedding_engines import create_engine
+    from retrieval_backends import LocalBackend, set_retrieval_backend
+
+    engine = create_engine(args.engine, args.model)
+    # El mismo motor para el corpus y las consultas, aunque --model no sea el modelo por defecto
+    get_vector_docs._model = engine
+
+    rows, queries = synthetic_corpus(args.docs_per_product, args.chunks_per_doc, args.seed)
+    start = time.perf_counter()
+    embeddings = engine.encode([row["content"] for row in rows], batch_size=64)
+    corpus_seconds = time.perf_counter() - start
+
+    if args.backend == "local":
+        import tempfile
+        from vector_snapshot import write_snapshot_rows
+
+        snapshot_dir = tempfile.mkdtemp(prefix="bench_search_")
+        write_snapshot_rows(snapshot_dir, [{**row, "embedding": e} for row, e in zip(rows, embeddings)])
+        backend = LocalBackend.from_path(snapshot_dir)
+    else:
+        backend = FakeSupabaseRpc(rows, embeddings, args.rpc_latency_ms)
+    set_retrieval_backend(backend)
+
+    ks = [int(k) for k in args.k.split(",")]
+    recall = recall_at_k(backend, get_vector_docs.embed_query, queries, ks)
+
+    function, is_async = make_target(args.target, args.result_cache)
+    calls = [q for _ in range(args.rounds) for q in queries]
+    random.Random(args.seed).shuffle(calls)
+    run_load(function, is_async, calls[:args.concurrency], args.concurrency)  # warmup de threads y conexiones
+    get_vector_docs.query_cache.clear()
+    latencies, seconds, errors = run_load(function, is_async, calls, args.concurrency)
+
+    result = {
+        "target": args.target,
+        "backend": backend.name,
+        "model": args.model,
+        "engine": engine.name,
+        "chunks": len(rows),
+        "queries": len(queries),
+        "calls": len(calls),
+        "concurrency": args.concurrency,
+        "rpc_latency_ms": args.rpc_latency_ms if args.backend == "fake-rpc" else None,
+        "result_cache": args.result_cache,
+        "corpus_embed_s": round(corpus_seconds, 2),
+        "qps": round(len(calls) / seconds, 1),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p95": round(percentile(latencies, 95) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+            "mean": round(float(np.mean(latencies)) * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2),
+        },
+        "errors": errors,
+        **recall,
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+    }
+    print(json.dumps(result, ensure_ascii=False, indent=1))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=1)
+
+
+if __name__ == "__main__":
+    main()
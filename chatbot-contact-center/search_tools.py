@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import os
+import sys
+
+# Agregar la ruta del directorio vector-tools al path para poder importar get_vector_docs
+vector_tools_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'vector-tools')
+if vector_tools_path not in sys.path:
+    sys.path.append(vector_tools_path)
+
+# Importar la función buscar_documentos desde get_vector_docs
+from get_vector_docs import (
+    buscar_documentos, buscar_documentos_async, buscar_documentos_multiples_async, embed_query, aembed_query,
+    SEARCH_TIMEOUT
+)
+from result_cache import SemanticResultCache
+from product_resolver import ProductResolver
+from productos_bancarios import ALIAS_PRODUCTOS, PRODUCTOS_BANCARIOS
+from index_state import get_index_version
+from instrumentation import log_event
+
+# Caché de resultados por (producto, consulta): reutiliza la respuesta de consultas casi idénticas
+# hasta que expira o hasta que process_docs.py publica una nueva versión del índice
+result_cache = SemanticResultCache(
+    threshold=float(os.getenv("RESULT_CACHE_THRESHOLD", "0.95")),
+    ttl=float(os.getenv("RESULT_CACHE_TTL", "600")),
+    max_entries_per_category=int(os.getenv("RESULT_CACHE_SIZE", "256")),
+    version_provider=get_index_version,
+    version_check_interval=float(os.getenv("RESULT_CACHE_VERSION_CHECK", "30")),
+)
+
+# Categorías de la metadata (carpetas de Drive por producto) y sus alias. El resolver se construye una vez
+# al importar el agente
+product_resolver = ProductResolver(
+    PRODUCTOS_BANCARIOS,
+    ALIAS_PRODUCTOS,
+    embed=embed_query,
+    min_score=float(os.getenv("PRODUCT_MIN_SCORE", "0.5")),
+    embedding_min_score=float(os.getenv("PRODUCT_EMBEDDING_MIN_SCORE", "0.3")),
+    ambiguity_margin=float(os.getenv("PRODUCT_AMBIGUITY_MARGIN", "0.05")),
+)
+
+def normalizar_producto(producto: str, query_embedding: list = None):
+    """
+    Normaliza el nombre del producto a una de las categorías de metadata (claves de PRODUCTOS_BANCARIOS).
+    Si el nombre no coincide con ninguna categoría ni alias, usa el embedding de la consulta. Si es ambiguo
+    (p. ej. "credito") devuelve None y la búsqueda no filtra por categoría.
+    """
+    if producto:
+        return product_resolver.best(producto, query_embedding)
+    return None
+
+def _params_busqueda(consulta_combinada: str, query_embedding: list, producto_normalizado) -> dict:
+    return {
+        "consulta": consulta_combinada,
+        "query_embedding": query_embedding,
+        "numero_resultados": 5,  # Puedes ajustar este valor según sea necesario
+        "umbral_similitud": 0.1,  # Puedes ajustar este valor según sea necesario
+        "categoria": producto_normalizado  # Filtrar por categoría de producto si es posible
+    }
+
+def _mensaje_sin_resultados(producto: str, consulta: str) -> str:
+    return f"No encontré información específica sobre '{consulta}' para el producto '{producto}'. Por favor, intenta reformular tu pregunta o consulta sobre otro producto."
+
+MENSAJE_ERROR_BUSQUEDA = "Lo siento, tuve un problema al buscar información relevante. Por favor, intenta de nuevo con otra consulta."
+
+def search_documents_tool(producto: str, consulta: str) -> str:
+    """
+    Busca documentos relevantes sobre el producto bancario utilizando la búsqueda vectorial en Supabase.
+    """
+    # Crear una consulta combinada que incluya el nombre del producto y la consulta específica
+    consulta_combinada = f"{producto}: {consulta}" if producto else consulta
+    
+    try:
+        query_embedding = embed_query(consulta_combinada)
+        # Normalizar el nombre del producto para filtrar por la categoría de metadata correspondiente
+        producto_normalizado = normalizar_producto(producto, query_embedding)
+        
+        # Reutilizar el resultado de una consulta casi idéntica sobre el mismo producto
+        cached = result_cache.get(producto_normalizado, query_embedding)
+        if cached is not None:
+            return cached
+        
+        # Realizar la búsqueda vectorial con la función buscar_documentos importada desde get_vector_docs
+        resultados = buscar_documentos(_params_busqueda(consulta_combinada, query_embedding, producto_normalizado))
+        
+        if resultados.startswith("No se encontraron documentos"):
+            # Si no se encuentran documentos relevantes, informar al usuario
+            return _mensaje_sin_resultados(producto, consulta)
+        
+        result_cache.put(producto_normalizado, query_embedding, resultados)
+        return resultados
+    except Exception as e:
+        # Manejar cualquier error que pueda ocurrir durante la búsqueda
+        log_event("search_tool_error", logging.ERROR, producto=producto, consulta=consulta, error=str(e))
+        return MENSAJE_ERROR_BUSQUEDA
+
+async def search_documents_tool_async(producto: str, consulta: str) -> str:
+    """
+    Busca documentos relevantes sobre el producto bancario utilizando la búsqueda vectorial en Supabase.
+    """
+    # Versión asíncrona de search_documents_tool: ni el embedding ni la llamada a Supabase bloquean el event
+    # loop, así que varias sesiones concurrentes en el mismo worker no se esperan entre sí
+    consulta_combinada = f"{producto}: {consulta}" if producto else consulta
+    
+    try:
+        query_embedding = await asyncio.wait_for(aembed_query(consulta_combinada), timeout=SEARCH_TIMEOUT)
+        # El primer uso del respaldo por embeddings calcula los centroides de las categorías: fuera del event loop
+        producto_normalizado = await asyncio.to_thread(normalizar_producto, producto, query_embedding)
+        # La caché puede consultar la versión del índice en Supabase: se ejecuta fuera del event loop
+        cached = await asyncio.to_thread(result_cache.get, producto_normalizado, query_embedding)
+        if cached is not None:
+            return cached
+        
+        resultados = await buscar_documentos_async(
+            _params_busqueda(consulta_combinada, query_embedding, producto_normalizado))
+        
+        if resultados.startswith("No se encontraron documentos"):
+            return _mensaje_sin_resultados(producto, consulta)
+        
+        result_cache.put(producto_normalizado, query_embedding, resultados)
+        return resultados
+    except asyncio.TimeoutError:
+        log_event("search_tool_timeout", logging.WARNING, producto=producto, consulta=consulta)
+        return MENSAJE_ERROR_BUSQUEDA
+    except Exception as e:
+        log_event("search_tool_error", logging.ERROR, producto=producto, consulta=consulta, error=str(e))
+        return MENSAJE_ERROR_BUSQUEDA
+
+async def search_multiple_products_tool(productos: list[str], consulta: str) -> str:
+    """
+    Busca documentos relevantes sobre varios productos bancarios a la vez y devuelve un solo resultado combinado.
+    Úsala cuando la pregunta involucra más de un producto.
+    """
+    # Una búsqueda por producto, todas en paralelo: los embeddings entran en el mismo lote del micro-batcher
+    # y las consultas por categoría al backend se ejecutan concurrentemente
+    productos = [producto for producto in dict.fromkeys(productos or []) if producto]
+    if len(productos) < 2:
+        return await search_documents_tool_async(productos[0] if productos else "", consulta)
+    consultas = [f"{producto}: {consulta}" for producto in productos]
+    
+    try:
+        embeddings = await asyncio.wait_for(
+            asyncio.gather(*(aembed_query(consulta_combinada) for consulta_combinada in consultas)),
+            timeout=SEARCH_TIMEOUT)
+        categorias = await asyncio.gather(*(
+            asyncio.to_thread(normalizar_producto, producto, embedding)
+            for producto, embedding in zip(productos, embeddings)))
+        # Productos que resuelven a la misma categoría comparten una sola búsqueda; los que no resuelven a
+        # ninguna (desconocidos o ambiguos) buscan cada uno su propia consulta sin filtro de categoría
+        busquedas = {}
+        sin_categoria = []
+        for consulta_combinada, embedding, categoria in zip(consultas, embeddings, categorias):
+            params = _params_busqueda(consulta_combinada, embedding, categoria)
+            if categoria is None:
+                sin_categoria.append(params)
+            else:
+                busquedas.setdefault(categoria, params)
+        
+        resultados = await buscar_documentos_multiples_async(list(busquedas.values()) + sin_categoria)
+        
+        if resultados.startswith("No se encontraron documentos"):
+            return _mensaje_sin_resultados(", ".join(productos), consulta)
+        return resultados
+    except asyncio.TimeoutError:
+        log_event("search_tool_timeout", logging.WARNING, productos=productos, consulta=consulta)
+        return MENSAJE_ERROR_BUSQUEDA
+    except Exception as e:
+        log_event("search_tool_error", logging.ERROR, productos=productos, consulta=consulta, error=str(e))
+        return MENSAJE_ERROR_BUSQUEDA
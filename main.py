@@ -1,11 +1,29 @@
+import time
+
+_start = time.perf_counter()
+
 import os
+import sys
+import logging
 import uvicorn
 from fastapi import FastAPI
 from google.adk.cli.fast_api import get_fast_api_app
 
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
 # Get the directory where main.py is located
 AGENT_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# Importar la búsqueda sin cargar todavía el modelo de embeddings (se carga en el warmup de fondo)
+sys.path.append(os.path.join(AGENT_DIR, "vector-tools"))
+sys.path.append(os.path.join(AGENT_DIR, "utils"))
+import get_vector_docs
+import instrumentation
+from service_routes import add_service_routes
+
+_imports_done = time.perf_counter()
+
 # Example session DB URL (e.g., SQLite)
 SESSION_DB_URL = "sqlite:///./sessions.db"
 
@@ -24,6 +42,23 @@ app: FastAPI = get_fast_api_app(
     web=SERVE_WEB_INTERFACE,
 )
 
+_app_done = time.perf_counter()
+
+
+# /ready y /metrics (delante de la interfaz web que ADK monta en "/")
+add_service_routes(app, get_vector_docs.readiness, instrumentation.registry.render)
+
+
+# El modelo se carga en un thread de fondo mientras uvicorn abre el puerto; /ready indica cuándo terminó
+if os.getenv("WARMUP_ON_START", "true").lower() in ("1", "true", "yes"):
+    get_vector_docs.start_warmup()
+
+logger.info(
+    f"Arranque: imports {(_imports_done - _start) * 1000:.0f} ms, "
+    f"get_fast_api_app {(_app_done - _imports_done) * 1000:.0f} ms, "
+    f"total {(time.perf_counter() - _start) * 1000:.0f} ms (el warmup de búsqueda sigue en segundo plano)"
+)
+
 if __name__ == "__main__":
     # Use the PORT environment variable provided by Cloud Run, defaulting to 8080
-    uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", 8080))) 
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", 8080)))
@@ -0,0 +1,102 @@
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'vector-tools'))
+
+from index_registry import ACTIVE, RETIRED
+
+
+def column_value(row, column):
+    """Valor de una columna, o de un campo de la metadata con la sintaxis de PostgREST (`metadata->>campo`)."""
+    if "->>" in column:
+        column, key = column.split("->>")
+        return (row.get(column) or {}).get(key)
+    return row.get(column)
+
+
+class FakeQuery:
+    """Subconjunto del query builder de supabase-py sobre listas de filas en memoria."""
+
+    def __init__(self, db, table):
+        self.db, self.table = db, table
+        self.action, self.payload, self.filters, self.window, self.count = "select", None, [], None, None
+
+    def select(self, columns, count=None):
+        self.count = count
+        return self
+
+    def insert(self, rows):
+        self.action, self.payload = "insert", rows
+        return self
+
+    def upsert(self, row):
+        self.action, self.payload = "upsert", row
+        return self
+
+    def update(self, values):
+        self.action, self.payload = "update", values
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: column_value(row, column) == value)
+        return self
+
+    def neq(self, column, value):
+        self.filters.append(lambda row: column_value(row, column) != value)
+        return self
+
+    def in_(self, column, values):
+        self.filters.append(lambda row: column_value(row, column) in values)
+        return self
+
+    def order(self, column):
+        return self
+
+    def range(self, start, end):
+        self.window = (start, end + 1)
+        return self
+
+    def limit(self, n):
+        self.window = (0, n)
+        return self
+
+    def execute(self):
+        rows = self.db.setdefault(self.table, [])
+        matched = [row for row in rows if all(f(row) for f in self.filters)]
+        if self.action == "insert":
+            for row in self.payload:
+                rows.append({"id": max((r["id"] for r in rows), default=0) + 1, **row})
+        elif self.action == "upsert":
+            rows[:] = [row for row in rows if row["name"] != self.payload["name"]] + [dict(self.payload)]
+        elif self.action == "update":
+            for row in matched:
+                row.update(self.payload)
+        elif self.action == "delete":
+            rows[:] = [row for row in rows if row not in matched]
+        data = sorted(matched, key=lambda row: row.get("id", 0))
+        if self.window:
+            data = data[self.window[0]:self.window[1]]
+        return SimpleNamespace(data=data, count=len(matched) if self.count else None)
+
+
+class FakeSupabase:
+    def __init__(self, db):
+        self.db = db
+
+    def table(self, name):
+        return FakeQuery(self.db, name)
+
+    def rpc(self, function, params):
+        # Réplica de la función activate_index del README
+        assert function == "activate_index"
+        for row in self.db["index_registry"]:
+            if row["status"] == ACTIVE:
+                row["status"] = RETIRED
+            if row["name"] == params["index_name"]:
+                row["status"] = ACTIVE
+        return SimpleNamespace(execute=lambda: SimpleNamespace(data=None))
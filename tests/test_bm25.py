@@ -0,0 +1,123 @@
+import asyncio
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'vector-tools'))
+
+from bm25_index import BM25Index, tokenize
+from retrieval_backends import HybridBackend, reciprocal_rank_fusion
+from vector_snapshot import load_snapshot, write_snapshot_rows
+
+CONTENTS = [
+    "El depósito a plazo renueva automáticamente al vencimiento.",
+    "Las transferencias LBTR se liquidan en tiempo real durante el horario bancario.",
+    "La garantía FOGAPE cubre hasta el 80% del crédito comercial.",
+    "El cliente puede solicitar la renovación del depósito en sucursal.",
+    "Las transferencias de alto valor por LBTR requieren firma de dos apoderados. LBTR no opera festivos.",
+    "La tarjeta de crédito se bloquea llamando al contact center.",
+]
+CATEGORIES = ["DAP", "LBTR", "Créditos", "DAP", "LBTR", "Tarjetas de Crédito"]
+
+
+def make_rows(dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "id": 100 + i,
+            "content": content,
+            "metadata": {"source": f"doc{i}.pdf", "chunk_index": 0, "category": CATEGORIES[i]},
+            "embedding": rng.normal(size=dim).tolist(),
+        }
+        for i, content in enumerate(CONTENTS)
+    ]
+
+
+def test_tokenize_folds_accents_and_drops_stopwords():
+    assert tokenize("La Renovación del DEPÓSITO en LBTR") == ["renovacion", "deposito", "lbtr"]
+
+
+def test_search_ranks_exact_terms_and_filters_range():
+    index = BM25Index.build(CONTENTS)
+    results = index.search("¿Qué es LBTR?", 10)
+    # El chunk con más menciones de la sigla, en proporción a su largo, va primero
+    assert [row for row, _ in results] == [4, 1]
+    assert results[0][1] > results[1][1] > 0
+    assert [row for row, _ in index.search("LBTR", 10, start=2, end=6)] == [4]
+    assert index.search("hipoteca", 10) == []
+    assert len(index.search("depósito renovación", 1)) == 1
+
+
+def test_snapshot_round_trip_keeps_bm25_rows():
+    rows = make_rows()
+    with tempfile.TemporaryDirectory() as path:
+        write_snapshot_rows(path, rows)
+        snapshot = load_snapshot(path)
+        assert snapshot.manifest["bm25"]["terms"] == len(snapshot.bm25.vocab)
+        # Las filas de BM25 son las del snapshot (ordenado por categoría)
+        start, end = snapshot.categories["LBTR"]
+        hits = snapshot.bm25.search("LBTR", 10, start, end)
+        assert {snapshot.rows[row]["id"] for row, _ in hits} == {101, 104}
+
+        write_snapshot_rows(path, rows, bm25=False)
+        assert load_snapshot(path).bm25 is None
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a"]], k=60)
+    assert [key for key, _ in fused] == ["a", "c", "b"]
+    assert abs(fused[0][1] - (1 / 61 + 1 / 62)) < 1e-12
+
+
+class FakeVectorBackend:
+    """Backend vectorial con resultados fijos, como si vinieran de Supabase."""
+
+    name = "fake"
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def match(self, query_embedding, match_threshold, match_count, category=None, query_text=None):
+        self.calls.append(match_count)
+        return [{**row, "similarity": 0.5} for row in self.rows if category in (None, row["metadata"]["category"])]
+
+    async def amatch(self, query_embedding, match_threshold, match_count, category=None, query_text=None):
+        return self.match(query_embedding, match_threshold, match_count, category)
+
+
+def test_hybrid_backend_fuses_lexical_hits():
+    rows = make_rows()
+    with tempfile.TemporaryDirectory() as path:
+        write_snapshot_rows(path, rows)
+        snapshot = load_snapshot(path)
+        vector_rows = [{k: rows[i][k] for k in ("id", "content", "metadata")} for i in (0, 3)]
+        inner = FakeVectorBackend(vector_rows)
+        backend = HybridBackend(inner, snapshot, rrf_k=60, candidates=8)
+        query = rows[4]["embedding"]
+
+        results = backend.match(query, 0.3, 4, query_text="transferencias LBTR")
+        assert inner.calls == [8]
+        assert len(results) == 4
+        assert {r["id"] for r in results} >= {101, 104}
+        lexical = next(r for r in results if r["id"] == 104)
+        assert lexical["content"] == CONTENTS[4]
+        # La consulta es el embedding del propio chunk: similitud coseno 1
+        assert abs(lexical["similarity"] - 1.0) < 1e-5
+        assert all("rrf_score" in r for r in results)
+
+        by_category = asyncio.run(backend.amatch(query, 0.3, 5, category="DAP", query_text="LBTR"))
+        assert [r["id"] for r in by_category] == [100, 103]
+        # Sin texto de consulta se comporta como el backend vectorial
+        assert [r["id"] for r in backend.match(query, 0.3, 5)] == [100, 103]
+
+
+if __name__ == "__main__":
+    test_tokenize_folds_accents_and_drops_stopwords()
+    test_search_ranks_exact_terms_and_filters_range()
+    test_snapshot_round_trip_keeps_bm25_rows()
+    test_reciprocal_rank_fusion()
+    test_hybrid_backend_fuses_lexical_hits()
+    print("OK")
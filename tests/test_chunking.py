@@ -0,0 +1,97 @@
+import os
+import pickle
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'vector-tools'))
+
+import chunking
+from chunking import CharChunker, TokenChunker, limpiar_texto, split_sentences
+
+
+class WordTokenizer:
+    """Tokenizer de prueba: un token por palabra, más [CLS] y [SEP]."""
+
+    def __call__(self, texts, add_special_tokens=True, verbose=True):
+        return {"input_ids": [list(range(len(text.split()))) for text in texts]}
+
+    def num_special_tokens_to_add(self):
+        return 2
+
+
+def words(chunk):
+    return len(chunk.split())
+
+
+def test_split_sentences_keeps_paragraphs_and_abbreviations():
+    text = "Tasa fija. El Sr. Pérez firma el art. 5 del con-\ntrato.\n\n• Requisito uno\n• Requisito dos"
+    assert split_sentences(text) == [
+        "Tasa fija.",
+        "El Sr. Pérez firma el art. 5 del contrato.",
+        "• Requisito uno",
+        "• Requisito dos",
+    ]
+
+
+def test_limpiar_texto_matches_original_cleaning():
+    assert limpiar_texto("  línea   \n  cortada\n\nfin  ") == "línea cortada fin"
+
+
+def test_token_chunker_respects_budget_and_sentence_boundaries():
+    sentences = [f"Oración número {i} con varias palabras de relleno." for i in range(40)]
+    pages = [(1, " ".join(sentences[:25])), (2, " ".join(sentences[25:]))]
+    chunker = TokenChunker(WordTokenizer(), max_tokens=34, overlap_tokens=8)
+    total, chunks = chunker.chunk_document(pages)
+
+    assert total == len(chunks) > 1
+    assert all(words(text) <= 32 for _, text, _ in chunks)
+    # Cada chunk empieza y termina en una oración completa
+    assert all(text.startswith("Oración") and text.endswith(".") for _, text, _ in chunks)
+    # Overlap de una oración (8 palabras) entre chunks consecutivos
+    for (_, previous, _), (_, current, _) in zip(chunks, chunks[1:]):
+        assert current.startswith(previous.split(". ")[-1])
+    assert chunks[0][2] == {"page_start": 1, "page_end": 1}
+    assert chunks[-1][2]["page_end"] == 2
+    covered = " ".join(text for _, text, _ in chunks)
+    assert all(sentence in covered for sentence in sentences)
+
+
+def test_token_chunker_joins_sentences_across_pages_and_splits_long_ones():
+    pages = [(1, "Primera oración completa. La segunda continúa"), (2, "en la página siguiente. Fin.")]
+    _, chunks = TokenChunker(WordTokenizer(), max_tokens=100).chunk_document(pages)
+    assert chunks == [(0, "Primera oración completa. La segunda continúa en la página siguiente. Fin.",
+                       {"page_start": 1, "page_end": 2})]
+
+    long_sentence = " ".join(f"palabra{i}" for i in range(50)) + "."
+    _, chunks = TokenChunker(WordTokenizer(), max_tokens=12, overlap_tokens=0).chunk_document([(3, long_sentence)])
+    assert [words(text) for _, text, _ in chunks] == [10, 10, 10, 10, 10]
+    assert all(page_range == {"page_start": 3, "page_end": 3} for _, _, page_range in chunks)
+
+
+def test_token_chunker_pickles_without_tokenizer():
+    chunker = TokenChunker(WordTokenizer(), tokenizer_path="modelo-de-prueba", max_tokens=20)
+    restored = pickle.loads(pickle.dumps(chunker))
+    assert restored._tokenizer is None
+    chunking._tokenizers["modelo-de-prueba"] = WordTokenizer()
+    try:
+        _, chunks = restored.chunk_document([(1, "Una oración. Otra oración.")])
+    finally:
+        del chunking._tokenizers["modelo-de-prueba"]
+    assert chunks == [(0, "Una oración. Otra oración.", {"page_start": 1, "page_end": 1})]
+
+
+def test_char_chunker_keeps_original_algorithm():
+    text = "Texto   de\nprueba " * 200
+    total, chunks = CharChunker(1000, 200).chunk_document([(1, text)])
+    expected = [text[i:i + 1000] for i in range(0, len(text), 800) if len(text[i:i + 1000]) > 500]
+    assert total == len(expected)
+    assert [chunk for _, chunk, _ in chunks] == [limpiar_texto(chunk) for chunk in expected]
+
+
+if __name__ == "__main__":
+    test_split_sentences_keeps_paragraphs_and_abbreviations()
+    test_limpiar_texto_matches_original_cleaning()
+    test_token_chunker_respects_budget_and_sentence_boundaries()
+    test_token_chunker_joins_sentences_across_pages_and_splits_long_ones()
+    test_token_chunker_pickles_without_tokenizer()
+    test_char_chunker_keeps_original_algorithm()
+    print("OK")
@@ -0,0 +1,99 @@
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'utils'))
+
+from clients import ClientRegistry
+
+SUPABASE_ENV = {"SUPABASE_URL": "http://localhost", "SUPABASE_KEY": "test"}
+
+
+def run_threads(target, n=8):
+    """Ejecuta `target` en `n` threads que arrancan a la vez y devuelve sus resultados."""
+    barrier = threading.Barrier(n)
+    results = [None] * n
+
+    def worker(i):
+        barrier.wait()
+        results[i] = target()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def slow_credentials(*args, **kwargs):
+    # Lento a propósito para que los threads compitan por la primera carga
+    time.sleep(0.05)
+    return SimpleNamespace(file=args[0])
+
+
+def test_drive_service_per_thread_with_shared_credentials():
+    registry = ClientRegistry(service_account_file="service-account.json", http_timeout=5)
+    with patch("google.oauth2.service_account.Credentials.from_service_account_file",
+               side_effect=slow_credentials) as load_credentials, \
+            patch("googleapiclient.discovery.build_from_document",
+                  side_effect=lambda doc, http: SimpleNamespace(http=http)) as build:
+        # Nada se construye hasta el primer uso
+        assert registry.stats() == {} and not load_credentials.called
+
+        services = run_threads(lambda: (registry.drive_service(), registry.drive_service()))
+        assert all(first is second for first, second in services)
+        assert len({id(first) for first, _ in services}) == 8
+        assert load_credentials.call_count == 1 and build.call_count == 8
+        stats = registry.stats()
+        assert stats["credential_loads"] == 1 and stats["discovery_loads"] == 1
+        assert stats["drive_service_builds"] == 8 and stats["drive_http_connections"] == 8
+
+        registry.reset()
+        assert registry.drive_service() is not services[0][0]
+        assert load_credentials.call_count == 2 and registry.stats()["resets"] == 1
+
+
+def fake_supabase_client(url, key, options=None):
+    time.sleep(0.05)
+    return SimpleNamespace(url=url, postgrest=SimpleNamespace(session=SimpleNamespace(event_hooks={"request": []})))
+
+
+def test_supabase_client_is_a_process_singleton():
+    registry = ClientRegistry(http_timeout=5)
+    with patch.dict(os.environ, SUPABASE_ENV), \
+            patch("supabase.create_client", side_effect=fake_supabase_client) as create:
+        clients = run_threads(registry.supabase)
+        assert all(client is clients[0] for client in clients) and create.call_count == 1
+        assert clients[0].url == "http://localhost"
+
+        # El hook registrado cuenta los requests
+        for hook in clients[0].postgrest.session.event_hooks["request"]:
+            hook(None)
+            hook(None)
+        assert registry.stats() == {"supabase_client_builds": 1, "supabase_requests": 2}
+
+        registry.reset()
+        assert registry.supabase() is not clients[0] and create.call_count == 2
+        assert registry.stats()["resets"] == 1 and registry.stats()["supabase_client_builds"] == 2
+
+
+def test_supabase_requires_credentials():
+    registry = ClientRegistry()
+    with patch.dict(os.environ, {"SUPABASE_URL": "", "SUPABASE_KEY": ""}):
+        try:
+            registry.supabase()
+        except ValueError as e:
+            assert "SUPABASE_URL" in str(e)
+        else:
+            raise AssertionError("se esperaba ValueError")
+
+
+if __name__ == "__main__":
+    test_drive_service_per_thread_with_shared_credentials()
+    test_supabase_client_is_a_process_singleton()
+    test_supabase_requires_credentials()
+    print("OK")
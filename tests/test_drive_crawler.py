@@ -0,0 +1,126 @@
+import os
+import re
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'utils'))
+
+from drive_crawler import DriveCrawler, FOLDER_MIME_TYPE, list_folder
+
+
+class FakeRequest:
+    def __init__(self, response, service):
+        self.response = response
+        self.service = service
+
+    def execute(self):
+        with self.service.lock:
+            self.service.active += 1
+            self.service.max_active = max(self.service.max_active, self.service.active)
+        time.sleep(0.01)
+        with self.service.lock:
+            self.service.active -= 1
+        if isinstance(self.response, Exception):
+            raise self.response
+        return self.response
+
+
+class FakeFiles:
+    def __init__(self, service):
+        self.service = service
+
+    def list(self, q, pageSize=100, pageToken=None, **kwargs):
+        folder_id = re.match(r"'([^']+)' in parents", q).group(1)
+        self.service.calls.append((folder_id, pageToken))
+        if folder_id in self.service.broken:
+            return FakeRequest(IOError("403 Forbidden"), self.service)
+        items = self.service.tree.get(folder_id, [])
+        start = int(pageToken or 0)
+        response = {"files": [dict(item) for item in items[start:start + pageSize]]}
+        if start + pageSize < len(items):
+            response["nextPageToken"] = str(start + pageSize)
+        return FakeRequest(response, self.service)
+
+
+class FakeDriveService:
+    """Fake en memoria de `service.files().list` con paginación."""
+
+    def __init__(self, tree, broken=()):
+        self.tree = tree
+        self.broken = set(broken)
+        self.calls = []
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+
+    def files(self):
+        return FakeFiles(self)
+
+
+def folder(id, name):
+    return {"id": id, "name": name, "mimeType": FOLDER_MIME_TYPE}
+
+
+def pdf(id, name):
+    return {"id": id, "name": name, "mimeType": "application/pdf"}
+
+
+def make_tree():
+    return {
+        "root": [folder("dap", "DAP"), folder("lbtr", "LBTR"), pdf("r1", "indice.pdf"),
+                 {"id": "r2", "name": "notas.txt", "mimeType": "text/plain"}],
+        "dap": [folder("dap-old", "Antiguos")] + [pdf(f"dap{i}", f"manual_{i}.pdf") for i in range(25)],
+        "dap-old": [pdf("old1", "viejo.pdf")],
+        "lbtr": [pdf("l1", "lbtr.pdf")],
+    }
+
+
+def test_list_folder_follows_pagination():
+    service = FakeDriveService(make_tree())
+    items = list_folder(service, "dap", page_size=10)
+    assert len(items) == 26
+    assert [token for folder_id, token in service.calls] == [None, "10", "20"]
+
+
+def test_crawl_paths_and_mime_filter():
+    service = FakeDriveService(make_tree())
+    crawler = DriveCrawler(lambda: service, max_workers=3, page_size=7)
+    files = list(crawler.crawl_folder("root", mime_types=["application/pdf"]))
+    paths = {f["id"]: f["path"] for f in files}
+    assert len(files) == 28
+    assert paths["r1"] == "/"
+    assert paths["dap3"] == "/DAP/"
+    assert paths["old1"] == "/DAP/Antiguos/"
+    assert paths["l1"] == "/LBTR/"
+    assert "r2" not in paths
+    assert crawler.errors == []
+
+
+def test_crawl_respects_concurrency_limit_and_reports_errors():
+    tree = {"root": [folder(f"f{i}", f"F{i}") for i in range(8)]}
+    for i in range(8):
+        tree[f"f{i}"] = [pdf(f"p{i}", f"doc{i}.pdf")]
+    service = FakeDriveService(tree, broken=["f5"])
+    built = []
+
+    def factory():
+        built.append(threading.get_ident())
+        return service
+
+    crawler = DriveCrawler(factory, max_workers=2)
+    files = list(crawler.crawl([("root", "/")], include_folders=True))
+    assert service.max_active <= 2
+    assert len(built) <= 2
+    assert len([f for f in files if f["mimeType"] == FOLDER_MIME_TYPE]) == 8
+    assert sorted(f["id"] for f in files if f["mimeType"] != FOLDER_MIME_TYPE) == [
+        f"p{i}" for i in range(8) if i != 5
+    ]
+    assert [folder_id for folder_id, _ in crawler.errors] == ["f5"]
+
+
+if __name__ == "__main__":
+    test_list_folder_follows_pagination()
+    test_crawl_paths_and_mime_filter()
+    test_crawl_respects_concurrency_limit_and_reports_errors()
+    print("OK")
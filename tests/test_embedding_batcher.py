@@ -0,0 +1,88 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'vector-tools'))
+
+from embedding_batcher import MicroBatcher
+
+
+class FakeModel:
+    """Codifica cada texto como [largo, primer carácter] y registra el tamaño de cada lote."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batch_sizes = []
+
+    def encode(self, texts):
+        self.batch_sizes.append(len(texts))
+        time.sleep(self.delay)
+        return np.array([[len(t), ord(t[0])] for t in texts], dtype=np.float32)
+
+
+def test_concurrent_requests_share_batches():
+    model = FakeModel(delay=0.01)
+    batcher = MicroBatcher(model.encode, max_batch=8, max_wait_ms=20)
+    texts = [chr(ord("a") + i % 26) * (i + 1) for i in range(40)]
+    results = {}
+
+    def worker(text):
+        results[text] = batcher.encode(text, timeout=5)
+
+    threads = [threading.Thread(target=worker, args=(text,)) for text in texts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batcher.close()
+
+    for text in texts:
+        assert results[text].tolist() == [len(text), ord(text[0])]
+    assert sum(model.batch_sizes) == len(texts)
+    assert max(model.batch_sizes) <= 8
+    assert len(model.batch_sizes) < len(texts)
+    stats = batcher.stats()
+    assert stats["items"] == len(texts)
+    assert stats["max_batch_size"] == max(model.batch_sizes)
+    assert stats["max_queue_depth"] >= 1
+
+
+def test_errors_reach_every_caller():
+    def failing(texts):
+        raise RuntimeError("modelo no disponible")
+
+    batcher = MicroBatcher(failing, max_batch=4, max_wait_ms=10)
+    futures = [batcher.submit(f"consulta {i}") for i in range(3)]
+    for future in futures:
+        try:
+            future.result(timeout=5)
+        except RuntimeError as e:
+            assert "modelo no disponible" in str(e)
+        else:
+            raise AssertionError("se esperaba un error")
+    assert batcher.stats()["errors"] >= 1
+    batcher.close()
+
+
+def test_aencode_batches_coroutines():
+    model = FakeModel()
+    batcher = MicroBatcher(model.encode, max_batch=16, max_wait_ms=20)
+
+    async def run():
+        return await asyncio.gather(*(batcher.aencode(f"q{i}") for i in range(10)))
+
+    results = asyncio.run(run())
+    batcher.close()
+    assert [r.tolist() for r in results] == [[2.0, ord("q")]] * 10
+    assert len(model.batch_sizes) <= 2
+
+
+if __name__ == "__main__":
+    test_concurrent_requests_share_batches()
+    test_errors_reach_every_caller()
+    test_aencode_batches_coroutines()
+    print("OK")
@@ -0,0 +1,100 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'vector-tools'))
+
+from embedding_cache import EmbeddingCache, normalizar_consulta
+from index_registry import EmbeddingSpec
+
+
+def test_normalized_keys_and_counters():
+    assert normalizar_consulta("  ¿Cuál es la TASA   del Depósito? ") == "¿cual es la tasa del deposito?"
+    cache = EmbeddingCache(max_size=4)
+    calls = []
+
+    def compute(texto):
+        calls.append(texto)
+        return [float(len(texto)), 1.0]
+
+    first = cache.get_or_compute("Tasa del depósito", compute)
+    again = cache.get_or_compute("tasa  del DEPOSITO", compute)
+    assert calls == ["Tasa del depósito"] and again is first
+    assert first.dtype == np.float32
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_lru_eviction():
+    cache = EmbeddingCache(max_size=2)
+    cache.put("a", [1.0])
+    cache.put("b", [2.0])
+    # "a" se usa y pasa a ser la más reciente: se descarta "b"
+    assert cache.get("a") is not None
+    cache.put("c", [3.0])
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+
+    disabled = EmbeddingCache(max_size=0)
+    disabled.put("a", [1.0])
+    assert disabled.get("a") is None and disabled.stats()["size"] == 0
+
+
+def test_save_and_load_roundtrip():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache", "queries.npz")
+        cache = EmbeddingCache(max_size=3, path=path)
+        for i, key in enumerate(["a", "b", "c"]):
+            cache.put(key, [float(i), 1.0])
+        cache.get("a")  # orden de uso: b, c, a
+        cache.save()
+
+        restored = EmbeddingCache(max_size=3, path=path)
+        assert restored.stats()["size"] == 3
+        np.testing.assert_array_equal(restored.get("b"), [1.0, 1.0])
+
+        # Con menos capacidad se conservan las más usadas
+        smaller = EmbeddingCache(max_size=2, path=path)
+        assert smaller.get("b") is None
+        assert smaller.get("c") is not None and smaller.get("a") is not None
+
+        # Un archivo dañado no impide arrancar
+        with open(path, "wb") as f:
+            f.write(b"no es un npz")
+        assert EmbeddingCache(max_size=3, path=path).stats()["size"] == 0
+
+
+def test_persisted_cache_is_discarded_for_another_model():
+    minilm = EmbeddingSpec("all-MiniLM-L6-v2", "1")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "queries.npz")
+        cache = EmbeddingCache(max_size=3, path=path, spec=minilm)
+        cache.put("tasa del deposito", [1.0, 0.0, 0.0])
+        cache.save()
+
+        assert EmbeddingCache(max_size=3, path=path, spec=EmbeddingSpec("all-MiniLM-L6-v2", "1")).get(
+            "tasa del deposito") is not None
+        assert EmbeddingCache(max_size=3, path=path, spec=EmbeddingSpec("all-MiniLM-L6-v2", "1", dim=3)).stats()[
+            "size"] == 1
+        # Otro modelo, otra versión u otra dimensión: los embeddings no son comparables
+        for spec in (EmbeddingSpec("multilingual-e5-small", "1"), EmbeddingSpec("all-MiniLM-L6-v2", "2"),
+                     EmbeddingSpec("all-MiniLM-L6-v2", "1", dim=384)):
+            assert EmbeddingCache(max_size=3, path=path, spec=spec).stats()["size"] == 0
+
+        # Un archivo sin modelo (guardado sin spec) se descarta si ahora se conoce el modelo
+        legacy = EmbeddingCache(max_size=3, path=path)
+        legacy.put("tasa del deposito", [1.0, 0.0, 0.0])
+        legacy.save()
+        assert EmbeddingCache(max_size=3, path=path, spec=minilm).stats()["size"] == 0
+
+
+if __name__ == "__main__":
+    test_normalized_keys_and_counters()
+    test_lru_eviction()
+    test_save_and_load_roundtrip()
+    test_persisted_cache_is_discarded_for_another_model()
+    print("OK")
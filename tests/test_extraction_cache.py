@@ -0,0 +1,64 @@
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'vector-tools'))
+
+from extraction_cache import ExtractionCache
+
+PAGES = [(1, "Depósito a plazo\nTasa fija: 0,45%\n"), (2, ""), (3, "Rescate anticipado {\"aviso\": 5}\n" * 200)]
+
+
+def test_record_and_read_roundtrip():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ExtractionCache(tmp)
+        assert cache.get("abc123", "pdf") is None
+        assert list(cache.record("abc123", "pdf", iter(PAGES))) == PAGES
+
+        path = cache.get("abc123", "pdf")
+        assert cache.owns(path) and not cache.owns(os.path.join(tmp, "manual.pdf"))
+        assert cache.get("abc123", "docx") is None
+        header, pages = cache.read(path)
+        assert header["format"] == "pdf" and header["paginated"]
+        assert list(pages) == PAGES
+        # Comprimido: la página repetida ocupa mucho menos que el texto
+        assert os.path.getsize(path) < len(PAGES[2][1]) / 10
+
+
+def test_failed_or_abandoned_extraction_is_not_cached():
+    def failing():
+        yield PAGES[0]
+        raise IOError("PDF dañado")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ExtractionCache(tmp)
+        try:
+            list(cache.record("abc123", "pdf", failing()))
+        except IOError:
+            pass
+        stream = cache.record("def456", "pdf", iter(PAGES))
+        next(stream)
+        stream.close()
+        assert cache.get("abc123", "pdf") is None and cache.get("def456", "pdf") is None
+        assert os.listdir(tmp) == []
+
+
+def test_evicts_least_recently_used():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ExtractionCache(tmp)
+        for second, checksum in enumerate(["a", "b", "c"]):
+            list(cache.record(checksum, "pdf", iter([(1, checksum * 2000 + str(os.urandom(400)))])))
+            os.utime(cache.get(checksum, "pdf"), (1000 + second, 1000 + second))
+        # "a" es la más antigua, pero se usa antes de evictar
+        cache.get("a", "pdf")
+        cache.max_bytes = cache.size() - 1
+        assert cache.evict() == 1
+        assert cache.get("b", "pdf") is None
+        assert cache.get("a", "pdf") and cache.get("c", "pdf")
+
+
+if __name__ == "__main__":
+    test_record_and_read_roundtrip()
+    test_failed_or_abandoned_extraction_is_not_cached()
+    test_evicts_least_recently_used()
+    print("OK")
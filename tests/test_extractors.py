@@ -0,0 +1,81 @@
+import os
+import sys
+import tempfile
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(root, 'utils'))
+
+import docx
+
+import extractors
+from extractors import get_extractor, iter_pages, pdf_page_needs_layout
+from test_streaming_extraction import write_pdf
+
+
+def test_pdf_fast_path_and_layout_fallback():
+    assert pdf_page_needs_layout("")
+    assert pdf_page_needs_layout("DepositoaplazoconrenovacionautomaticaytasafijaLBTR")
+    assert not pdf_page_needs_layout("Deposito a plazo con renovacion automatica")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "manual.pdf")
+        write_pdf(path, [["Deposito a plazo con tasa fija", "Renovacion automatica al vencimiento"], [],
+                         ["Rescate anticipado con aviso de 5 dias"]])
+        pages = list(iter_pages(path, "application/pdf"))
+        assert [number for number, _ in pages] == [1, 2, 3]
+        assert "Renovacion automatica" in pages[0][1]
+        assert pages[1][1].strip() == ""
+
+        # Con el umbral alto todas las páginas pasan por pdfplumber y el texto se mantiene
+        original = extractors.PDF_FALLBACK_MIN_CHARS
+        try:
+            extractors.PDF_FALLBACK_MIN_CHARS = 10 ** 6
+            layout_pages = list(iter_pages(path))
+        finally:
+            extractors.PDF_FALLBACK_MIN_CHARS = original
+        assert "Rescate anticipado con aviso de 5 dias" in layout_pages[2][1]
+
+
+def test_docx_and_workspace_exports():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "faq.docx")
+        document = docx.Document()
+        document.add_paragraph("¿Cuál es el plazo mínimo del depósito?")
+        document.add_paragraph("")
+        table = document.add_table(rows=2, cols=2)
+        table.cell(0, 0).text, table.cell(0, 1).text = "Plazo", "Tasa"
+        table.cell(1, 0).text, table.cell(1, 1).text = "30 días", "0,45%"
+        document.save(path)
+        [(page, text)] = list(iter_pages(path))
+        assert text == "¿Cuál es el plazo mínimo del depósito?\nPlazo | Tasa\n30 días | 0,45%\n"
+
+        gdoc = get_extractor("application/vnd.google-apps.document")
+        assert gdoc.export_mime_type == extractors.DOCX_MIME_TYPE
+        assert gdoc.format == "gdoc" and not gdoc.paginated
+        assert list(gdoc.iter_pages(path)) == [(page, text)]
+
+        csv_path = os.path.join(tmp, "tasas.csv")
+        with open(csv_path, "w", encoding="utf-8") as f:
+            f.write("Producto,Tasa\nDAP,\"0,45%\"\n,\n")
+        sheet = get_extractor("application/vnd.google-apps.spreadsheet")
+        assert sheet.export_mime_type == "text/csv"
+        assert list(sheet.iter_pages(csv_path)) == [(1, "Producto | Tasa\nDAP | 0,45%\n")]
+
+
+def test_unsupported_formats():
+    assert get_extractor("image/png") is None
+    assert get_extractor(path="foto.PNG") is None
+    assert get_extractor(path="MANUAL.PDF").format == "pdf"
+    try:
+        iter_pages("foto.png")
+    except ValueError as e:
+        assert ".png" in str(e)
+    else:
+        raise AssertionError("se esperaba ValueError")
+
+
+if __name__ == "__main__":
+    test_pdf_fast_path_and_layout_fallback()
+    test_docx_and_workspace_exports()
+    test_unsupported_formats()
+    print("OK")
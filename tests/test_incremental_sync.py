@@ -0,0 +1,162 @@
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("sentence_transformers")
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'vector-tools'))
+
+from chunking import CharChunker
+from fake_supabase import FakeSupabase
+from index_manifest import IndexManifest, content_hash
+from stage_timer import StageTimer
+from tiny_model import load_process_docs
+
+process_docs = load_process_docs()
+
+FILE = {"id": "dap.pdf", "name": "dap.pdf", "path": "/DAP/", "md5Checksum": "v1"}
+CHUNKS = [(0, "Depósito a plazo fijo", {}), (1, "Tasa de 0,45% mensual", {}), (2, "Rescate anticipado", {})]
+
+
+@contextmanager
+def fake_supabase(db):
+    original = process_docs.clients.get_supabase_client
+    client = FakeSupabase(db)
+    process_docs.clients.get_supabase_client = lambda: client
+    try:
+        yield client
+    finally:
+        process_docs.clients.get_supabase_client = original
+
+
+def indexed(manifest_path, db, chunks=CHUNKS, file=FILE):
+    """Indexa `chunks` del archivo desde cero y devuelve el manifiesto."""
+    manifest = IndexManifest(manifest_path)
+    sync(manifest, db, chunks, file)
+    return manifest
+
+
+def sync(manifest, db, chunks, file=FILE):
+    current, new_chunks = process_docs.select_new_chunks(file["id"], chunks, manifest)
+    inserted = process_docs.embed_and_insert(new_chunks, {"file_id": file["id"], "category": "DAP"}, 8, 8,
+                                             StageTimer())
+    process_docs.finish_sync(file, manifest, "DAP", current, new_chunks, inserted, 8, StageTimer())
+    return new_chunks
+
+
+def test_unchanged_file_is_skipped():
+    db = {}
+    with tempfile.TemporaryDirectory() as tmp, fake_supabase(db):
+        manifest = indexed(os.path.join(tmp, "manifest.json"), db)
+        rows = [dict(row) for row in db["documents"]]
+        assert manifest.is_unchanged(FILE) and not manifest.is_unchanged({**FILE, "md5Checksum": "v2"})
+        # Aunque se vuelva a procesar, no hay chunks nuevos ni eliminados
+        assert sync(manifest, db, CHUNKS) == []
+        assert db["documents"] == rows
+        assert manifest.chunk_hashes(FILE["id"]) == {content_hash(text): i for i, text, _ in CHUNKS}
+
+
+def test_changed_chunks_replace_only_the_difference():
+    db = {}
+    changed = [CHUNKS[0], (1, "Tasa de 0,50% mensual", {}), CHUNKS[2]]
+    file = {**FILE, "md5Checksum": "v2"}
+    with tempfile.TemporaryDirectory() as tmp, fake_supabase(db):
+        manifest = indexed(os.path.join(tmp, "manifest.json"), db)
+        ids = {row["content"]: row["id"] for row in db["documents"]}
+
+        assert sync(manifest, db, changed, file) == [changed[1]]
+        contents = {row["content"]: row["id"] for row in db["documents"]}
+        assert sorted(contents) == sorted(text for _, text, _ in changed)
+        # Los chunks sin cambios conservan sus filas
+        assert contents[CHUNKS[0][1]] == ids[CHUNKS[0][1]] and contents[CHUNKS[2][1]] == ids[CHUNKS[2][1]]
+        assert manifest.is_unchanged(file)
+        assert set(manifest.chunk_hashes(FILE["id"])) == {content_hash(text) for _, text, _ in changed}
+
+
+def test_failed_insert_keeps_old_chunks_and_retries():
+    db = {}
+    changed = [CHUNKS[0], (1, "Tasa de 0,50% mensual", {}), CHUNKS[2]]
+    file = {**FILE, "md5Checksum": "v2"}
+    with tempfile.TemporaryDirectory() as tmp, fake_supabase(db) as client:
+        manifest = indexed(os.path.join(tmp, "manifest.json"), db)
+
+        def unavailable(name):
+            raise IOError("Supabase no disponible")
+
+        client.table = unavailable
+        sync(manifest, db, changed, file)
+        # No se borra el chunk anterior y el archivo se vuelve a revisar en la próxima ejecución
+        assert [row["content"] for row in db["documents"]] == [text for _, text, _ in CHUNKS]
+        assert not manifest.is_unchanged(file)
+        assert content_hash(CHUNKS[1][1]) in manifest.chunk_hashes(FILE["id"])
+
+
+def test_removed_file_is_tombstoned():
+    db = {}
+    other = {**FILE, "id": "lbtr.pdf", "name": "lbtr.pdf"}
+    with tempfile.TemporaryDirectory() as tmp, fake_supabase(db):
+        manifest = indexed(os.path.join(tmp, "manifest.json"), db)
+        sync(manifest, db, [(0, "Transferencias LBTR", {})], other)
+
+        # Un listado vacío se trata como un error de acceso: no se elimina nada
+        process_docs.tombstone_missing_files(manifest, set())
+        assert len(db["documents"]) == 4
+
+        process_docs.tombstone_missing_files(manifest, {other["id"]})
+        assert [row["content"] for row in db["documents"]] == ["Transferencias LBTR"]
+        assert manifest.get(FILE["id"]) is None and manifest.files[FILE["id"]]["deleted"]
+        assert manifest.active_file_ids() == [other["id"]]
+
+
+def test_crawl_errors_skip_tombstoning():
+    db = {}
+    with tempfile.TemporaryDirectory() as tmp, fake_supabase(db):
+        manifest = indexed(os.path.join(tmp, "manifest.json"), db)
+        process_docs.tombstone_missing_files(manifest, {"otro.pdf"}, crawl_errors=[("carpeta", "403")])
+        assert len(db["documents"]) == 3
+        assert manifest.active_file_ids() == [FILE["id"]]
+
+
+def test_chunker_change_rechunks_unchanged_files():
+    db = {}
+    text = " ".join(f"El depósito {i} paga una tasa fija de 0,{i}% mensual." for i in range(12))
+    with tempfile.TemporaryDirectory() as tmp, fake_supabase(db):
+        docs = os.path.join(tmp, "docs")
+        os.makedirs(os.path.join(docs, "DAP"))
+        with open(os.path.join(docs, "DAP", "dap.txt"), "w", encoding="utf-8") as f:
+            f.write(text)
+        manifest = IndexManifest(os.path.join(tmp, "manifest.json"))
+        large, small = CharChunker(200, 50), CharChunker(120, 20)
+
+        process_docs.process_pdf_directory(docs, manifest=manifest, chunker=large)
+        rows = [dict(row) for row in db["documents"]]
+        assert rows and all(len(row["content"]) <= 200 for row in rows)
+        process_docs.process_pdf_directory(docs, manifest=manifest, chunker=large)
+        assert db["documents"] == rows
+
+        # El archivo no cambió, pero el chunker sí: se vuelve a dividir y se reemplazan sus chunks
+        process_docs.process_pdf_directory(docs, manifest=manifest, chunker=small)
+        contents = [row["content"] for row in db["documents"]]
+        assert contents and all(len(content) <= 120 for content in contents)
+        assert not {row["id"] for row in rows} & {row["id"] for row in db["documents"]}
+        file_id = manifest.active_file_ids()[0]
+        assert manifest.files[file_id]["chunker"] == small.config()
+
+        # Una entrada de un manifiesto anterior, sin chunker, cuenta como cambiada
+        del manifest.files[file_id]["chunker"]
+        record = process_docs.local_file_record(os.path.join(docs, "DAP", "dap.txt"), docs)
+        assert not manifest.is_unchanged(record, small.config()) and manifest.is_unchanged(record)
+
+
+if __name__ == "__main__":
+    test_unchanged_file_is_skipped()
+    test_changed_chunks_replace_only_the_difference()
+    test_failed_insert_keeps_old_chunks_and_retries()
+    test_removed_file_is_tombstoned()
+    test_crawl_errors_skip_tombstoning()
+    test_chunker_change_rechunks_unchanged_files()
+    print("OK")
@@ -0,0 +1,97 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'vector-tools'))
+
+from fake_supabase import FakeSupabase
+from index_registry import ACTIVE, BUILDING, READY, RETIRED, EmbeddingSpec, IndexInfo, IndexRegistry, resolve_index
+from reembed import rebuild_index
+from retrieval_backends import LocalBackend
+from vector_snapshot import write_snapshot_rows
+
+MINILM = EmbeddingSpec("all-MiniLM-L6-v2", "1", 384)
+E5 = EmbeddingSpec("intfloat/multilingual-e5-small", "1", 384)
+
+
+def index(spec, status, updated_at, name=None):
+    info = IndexInfo.for_spec(spec, name)
+    info.status, info.updated_at = status, updated_at
+    return info
+
+
+def test_resolve_routes_by_model():
+    old = index(MINILM, RETIRED, "2026-01-01", "documents")
+    new = index(E5, ACTIVE, "2026-02-01")
+    assert new.table == "documents_multilingual_e5_small_v1"
+    assert new.match_function == "match_documents_multilingual_e5_small_v1"
+
+    assert resolve_index([old, new], E5) is new
+    # Las instancias que siguen con el modelo anterior consultan el índice retirado
+    assert resolve_index([old, new], MINILM) is old
+    # Un índice en construcción no se consulta
+    assert resolve_index([index(E5, BUILDING, "2026-03-01", "e5_v2"), new], E5) is new
+    # Sin registro, la tabla documents
+    assert resolve_index([], E5).table == "documents"
+    try:
+        resolve_index([old, new], EmbeddingSpec("all-MiniLM-L6-v2", "2"))
+    except ValueError as e:
+        assert "all-MiniLM-L6-v2 v2" in str(e)
+    else:
+        raise AssertionError("se esperaba ValueError")
+
+    assert MINILM.matches(EmbeddingSpec("all-MiniLM-L6-v2")) and not MINILM.matches(EmbeddingSpec(MINILM.model, "1", 768))
+    assert IndexInfo.from_row(new.to_row()) == new
+
+
+def test_local_snapshot_must_match_model():
+    rows = [{"id": i, "content": f"chunk {i}", "metadata": {"category": "DAP"},
+             "embedding": np.eye(4, dtype=np.float32)[i]} for i in range(4)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "snapshot")
+        write_snapshot_rows(path, rows, extra_manifest={"model": E5.model,
+                                                        "embedding": {"model": E5.model, "version": "1", "dim": 4}})
+        assert len(LocalBackend.from_path(path, EmbeddingSpec(E5.model, "1")).snapshot.rows) == 4
+        try:
+            LocalBackend.from_path(path, MINILM)
+        except ValueError as e:
+            assert "multilingual-e5-small" in str(e)
+        else:
+            raise AssertionError("se esperaba ValueError")
+
+
+def test_rebuild_copies_and_activates_shadow_index():
+    db = {"documents": [{"id": i + 1, "content": f"chunk {i}", "metadata": {"category": "DAP", "chunk_index": i},
+                         "embedding": [0.0] * 3} for i in range(7)],
+          "index_registry": []}
+    client = FakeSupabase(db)
+    registry = IndexRegistry(client_factory=lambda: client)
+    target = IndexInfo.for_spec(EmbeddingSpec(E5.model, "1", 2))
+    bumps = []
+
+    copied = rebuild_index(target, lambda texts: np.ones((len(texts), 2), dtype=np.float32), registry, client,
+                           batch_size=2, page_size=3)
+    assert copied == 7 and len(db[target.table]) == 7
+    assert db[target.table][6]["metadata"] == {"category": "DAP", "chunk_index": 6,
+                                              **target.embedding.metadata()}
+    assert db[target.table][0]["embedding"] == [1.0, 1.0]
+    # Sin --activate el índice nuevo queda completo pero no activo
+    assert registry.get(target.name).status == READY and registry.active().table == "documents"
+
+    # Una segunda construcción reemplaza la tabla en vez de duplicar chunks, y activa el índice nuevo
+    rebuild_index(target, lambda texts: np.ones((len(texts), 2), dtype=np.float32), registry, client,
+                  activate=True, bump_version=lambda: bumps.append(1))
+    assert len(db[target.table]) == 7 and bumps == [1]
+    assert registry.active().name == target.name
+    assert registry.get("documents").status == RETIRED
+    assert registry.resolve(EmbeddingSpec(E5.model, "1")).table == target.table
+    assert registry.resolve(EmbeddingSpec("all-MiniLM-L6-v2", "1")).table == "documents"
+
+
+if __name__ == "__main__":
+    test_resolve_routes_by_model()
+    test_local_snapshot_must_match_model()
+    test_rebuild_copies_and_activates_shadow_index()
+    print("OK")
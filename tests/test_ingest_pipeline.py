@@ -0,0 +1,181 @@
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'vector-tools'))
+
+from ingest_pipeline import IngestPipeline
+
+
+class FakeDriveService:
+    """Servicio de Drive falso que sirve los archivos de un directorio local (una subcarpeta por producto)."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.downloads = 0
+
+    def list_files(self):
+        files = []
+        for category in sorted(os.listdir(self.directory)):
+            for name in sorted(os.listdir(os.path.join(self.directory, category))):
+                files.append({
+                    "id": f"{category}/{name}",
+                    "name": name,
+                    "mimeType": "application/pdf",
+                    "path": f"/{category}/",
+                })
+        return files
+
+    def download(self, file):
+        if file["name"].startswith("broken"):
+            raise IOError("download failed")
+        self.downloads += 1
+        fd, path = tempfile.mkstemp(suffix="_" + file["name"])
+        os.close(fd)
+        shutil.copyfile(os.path.join(self.directory, file["id"]), path)
+        return path
+
+
+def fake_extract(path):
+    with open(path, encoding="utf-8") as f:
+        paragraphs = [p.strip() for p in f.read().split("\n\n") if p.strip()]
+    return len(paragraphs), list(enumerate(paragraphs))
+
+
+def fake_embed(texts):
+    return [[float(len(text)), 1.0] for text in texts]
+
+
+def make_drive_dir(root):
+    contents = {
+        "DAP": {"manual.pdf": "Depósito a plazo.\n\nTasa fija.\n\nRenovación automática.",
+                "faq.pdf": "¿Cuál es el plazo mínimo?\n\n30 días."},
+        "LBTR": {"lbtr.pdf": "Liquidación bruta en tiempo real.", "broken.pdf": "x"},
+        "Vacio": {"vacio.pdf": ""},
+    }
+    for category, files in contents.items():
+        os.makedirs(os.path.join(root, category))
+        for name, text in files.items():
+            with open(os.path.join(root, category, name), "w", encoding="utf-8") as f:
+                f.write(text)
+
+
+def run_pipeline(extract_workers, extract_format=None, prepare_fails=()):
+    with tempfile.TemporaryDirectory() as root:
+        make_drive_dir(root)
+        service = FakeDriveService(root)
+        written = []
+        done = {}
+
+        def prepare(job):
+            if job.file["name"] in prepare_fails:
+                raise ValueError(f"metadata inválida en {job.file['name']}")
+            job.metadata = {"source": job.file["name"], "category": job.file["path"].strip("/")}
+
+        def write(rows):
+            written.extend(rows)
+            return rows
+
+        pipeline = IngestPipeline(
+            download=service.download,
+            extract=fake_extract,
+            embed=fake_embed,
+            write=write,
+            prepare=prepare,
+            on_file_done=lambda job: done.__setitem__(job.file["id"], len(job.inserted)),
+            extract_format=extract_format,
+            download_workers=3,
+            extract_workers=extract_workers,
+            batch_size=2,
+            queue_size=1,
+        )
+        stats = pipeline.run(service.list_files())
+        return stats, written, done, pipeline
+
+
+def check_results(stats, written, done):
+    assert stats == {"files": 5, "failed": 1, "chunks": 6, "inserted": 6}
+    assert done == {"DAP/faq.pdf": 2, "DAP/manual.pdf": 3, "LBTR/lbtr.pdf": 1, "Vacio/vacio.pdf": 0}
+    by_source = {}
+    for row in written:
+        by_source.setdefault(row["metadata"]["source"], []).append(row["metadata"]["chunk_index"])
+        assert row["embedding"] == [float(len(row["content"])), 1.0]
+    assert sorted(by_source["manual.pdf"]) == [0, 1, 2]
+    assert by_source["lbtr.pdf"] == [0]
+    assert {row["metadata"]["category"] for row in written} == {"DAP", "LBTR"}
+
+
+def test_pipeline_with_process_pool():
+    stats, written, done, pipeline = run_pipeline(extract_workers=2)
+    check_results(stats, written, done)
+    summary = pipeline.timer.summary()
+    assert summary["extract"]["calls"] == 4
+    assert summary["embed"]["items"] == 6
+
+
+def test_pipeline_inline_extraction():
+    stats, written, done, _ = run_pipeline(extract_workers=0)
+    check_results(stats, written, done)
+
+
+def test_extract_time_per_format():
+    stats, written, done, pipeline = run_pipeline(
+        extract_workers=0, extract_format=lambda job: "faq" if job.file["name"] == "faq.pdf" else "pdf")
+    check_results(stats, written, done)
+    summary = pipeline.timer.summary()
+    assert "extract" not in summary
+    assert summary["extract:pdf"]["calls"] == 3
+    assert summary["extract:faq"]["items"] == 2
+
+
+def test_failed_prepare_skips_only_that_file():
+    stats, written, done, _ = run_pipeline(extract_workers=2, prepare_fails={"faq.pdf"})
+    assert stats == {"files": 5, "failed": 2, "chunks": 4, "inserted": 4}
+    assert done == {"DAP/manual.pdf": 3, "LBTR/lbtr.pdf": 1, "Vacio/vacio.pdf": 0}
+    assert {row["metadata"]["source"] for row in written} == {"manual.pdf", "lbtr.pdf"}
+
+
+def test_failed_listing_does_not_hang():
+    def files():
+        yield {"id": "a", "name": "a.txt", "path": "a"}
+        raise IOError("listado interrumpido")
+
+    def download(file):
+        fd, path = tempfile.mkstemp()
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write("Depósito a plazo.\n\nTasa fija.")
+        return path
+
+    written, errors = [], []
+
+    def write(rows):
+        written.extend(rows)
+        return rows
+
+    pipeline = IngestPipeline(download=download, extract=fake_extract, embed=fake_embed, write=write,
+                              download_workers=2, extract_workers=0, queue_size=1)
+
+    def run():
+        try:
+            pipeline.run(files())
+        except IOError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout=10)
+    assert not thread.is_alive(), "el pipeline quedó bloqueado"
+    # El archivo recibido antes del error se procesa y el error se relanza
+    assert len(written) == 2 and pipeline.stats["inserted"] == 2
+    assert [str(e) for e in errors] == ["listado interrumpido"]
+
+
+if __name__ == "__main__":
+    test_pipeline_with_process_pool()
+    test_pipeline_inline_extraction()
+    test_extract_time_per_format()
+    test_failed_prepare_skips_only_that_file()
+    test_failed_listing_does_not_hang()
+    print("OK")
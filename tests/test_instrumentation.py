@@ -0,0 +1,120 @@
+import logging
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'vector-tools'))
+
+import instrumentation
+from instrumentation import Registry, log_event, span
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append((record.levelno, record.getMessage()))
+
+
+def capture(level=logging.INFO):
+    handler = ListHandler()
+    instrumentation.logger.addHandler(handler)
+    instrumentation.logger.setLevel(level)
+    return handler
+
+
+def test_histogram_exposition():
+    registry = Registry()
+    histogram = registry.histogram("latency_seconds", "Latencia", ("category",), buckets=(0.1, 1.0))
+    counter = registry.counter("errors_total", "Errores", ("stage",))
+    histogram.observe(0.05, category='Tarjetas "Crédito"')
+    histogram.observe(0.5, category='Tarjetas "Crédito"')
+    histogram.observe(5, category='Tarjetas "Crédito"')
+    counter.inc(stage="rpc")
+    text = registry.render()
+    assert '# TYPE latency_seconds histogram' in text
+    assert 'latency_seconds_bucket{category="Tarjetas \\"Crédito\\"",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{category="Tarjetas \\"Crédito\\"",le="1"} 2' in text
+    assert 'latency_seconds_bucket{category="Tarjetas \\"Crédito\\"",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{category="Tarjetas \\"Crédito\\""} 3' in text
+    assert 'errors_total{stage="rpc"} 1' in text
+
+
+def test_spans_share_sampling_and_count_errors():
+    handler = capture()
+    original = instrumentation.SAMPLE_RATE
+    try:
+        instrumentation.SAMPLE_RATE = 0.0
+        before = instrumentation.STAGE_SECONDS.count(stage="rpc", category="DAP")
+        with span("search", category="DAP"):
+            with span("rpc", category="DAP"):
+                pass
+        assert instrumentation.STAGE_SECONDS.count(stage="rpc", category="DAP") == before + 1
+        # Sin muestreo no se registra nada, pero los errores siempre
+        assert handler.messages == []
+        try:
+            with span("rpc", category="DAP"):
+                raise RuntimeError("RPC caída")
+        except RuntimeError:
+            pass
+        assert instrumentation.STAGE_ERRORS.value(stage="rpc", category="DAP") >= 1
+        assert len(handler.messages) == 1 and '"span_error"' in handler.messages[0][1]
+
+        instrumentation.SAMPLE_RATE = 1.0
+        handler.messages.clear()
+        with span("search", category="LBTR"):
+            log_event("search", consulta="¿qué es LBTR?")
+        events = [message for _, message in handler.messages]
+        assert '"consulta": "¿qué es LBTR?"' in events[0]
+        trace_ids = {message.rsplit('"trace_id": ', 1)[1] for message in events}
+        assert len(events) == 2 and len(trace_ids) == 1
+    finally:
+        instrumentation.SAMPLE_RATE = original
+        instrumentation.logger.removeHandler(handler)
+
+
+def test_debug_dumps_are_not_serialized_below_debug():
+    class Exploding:
+        def __str__(self):
+            raise AssertionError("no debería serializarse")
+
+    handler = capture(logging.INFO)
+    try:
+        log_event("backend_response", logging.DEBUG, rows=Exploding())
+        assert handler.messages == []
+        instrumentation.logger.setLevel(logging.DEBUG)
+        log_event("backend_response", logging.DEBUG, rows=[{"id": 1}])
+        assert handler.messages == [(logging.DEBUG, '{"event": "backend_response", "rows": [{"id": 1}]}')]
+    finally:
+        instrumentation.logger.removeHandler(handler)
+        instrumentation.logger.setLevel(logging.NOTSET)
+
+
+def test_will_log_follows_level_and_sampling():
+    handler = capture(logging.INFO)
+    original = instrumentation.SAMPLE_RATE
+    try:
+        assert not instrumentation.will_log(logging.DEBUG)
+        assert instrumentation.will_log(logging.WARNING) and instrumentation.will_log(sample=False)
+        instrumentation.SAMPLE_RATE = 0.0
+        with span("search", category="DAP"):
+            assert not instrumentation.will_log()
+        instrumentation.SAMPLE_RATE = 1.0
+        with span("search", category="DAP"):
+            assert instrumentation.will_log()
+            # Dentro de una traza la decisión es la de la traza
+            instrumentation.SAMPLE_RATE = 0.0
+            assert instrumentation.will_log()
+    finally:
+        instrumentation.SAMPLE_RATE = original
+        instrumentation.logger.removeHandler(handler)
+        instrumentation.logger.setLevel(logging.NOTSET)
+
+
+if __name__ == "__main__":
+    test_histogram_exposition()
+    test_spans_share_sampling_and_count_errors()
+    test_debug_dumps_are_not_serialized_below_debug()
+    test_will_log_follows_level_and_sampling()
+    print("OK")
@@ -0,0 +1,90 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'vector-tools'))
+
+from retrieval_backends import LocalBackend
+from vector_snapshot import load_snapshot, write_snapshot_rows
+
+
+def make_rows(n=300, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    categories = ["DAP", "LBTR", "Tarjetas de Crédito"]
+    return [
+        {
+            "id": i,
+            "content": f"chunk {i}",
+            "metadata": {"source": f"doc{i % 7}.pdf", "chunk_index": i, "category": categories[i % 3]},
+            "embedding": rng.normal(size=dim).tolist(),
+        }
+        for i in range(n)
+    ]
+
+
+def brute_force(rows, query, threshold, count, category=None):
+    query = np.asarray(query) / np.linalg.norm(query)
+    scored = []
+    for row in rows:
+        if category and row["metadata"]["category"] != category:
+            continue
+        vector = np.asarray(row["embedding"])
+        similarity = float(vector @ query / np.linalg.norm(vector))
+        if similarity > threshold:
+            scored.append((similarity, row["id"]))
+    return [row_id for _, row_id in sorted(scored, reverse=True)[:count]]
+
+
+def test_local_backend_matches_brute_force():
+    rows = make_rows()
+    query = np.random.default_rng(1).normal(size=32)
+    with tempfile.TemporaryDirectory() as path:
+        write_snapshot_rows(path, rows)
+        backend = LocalBackend.from_path(path)
+        for category in [None, "DAP", "Tarjetas de Crédito"]:
+            results = backend.match(query.tolist(), 0.1, 5, category=category)
+            assert [r["id"] for r in results] == brute_force(rows, query, 0.1, 5, category)
+            assert set(results[0]) == {"id", "content", "metadata", "similarity"}
+            if category:
+                assert all(r["metadata"]["category"] == category for r in results)
+        assert backend.match(query.tolist(), 0.1, 5, category="Inexistente") == []
+        assert backend.match(query.tolist(), 0.99, 5) == []
+
+
+def test_snapshot_round_trip():
+    rows = make_rows(n=10)
+    rows[3]["content"] = "Cuenta con cláusula LBTR — ñandú"
+    with tempfile.TemporaryDirectory() as path:
+        write_snapshot_rows(path, rows, extra_manifest={"model": "all-MiniLM-L6-v2"})
+        snapshot = load_snapshot(path)
+        assert snapshot.manifest["count"] == 10
+        assert snapshot.manifest["dim"] == 32
+        assert snapshot.manifest["model"] == "all-MiniLM-L6-v2"
+        assert isinstance(snapshot.embeddings, np.memmap)
+        loaded = {row["id"]: row for row in snapshot.rows}
+        assert loaded[3]["content"] == "Cuenta con cláusula LBTR — ñandú"
+        assert loaded[4]["metadata"] == rows[4]["metadata"]
+        for category, (start, end) in snapshot.categories.items():
+            assert all(row["metadata"]["category"] == category for row in snapshot.rows[start:end])
+
+
+def test_quantized_snapshots_keep_ranking():
+    rows = make_rows()
+    query = np.random.default_rng(2).normal(size=32)
+    expected = brute_force(rows, query, -1.0, 10, "LBTR")
+    for dtype in ["float16", "int8"]:
+        with tempfile.TemporaryDirectory() as path:
+            write_snapshot_rows(path, rows, dtype=dtype)
+            backend = LocalBackend.from_path(path)
+            results = backend.match(query.tolist(), -1.0, 10, category="LBTR")
+            overlap = len({r["id"] for r in results} & set(expected))
+            assert overlap >= 8, (dtype, overlap)
+
+
+if __name__ == "__main__":
+    test_local_backend_matches_brute_force()
+    test_snapshot_round_trip()
+    test_quantized_snapshots_keep_ranking()
+    print("OK")
@@ -0,0 +1,89 @@
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'vector-tools'))
+
+import get_vector_docs
+from get_vector_docs import buscar_documentos_multiples_async, fusionar_resultados
+
+
+def row(row_id, source, chunk_index, similarity, category):
+    return {
+        "id": row_id,
+        "content": f"contenido {row_id}",
+        "metadata": {"source": source, "chunk_index": chunk_index, "category": category},
+        "similarity": similarity,
+    }
+
+
+def test_fusionar_resultados_dedupes_and_keeps_each_search():
+    dap = [row(1, "dap.pdf", 0, 0.9, "DAP"), row(2, "dap.pdf", 1, 0.8, "DAP"), row(3, "dap.pdf", 2, 0.7, "DAP")]
+    # El mismo chunk devuelto por otra búsqueda (p. ej. sin categoría) con otra similitud
+    general = [row(2, "dap.pdf", 1, 0.85, "DAP")]
+    lbtr = [row(10, "lbtr.pdf", 0, 0.3, "LBTR")]
+    merged = fusionar_resultados([dap, general, lbtr], 3)
+    assert [r["id"] for r in merged] == [1, 2, 10]
+    assert merged[1]["similarity"] == 0.85
+    # Con menos cupo que búsquedas, igual entra el mejor de cada una
+    assert [r["id"] for r in fusionar_resultados([dap, lbtr], 2)] == [1, 10]
+    assert fusionar_resultados([[], []], 5) == []
+
+
+class SlowBackend:
+    name = "slow"
+
+    def __init__(self, rows, delay=0.2, fail=()):
+        self.rows = rows
+        self.delay = delay
+        self.fail = fail
+        self.categories = []
+
+    async def amatch(self, query_embedding, match_threshold, match_count, category=None, query_text=None):
+        self.categories.append(category)
+        await asyncio.sleep(self.delay)
+        if category in self.fail:
+            raise RuntimeError("RPC caída")
+        return [r for r in self.rows if r["metadata"]["category"] == category][:match_count]
+
+
+def test_multiple_searches_run_concurrently():
+    rows = [row(1, "dap.pdf", 0, 0.6, "DAP"), row(2, "lbtr.pdf", 0, 0.5, "LBTR"),
+            row(3, "fogape.pdf", 4, 0.4, "Crédito Comercial FOGAPE")]
+    backend = SlowBackend(rows, fail=("Cartola FFMM",))
+    original = get_vector_docs.get_retrieval_backend
+    get_vector_docs.get_retrieval_backend = lambda: backend
+    try:
+        _check_multiple_searches(backend)
+    finally:
+        get_vector_docs.get_retrieval_backend = original
+
+
+def _check_multiple_searches(backend):
+    busquedas = [
+        {"consulta": f"{categoria}: plazos", "query_embedding": [0.1, 0.2], "numero_resultados": 5,
+         "umbral_similitud": 0.1, "categoria": categoria}
+        for categoria in ["DAP", "LBTR", "Crédito Comercial FOGAPE", "Cartola FFMM"]
+    ]
+    start = time.perf_counter()
+    texto = asyncio.run(buscar_documentos_multiples_async(busquedas))
+    elapsed = time.perf_counter() - start
+    # Cuatro consultas de 0.2 s en paralelo, no 0.8 s en serie
+    assert elapsed < 0.6, elapsed
+    assert sorted(backend.categories) == sorted(b["categoria"] for b in busquedas)
+    assert texto.index("Producto: DAP") < texto.index("Producto: LBTR") < texto.index("Producto: Crédito")
+    assert "Fuente: fogape.pdf" in texto
+
+    backend.fail = ("DAP", "LBTR", "Crédito Comercial FOGAPE", "Cartola FFMM")
+    try:
+        asyncio.run(buscar_documentos_multiples_async(busquedas))
+        assert False, "debería relanzar el error si fallan todas las búsquedas"
+    except RuntimeError:
+        pass
+
+
+if __name__ == "__main__":
+    test_fusionar_resultados_dedupes_and_keeps_each_search()
+    test_multiple_searches_run_concurrently()
+    print("OK")
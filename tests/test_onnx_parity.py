@@ -0,0 +1,51 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'vector-tools'))
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("onnx")
+pytest.importorskip("torch")
+pytest.importorskip("sentence_transformers")
+
+from embedding_engines import OnnxEngine, TorchEngine
+from tiny_model import make_tiny_model
+
+TEXTS = [
+    "hola",
+    "¿Cómo pago la tarjeta de crédito?",
+    "Cuenta corriente en dólares para empresas",
+    "tarjeta de credito " * 30,
+]
+
+
+def cosine_rows(a, b):
+    return np.sum(a * b, axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+
+
+def test_onnx_engines_agree_with_torch():
+    model_name = os.getenv("EMBEDDING_PARITY_MODEL")
+    with tempfile.TemporaryDirectory() as path:
+        model_name = model_name or make_tiny_model(path)
+        reference = TorchEngine(model_name).encode(TEXTS, batch_size=2)
+
+        onnx_engine = OnnxEngine(model_name, threads=1, model_dir=os.path.join(path, "onnx"))
+        embeddings = onnx_engine.encode(TEXTS, batch_size=2)
+        assert embeddings.shape == reference.shape
+        assert cosine_rows(embeddings, reference).min() > 0.9999
+        np.testing.assert_allclose(onnx_engine.encode(TEXTS[1]), reference[1], atol=1e-4)
+
+        quantized = OnnxEngine(model_name, quantize="int8", model_dir=os.path.join(path, "onnx"))
+        assert cosine_rows(quantized.encode(TEXTS), reference).min() > 0.97
+
+        torch_int8 = TorchEngine(model_name, quantize="int8")
+        assert cosine_rows(torch_int8.encode(TEXTS), reference).min() > 0.97
+
+
+if __name__ == "__main__":
+    test_onnx_engines_agree_with_torch()
+    print("OK")
@@ -0,0 +1,55 @@
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("sentence_transformers")
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'vector-tools'))
+
+from chunking import CharChunker
+from tiny_model import load_process_docs
+
+process_docs = load_process_docs()
+
+
+def chunker_used(call):
+    """Chunker con el que `call` prepara los chunks (sin extraer ni escribir nada)."""
+    used = []
+
+    def prepare_chunks(pdf_path, chunker, timer):
+        used.append(chunker)
+        return 0, []
+
+    original = process_docs.prepare_chunks
+    process_docs.prepare_chunks = prepare_chunks
+    try:
+        call()
+    finally:
+        process_docs.prepare_chunks = original
+    return used[0]
+
+
+def test_resolve_chunker():
+    custom = CharChunker(500, 50)
+    assert process_docs.resolve_chunker() is process_docs.text_chunker
+    assert process_docs.resolve_chunker(custom, 1000, 200) is custom
+    legacy = process_docs.resolve_chunker(chunk_size=800)
+    assert isinstance(legacy, CharChunker) and (legacy.chunk_size, legacy.overlap) == (800, 200)
+
+
+def test_process_pdf_keeps_positional_chunk_size_and_overlap():
+    # Firma anterior: process_pdf(path, chunk_size, overlap, category)
+    chunker = chunker_used(lambda: process_docs.process_pdf("dap.pdf", 1000, 100, "DAP"))
+    assert isinstance(chunker, CharChunker) and (chunker.chunk_size, chunker.overlap) == (1000, 100)
+
+    custom = CharChunker(500, 50)
+    assert chunker_used(lambda: process_docs.process_pdf("dap.pdf", category="DAP", chunker=custom)) is custom
+    assert chunker_used(lambda: process_docs.process_pdf("dap.pdf")) is process_docs.text_chunker
+
+
+if __name__ == "__main__":
+    test_resolve_chunker()
+    test_process_pdf_keeps_positional_chunk_size_and_overlap()
+    print("OK")
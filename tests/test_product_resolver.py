@@ -0,0 +1,92 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'vector-tools'))
+
+from product_resolver import ProductResolver, clave_producto
+from productos_bancarios import ALIAS_PRODUCTOS, PRODUCTOS_BANCARIOS
+
+
+def make_resolver(**kwargs):
+    return ProductResolver(PRODUCTOS_BANCARIOS, ALIAS_PRODUCTOS, **kwargs)
+
+
+def test_clave_producto():
+    assert clave_producto("  Crédito   Comercial-FOGAPE ") == "credito comercial fogape"
+
+
+def test_exact_name_wins_over_longer_category():
+    resolver = make_resolver()
+    ranked = resolver.resolve("Credito Comercial")
+    assert ranked[0] == ("Credito Comercial", 1.0)
+    assert ranked[1][0] == "Crédito Comercial FOGAPE"
+    assert resolver.best("CRÉDITO COMERCIAL FOGAPE") == "Crédito Comercial FOGAPE"
+
+
+def test_aliases_typos_and_partial_names():
+    resolver = make_resolver()
+    assert resolver.best("depósito a plazo") == "DAP"
+    assert resolver.best("transferencias LBTR") == "LBTR"
+    assert resolver.best("tarjetas de credto") == "Tarjetas de Crédito"
+    assert resolver.best("hipotecrio") == "Consulta Credito Hipotecario"
+    assert resolver.best("boton pago") == "Manual Boton de Pago"
+    # Nombre ambiguo: ambas categorías en la lista, ninguna con puntaje exacto
+    assert {category for category, _ in resolver.resolve("dólares")[:2]} == {"Compra Dolares", "Venta Dolares"}
+    assert resolver.best("dólares") is None
+    assert resolver.resolve("seguro de vida") == []
+    assert resolver.best("") is None
+
+
+def test_extra_words_of_other_products_do_not_match():
+    resolver = make_resolver()
+    # Comparten una palabra con un alias, pero nombran otro producto
+    assert resolver.resolve("tarjeta debito") == []
+    assert resolver.resolve("clave dinamica") == []
+    assert resolver.best("recuperar mi clave") == "Reset y Recuperacion Clave"
+    assert resolver.best("transferencias LBTR de hoy") == "LBTR"
+
+
+def test_ambiguous_name_has_no_best_category():
+    resolver = make_resolver()
+    ranked = resolver.resolve("credito")
+    assert len(ranked) == 3 and ranked[0][1] - ranked[1][1] < resolver.ambiguity_margin
+    assert resolver.best("credito") is None
+    # Con el margen en 0 se elige la primera
+    assert make_resolver(ambiguity_margin=0).best("credito") == ranked[0][0]
+    # Un nombre exacto no es ambiguo aunque otra categoría lo contenga
+    assert resolver.best("Credito Comercial") == "Credito Comercial"
+
+
+def test_embedding_fallback_uses_category_centroids():
+    categories = list(PRODUCTOS_BANCARIOS)
+    vectors = {category: np.eye(len(categories))[i] for i, category in enumerate(categories)}
+    calls = []
+
+    def embed(texto):
+        calls.append(texto)
+        category = ALIAS_PRODUCTOS.get(texto, texto)
+        return vectors[category] if category in vectors else np.full(len(categories), 0.01)
+
+    resolver = make_resolver(embed=embed)
+    assert resolver.best("seguro de vida") is None
+    # Los centroides se calculan una sola vez, con el nombre y los alias de cada categoría
+    assert len(calls) == len(categories) + len(ALIAS_PRODUCTOS) + 1
+    query = vectors["Cartola FFMM"] * 0.8 + vectors["DAP"] * 0.2
+    ranked = resolver.resolve("inversiones", query_embedding=query.tolist())
+    assert [category for category, _ in ranked] == ["Cartola FFMM"]
+    assert len(calls) == len(categories) + len(ALIAS_PRODUCTOS) + 1
+
+    precomputed = make_resolver(centroids=vectors)
+    assert precomputed.best("inversiones", query_embedding=query.tolist()) == "Cartola FFMM"
+
+
+if __name__ == "__main__":
+    test_clave_producto()
+    test_exact_name_wins_over_longer_category()
+    test_aliases_typos_and_partial_names()
+    test_extra_words_of_other_products_do_not_match()
+    test_ambiguous_name_has_no_best_category()
+    test_embedding_fallback_uses_category_centroids()
+    print("OK")
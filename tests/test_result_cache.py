@@ -0,0 +1,103 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'vector-tools'))
+
+from result_cache import SemanticResultCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def near(angle):
+    """Vector unitario a `angle` radianes del eje x."""
+    return np.array([np.cos(angle), np.sin(angle), 0.0], dtype=np.float32)
+
+
+def test_threshold_and_category():
+    cache = SemanticResultCache(threshold=0.95, clock=FakeClock())
+    query = np.array([1.0, 0.0, 0.0])
+    cache.put("DAP", query * 3, "resultado DAP")
+
+    # La similitud es coseno: la escala del embedding no importa
+    assert cache.get("DAP", query) == "resultado DAP"
+    assert cache.get("dap", near(0.2)) == "resultado DAP"  # cos(0.2) ≈ 0.98
+    assert cache.get("DAP", near(0.4)) is None  # cos(0.4) ≈ 0.92
+    # Cada categoría (y la búsqueda sin categoría) tiene sus propias entradas
+    assert cache.get("LBTR", query) is None and cache.get(None, query) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 3, 1)
+
+
+def test_ttl_expiry():
+    clock = FakeClock()
+    cache = SemanticResultCache(ttl=60, clock=clock)
+    cache.put("DAP", [1.0, 0.0], "resultado")
+    clock.now += 59
+    assert cache.get("DAP", [1.0, 0.0]) == "resultado"
+    clock.now += 2
+    assert cache.get("DAP", [1.0, 0.0]) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_bounded_per_category():
+    cache = SemanticResultCache(max_entries_per_category=2, clock=FakeClock())
+    for i, vector in enumerate(np.eye(3)):
+        cache.put("DAP", vector, f"resultado {i}")
+    cache.put("LBTR", np.eye(3)[0], "resultado LBTR")
+    # Se descarta la entrada más antigua de DAP; LBTR no se ve afectada
+    assert cache.get("DAP", np.eye(3)[0]) is None
+    assert cache.get("DAP", np.eye(3)[2]) == "resultado 2"
+    assert cache.get("LBTR", np.eye(3)[0]) == "resultado LBTR"
+    assert cache.stats()["entries"] == 3
+
+
+def test_invalidated_when_index_version_changes():
+    clock = FakeClock()
+    versions = ["v1"]
+    calls = []
+
+    def version_provider():
+        calls.append(clock.now)
+        return versions[0]
+
+    cache = SemanticResultCache(version_provider=version_provider, version_check_interval=30, clock=clock)
+    assert cache.get("DAP", [1.0, 0.0]) is None
+    cache.put("DAP", [1.0, 0.0], "resultado v1")
+
+    # La versión se consulta como máximo cada 30 segundos
+    versions[0] = "v2"
+    clock.now += 10
+    assert cache.get("DAP", [1.0, 0.0]) == "resultado v1"
+    assert len(calls) == 1
+
+    clock.now += 30
+    assert cache.get("DAP", [1.0, 0.0]) is None
+    assert len(calls) == 2
+    stats = cache.stats()
+    assert stats["invalidations"] == 1 and stats["index_version"] == "v2"
+
+    # Si la versión no se puede leer, la caché se mantiene
+    cache.put("DAP", [1.0, 0.0], "resultado v2")
+
+    def failing():
+        raise IOError("Supabase no disponible")
+
+    cache.version_provider = failing
+    clock.now += 30
+    assert cache.get("DAP", [1.0, 0.0]) == "resultado v2"
+
+
+if __name__ == "__main__":
+    test_threshold_and_category()
+    test_ttl_expiry()
+    test_bounded_per_category()
+    test_invalidated_when_index_version_changes()
+    print("OK")
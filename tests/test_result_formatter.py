@@ -0,0 +1,80 @@
+import os
+import random
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'vector-tools'))
+
+from chunking import CharChunker
+from result_formatter import compactar_resultados, describir_fuente, estimar_tokens, unir_textos
+
+WORDS = ["el", "depósito", "renueva", "al", "vencimiento.", "la", "tasa", "es", "fija,", "plazo", "mínimo", "días."]
+
+
+def make_text(words=800, seed=0):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def rows_for(text, source, similarities, pages=None):
+    _, chunks = CharChunker(1000, 200).chunk_document(iter([(1, text)]))
+    rows = []
+    for (index, content, _), similarity in zip(chunks, similarities):
+        metadata = {"source": source, "chunk_index": index, "category": "DAP"}
+        if pages:
+            metadata.update(page_start=pages[index][0], page_end=pages[index][1])
+        rows.append({"id": len(rows), "content": content, "metadata": metadata, "similarity": similarity})
+    return chunks, rows
+
+
+def test_unir_textos_removes_chunker_overlap():
+    text = make_text()
+    chunks, _ = rows_for(text, "dap.pdf", [])
+    merged = chunks[0][1]
+    for _, content, _ in chunks[1:]:
+        merged = unir_textos(merged, content)
+    assert merged == text
+    assert unir_textos("uno dos", "tres cuatro") == "uno dos\ntres cuatro"
+    assert unir_textos("uno dos tres", "dos") == "uno dos tres"
+
+
+def test_adjacent_chunks_merge_into_one_passage():
+    text = make_text()
+    pages = {0: (1, 1), 1: (1, 2), 2: (2, 2)}
+    chunks, rows = rows_for(text, "dap.pdf", [0.8, 0.7, 0.6], pages)
+    selected = [rows[1], rows[0], rows[2]]
+    passages, stats = compactar_resultados(selected, token_budget=10000)
+    assert len(passages) == 1
+    assert passages[0].similarity == 0.8
+    assert stats["merged"] == 2
+    assert passages[0].content == unir_textos(unir_textos(chunks[0][1], chunks[1][1]), chunks[2][1])
+    assert stats["tokens_saved"] == stats["tokens_in"] - estimar_tokens(passages[0].content) > 0
+    assert describir_fuente(passages[0]) == "dap.pdf, págs. 1-2"
+
+
+def test_budget_orders_by_density_and_trims():
+    long_text = make_text(400, seed=1)
+    rows = [
+        {"id": 1, "content": long_text, "metadata": {"source": "a.pdf", "chunk_index": 0}, "similarity": 0.6},
+        {"id": 2, "content": "La tasa del DAP es fija durante todo el plazo.",
+         "metadata": {"source": "b.pdf", "chunk_index": 3}, "similarity": 0.5},
+        {"id": 3, "content": make_text(300, seed=2), "metadata": {"source": "c.pdf", "chunk_index": 0},
+         "similarity": 0.4},
+    ]
+    passages, stats = compactar_resultados(rows, token_budget=300, min_passage_tokens=40)
+    # El chunk corto y relevante tiene más puntaje por token y va primero
+    assert [p.source for p in passages] == ["b.pdf", "a.pdf"]
+    assert passages[1].trimmed
+    assert stats["trimmed"] == 1 and stats["dropped"] == 1
+    assert stats["tokens_out"] <= 300
+    assert long_text.startswith(passages[1].content.rstrip(" …"))
+
+    # El primer pasaje entra aunque supere el presupuesto, recortado
+    passages, stats = compactar_resultados(rows[:1], token_budget=50)
+    assert len(passages) == 1 and stats["tokens_out"] <= 50
+
+
+if __name__ == "__main__":
+    test_unir_textos_removes_chunker_overlap()
+    test_adjacent_chunks_merge_into_one_passage()
+    test_budget_orders_by_density_and_trims()
+    print("OK")
@@ -0,0 +1,116 @@
+import asyncio
+import os
+import sys
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(root, 'vector-tools'))
+sys.path.append(os.path.join(root, 'chatbot-contact-center'))
+
+import get_vector_docs
+import search_tools
+from embedding_cache import normalizar_consulta
+from result_cache import SemanticResultCache
+from retrieval_backends import set_retrieval_backend
+
+CONSULTA = "¿Cuál es el plazo mínimo?"
+
+
+class FakeBackend:
+    name = "fake"
+
+    def __init__(self, delay=0.0, error=None, rows=()):
+        self.delay = delay
+        self.error = error
+        self.rows = list(rows)
+
+    async def amatch(self, query_embedding, match_threshold, match_count, category=None, query_text=None):
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self.rows
+
+
+def search(backend, timeout=15.0, producto="DAP"):
+    """Ejecuta la herramienta con `backend`, sin modelo de embeddings ni caché de resultados en Supabase."""
+    # Embedding de la consulta ya cacheado: no se carga el modelo
+    get_vector_docs.query_cache.put(normalizar_consulta(f"{producto}: {CONSULTA}"), [1.0, 0.0, 0.0])
+    original_timeout, original_cache = get_vector_docs.SEARCH_TIMEOUT, search_tools.result_cache
+    get_vector_docs.SEARCH_TIMEOUT = timeout
+    search_tools.result_cache = SemanticResultCache(version_provider=None)
+    set_retrieval_backend(backend)
+    try:
+        return asyncio.run(search_tools.search_documents_tool_async(producto, CONSULTA))
+    finally:
+        set_retrieval_backend(None)
+        get_vector_docs.SEARCH_TIMEOUT = original_timeout
+        search_tools.result_cache = original_cache
+
+
+def test_search_timeout_returns_error_message():
+    start = time.perf_counter()
+    assert search(FakeBackend(delay=2.0), timeout=0.1) == search_tools.MENSAJE_ERROR_BUSQUEDA
+    # La búsqueda se cancela al vencer el timeout, sin esperar al backend
+    assert time.perf_counter() - start < 1.0
+
+
+def test_search_error_returns_error_message():
+    assert search(FakeBackend(error=RuntimeError("RPC caída"))) == search_tools.MENSAJE_ERROR_BUSQUEDA
+
+
+def test_ambiguous_product_searches_without_category():
+    calls = []
+
+    class RecordingBackend(FakeBackend):
+        async def amatch(self, query_embedding, match_threshold, match_count, category=None, query_text=None):
+            calls.append(category)
+            return []
+
+    search(RecordingBackend(), producto="depósito a plazo")
+    # "credito" resuelve casi igual a tres categorías: no se filtra por ninguna
+    search(RecordingBackend(), producto="credito")
+    assert calls == ["DAP", None]
+
+
+def test_unresolved_products_each_run_their_own_search():
+    calls = []
+
+    class RecordingBackend(FakeBackend):
+        async def amatch(self, query_embedding, match_threshold, match_count, category=None, query_text=None):
+            calls.append((category, query_text))
+            return []
+
+    productos = ["credito", "dólares", "depósito a plazo", "DAP"]
+    for i, producto in enumerate(productos):
+        get_vector_docs.query_cache.put(normalizar_consulta(f"{producto}: {CONSULTA}"), [1.0, float(i), 0.0])
+    original_cache = search_tools.result_cache
+    search_tools.result_cache = SemanticResultCache(version_provider=None)
+    set_retrieval_backend(RecordingBackend())
+    try:
+        asyncio.run(search_tools.search_multiple_products_tool(productos, CONSULTA))
+    finally:
+        set_retrieval_backend(None)
+        search_tools.result_cache = original_cache
+    # Los dos productos ambiguos se buscan por separado, sin categoría; los dos de DAP comparten una búsqueda
+    assert sorted(calls, key=str) == sorted([
+        (None, f"credito: {CONSULTA}"),
+        (None, f"dólares: {CONSULTA}"),
+        ("DAP", f"depósito a plazo: {CONSULTA}"),
+    ], key=str)
+
+
+def test_search_results_and_empty_results():
+    row = {"id": 1, "content": "El plazo mínimo es de 30 días.", "similarity": 0.8,
+           "metadata": {"source": "dap.pdf", "chunk_index": 0, "category": "DAP"}}
+    texto = search(FakeBackend(rows=[row]))
+    assert "30 días" in texto and "dap.pdf" in texto
+    assert search(FakeBackend()).startswith("No encontré información específica")
+
+
+if __name__ == "__main__":
+    test_search_timeout_returns_error_message()
+    test_search_error_returns_error_message()
+    test_ambiguous_product_searches_without_category()
+    test_unresolved_products_each_run_their_own_search()
+    test_search_results_and_empty_results()
+    print("OK")
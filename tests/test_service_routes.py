@@ -0,0 +1,57 @@
+import os
+import sys
+import tempfile
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(root, 'utils'))
+sys.path.append(os.path.join(root, 'vector-tools'))
+
+from fastapi import FastAPI
+from fastapi.staticfiles import StaticFiles
+from fastapi.testclient import TestClient
+
+import instrumentation
+from service_routes import add_service_routes
+
+
+def web_app(directory):
+    """App como la de `get_fast_api_app(..., web=True)`: la interfaz web montada en "/"."""
+    app = FastAPI()
+    app.mount("/", StaticFiles(directory=directory, html=True), name="static")
+    return app
+
+
+def test_ready_is_served_before_web_interface():
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "index.html"), "w", encoding="utf-8") as f:
+            f.write("<html>ADK</html>")
+        status = {"ready": False, "error": None, "timings_ms": {}}
+        app = web_app(tmp)
+        add_service_routes(app, lambda: status)
+        client = TestClient(app)
+
+        response = client.get("/ready")
+        assert response.status_code == 503 and response.json()["ready"] is False
+        status["ready"] = True
+        assert client.get("/ready").status_code == 200
+        # La interfaz web sigue respondiendo en "/"
+        assert "ADK" in client.get("/").text
+
+
+def test_metrics_is_served_before_web_interface():
+    with tempfile.TemporaryDirectory() as tmp:
+        app = web_app(tmp)
+        add_service_routes(app, lambda: {"ready": True}, instrumentation.registry.render)
+        instrumentation.STAGE_SECONDS.observe(0.02, stage="embed", category="DAP")
+
+        response = TestClient(app).get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "# TYPE search_stage_seconds histogram" in response.text
+        assert 'search_stage_seconds_count{stage="embed",category="DAP"}' in response.text
+
+
+if __name__ == "__main__":
+    test_ready_is_served_before_web_interface()
+    test_metrics_is_served_before_web_interface()
+    print("OK")
@@ -0,0 +1,101 @@
+import os
+import sys
+import tempfile
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(root, 'vector-tools'))
+
+from chunking import stream_chunks
+
+
+def write_pdf(path, pages):
+    """Escribe un PDF mínimo con una línea de texto (Helvetica) por elemento de `lines` de cada página."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        commands = ["BT", "/F1 10 Tf", "14 TL", "50 780 Td"]
+        for line in lines:
+            escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            commands.append(f"({escaped}) Tj T*")
+        commands.append("ET")
+        stream = "\n".join(commands).encode("latin-1")
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n".encode("latin-1") + stream + b"\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    data = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(data))
+        body = obj if isinstance(obj, bytes) else obj.encode("latin-1")
+        data += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(data)
+    data += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        data += f"{offset:010d} 00000 n \n".encode()
+    data += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def chunk_text(text, chunk_size, overlap):
+    """Chunker de referencia sobre el texto completo (el algoritmo original de process_docs.chunk_text)."""
+    chunks = []
+    for i in range(0, len(text), chunk_size - overlap):
+        chunk = text[i:i + chunk_size]
+        if len(chunk) > chunk_size / 2:
+            chunks.append(chunk)
+    return chunks
+
+
+def test_stream_chunks_match_full_text_chunker():
+    pages = [(1, "a" * 250), (2, ""), (3, "b" * 40), (4, "c" * 700), (5, "d" * 90)]
+    chunks = list(stream_chunks(iter(pages), chunk_size=200, overlap=50))
+    assert [text for _, text, _ in chunks] == chunk_text("".join(text for _, text in pages), 200, 50)
+    assert [index for index, _, _ in chunks] == list(range(len(chunks)))
+    # El segundo chunk (offset 150) cruza de la página 1 a la 4 pasando por la 3
+    assert chunks[0][2] == {"page_start": 1, "page_end": 1}
+    assert chunks[1][2] == {"page_start": 1, "page_end": 4}
+    assert chunks[-1][2]["page_end"] == 5
+
+
+def test_stream_chunks_consumes_pages_lazily():
+    consumed = []
+
+    def pages():
+        for number in range(1, 101):
+            consumed.append(number)
+            yield number, f"Página {number}. " * 20
+
+    stream = stream_chunks(pages(), chunk_size=300, overlap=60)
+    first = next(stream)
+    assert first[2]["page_start"] == 1
+    assert len(consumed) <= 2
+    assert sum(1 for _ in stream) > 0
+    assert len(consumed) == 100
+
+
+def test_pdf_page_iterators():
+    sys.path.append(os.path.join(root, 'utils'))
+    from document_utils import extract_text_from_pdf, iter_pdf_pages
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "manual.pdf")
+        write_pdf(path, [["Deposito a plazo", "Tasa fija"], ["Renovacion automatica"], ["Rescate anticipado"]])
+        pages = list(iter_pdf_pages(path))
+        assert [number for number, _ in pages] == [1, 2, 3]
+        assert "Tasa fija" in pages[0][1]
+        assert "Rescate anticipado" in extract_text_from_pdf(path)
+
+        chunks = list(stream_chunks(pages, chunk_size=30, overlap=5))
+        assert chunks[0][2]["page_start"] == 1
+        assert chunks[-1][2]["page_end"] == 3
+
+
+if __name__ == "__main__":
+    test_stream_chunks_match_full_text_chunker()
+    test_stream_chunks_consumes_pages_lazily()
+    test_pdf_page_iterators()
+    print("OK")
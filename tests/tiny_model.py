@@ -0,0 +1,50 @@
+import os
+
+
+def make_tiny_model(path):
+    """SentenceTransformer BERT pequeño con pesos aleatorios (no requiere descargar all-MiniLM-L6-v2)."""
+    import torch
+    from sentence_transformers import SentenceTransformer, models
+    from transformers import BertConfig, BertModel, BertTokenizer
+
+    bert_dir = os.path.join(path, "bert")
+    os.makedirs(bert_dir)
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + list("abcdefghijklmnopqrstuvwxyz¿?áéíóúñ") + \
+        ["hola", "cuenta", "tarjeta", "credito", "dolar", "pago", "##s", "##a", "##o", "##es"]
+    with open(os.path.join(bert_dir, "vocab.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(vocab))
+    BertTokenizer(os.path.join(bert_dir, "vocab.txt")).save_pretrained(bert_dir)
+    torch.manual_seed(0)
+    BertModel(BertConfig(vocab_size=len(vocab), hidden_size=64, num_hidden_layers=2, num_attention_heads=4,
+                         intermediate_size=128, max_position_embeddings=128)).save_pretrained(bert_dir)
+    model_dir = os.path.join(path, "model")
+    SentenceTransformer(modules=[
+        models.Transformer(bert_dir, max_seq_length=64),
+        models.Pooling(64),
+        models.Normalize(),
+    ]).save(model_dir)
+    return model_dir
+
+
+def load_process_docs():
+    """
+    Importa process_docs.py con un modelo pequeño, sin caché de extracción y con credenciales de Supabase de
+    relleno (los tests reemplazan el cliente). Restaura el entorno después de importarlo.
+    """
+    import importlib
+    import sys
+    import tempfile
+
+    if "process_docs" in sys.modules:
+        return sys.modules["process_docs"]
+    saved = dict(os.environ)
+    try:
+        os.environ.setdefault("SUPABASE_URL", "http://localhost")
+        os.environ.setdefault("SUPABASE_KEY", "test")
+        os.environ["EMBEDDING_MODEL_NAME"] = make_tiny_model(tempfile.mkdtemp(prefix="tiny_model_"))
+        os.environ["EMBEDDING_ENGINE"] = "torch"
+        os.environ["EXTRACTION_CACHE_DIR"] = ""
+        return importlib.import_module("process_docs")
+    finally:
+        os.environ.clear()
+        os.environ.update(saved)
@@ -0,0 +1,193 @@
+import logging
+import os
+import threading
+from collections import Counter
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
+DEFAULT_SERVICE_ACCOUNT_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'service-account.json')
+
+
+class ClientRegistry:
+    """
+    Registro compartido de clientes de Drive y Supabase.
+
+    - Los clientes se construyen de forma perezosa, en el primer uso.
+    - Las credenciales de la service account y el discovery document de Drive se cargan una vez por proceso.
+    - Cada thread obtiene su propio servicio de Drive (googleapiclient/httplib2 no son thread-safe), que
+      reutiliza su conexión HTTP keep-alive entre llamadas.
+    - El cliente de Supabase es único por proceso; su sesión httpx mantiene un pool de conexiones y es thread-safe.
+
+    `stats()` devuelve contadores de cargas, construcciones y requests para verificar que no se reconstruyen clientes.
+    La configuración se lee del entorno en el primer uso (`SERVICE_ACCOUNT_FILE`, `HTTP_TIMEOUT`, `SUPABASE_URL`,
+    `SUPABASE_KEY`), después de que los scripts hayan cargado su `.env`.
+    """
+
+    def __init__(self, service_account_file: Optional[str] = None, scopes=SCOPES,
+                 http_timeout: Optional[float] = None):
+        self._service_account_file = service_account_file
+        self.scopes = scopes
+        self._http_timeout = http_timeout
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._credentials = None
+        self._discovery_doc: Optional[str] = None
+        self._discovery_loaded = False
+        self._supabase = None
+        self._supabase_async_http = None
+        self._counters = Counter()
+
+    @property
+    def service_account_file(self) -> str:
+        return self._service_account_file or os.getenv("SERVICE_ACCOUNT_FILE", DEFAULT_SERVICE_ACCOUNT_FILE)
+
+    @property
+    def http_timeout(self) -> float:
+        """Timeout en segundos de las conexiones HTTP a Drive y Supabase."""
+        if self._http_timeout is not None:
+            return self._http_timeout
+        return float(os.getenv("HTTP_TIMEOUT", "60"))
+
+    def _count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    def drive_credentials(self):
+        """Credenciales de la service account, leídas una sola vez."""
+        with self._lock:
+            if self._credentials is None:
+                from google.oauth2 import service_account
+                self._credentials = service_account.Credentials.from_service_account_file(
+                    self.service_account_file, scopes=self.scopes)
+                self._counters["credential_loads"] += 1
+            return self._credentials
+
+    def _drive_discovery_doc(self) -> Optional[str]:
+        """Discovery document de Drive v3 incluido en googleapiclient, leído una sola vez."""
+        with self._lock:
+            if not self._discovery_loaded:
+                from googleapiclient.discovery_cache import get_static_doc
+                self._discovery_doc = get_static_doc('drive', 'v3')
+                self._discovery_loaded = True
+                self._counters["discovery_loads"] += 1
+            return self._discovery_doc
+
+    def drive_service(self):
+        """Servicio de Drive del thread actual."""
+        service = getattr(self._local, "drive_service", None)
+        if service is not None:
+            return service
+        import httplib2
+        from google_auth_httplib2 import AuthorizedHttp
+        from googleapiclient.discovery import build, build_from_document
+
+        credentials = self.drive_credentials()
+        http = AuthorizedHttp(credentials, http=httplib2.Http(timeout=self.http_timeout))
+        self._count("drive_http_connections")
+        discovery_doc = self._drive_discovery_doc()
+        try:
+            if discovery_doc:
+                service = build_from_document(discovery_doc, http=http)
+            else:
+                # Sin documento estático, build() vuelve a obtener el discovery document en cada thread
+                service = build('drive', 'v3', http=http)
+                self._count("discovery_loads")
+        except Exception as e:
+            logger.error(f"Error building Drive service: {str(e)}")
+            raise
+        self._count("drive_service_builds")
+        self._local.drive_service = service
+        return service
+
+    @staticmethod
+    def _supabase_settings():
+        url = os.getenv("SUPABASE_URL")
+        key = os.getenv("SUPABASE_KEY")
+        if not url or not key:
+            raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set as environment variables")
+        return url, key
+
+    def supabase(self):
+        """Cliente de Supabase del proceso."""
+        with self._lock:
+            if self._supabase is None:
+                from supabase import create_client
+                from supabase.lib.client_options import ClientOptions
+
+                url, key = self._supabase_settings()
+                client = create_client(url, key, options=ClientOptions(postgrest_client_timeout=self.http_timeout))
+                try:
+                    client.postgrest.session.event_hooks["request"].append(self._on_supabase_request)
+                except Exception as e:
+                    logger.warning(f"No se pudo registrar el contador de requests de Supabase: {str(e)}")
+                self._supabase = client
+                self._counters["supabase_client_builds"] += 1
+            return self._supabase
+
+    def _on_supabase_request(self, request) -> None:
+        self._count("supabase_requests")
+
+    def supabase_async_http(self):
+        """
+        Cliente httpx asíncrono para la API REST de Supabase (`/rest/v1`), con pool de conexiones keep-alive.
+        Lo usan las búsquedas asíncronas para llamar a las RPC sin bloquear el event loop.
+        """
+        with self._lock:
+            if self._supabase_async_http is None:
+                import httpx
+
+                url, key = self._supabase_settings()
+                self._supabase_async_http = httpx.AsyncClient(
+                    base_url=f"{url.rstrip('/')}/rest/v1",
+                    headers={"apikey": key, "Authorization": f"Bearer {key}"},
+                    timeout=self.http_timeout,
+                    limits=httpx.Limits(max_connections=int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20"))),
+                    event_hooks={"request": [self._on_supabase_async_request]},
+                )
+                self._counters["supabase_async_client_builds"] += 1
+            return self._supabase_async_http
+
+    async def _on_supabase_async_request(self, request) -> None:
+        self._count("supabase_requests")
+
+    def stats(self) -> Dict[str, int]:
+        """Contadores de credenciales/discovery cargados, clientes construidos, conexiones y requests."""
+        with self._lock:
+            return dict(self._counters)
+
+    def reset(self) -> None:
+        """Descarta los clientes cacheados (los servicios de Drive de otros threads se descartan al reconstruirse)."""
+        with self._lock:
+            self._credentials = None
+            self._discovery_doc = None
+            self._discovery_loaded = False
+            self._supabase = None
+            self._supabase_async_http = None
+            self._local = threading.local()
+            self._counters["resets"] += 1
+
+
+registry = ClientRegistry()
+
+
+def get_drive_service():
+    """Servicio de Google Drive del thread actual, autenticado con la service account."""
+    return registry.drive_service()
+
+
+def get_supabase_client():
+    """Cliente de Supabase compartido por el proceso."""
+    return registry.supabase()
+
+
+def get_supabase_async_http():
+    """Cliente httpx asíncrono para la API REST de Supabase."""
+    return registry.supabase_async_http()
+
+
+def client_stats() -> Dict[str, int]:
+    """Contadores del registro de clientes."""
+    return registry.stats()
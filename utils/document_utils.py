@@ -1,9 +1,8 @@
 import io
-import os
+import tempfile
 from googleapiclient.http import MediaIoBaseDownload
 from drive_utils import get_drive_service
-import pdfplumber
-import docx
+from extractors import iter_docx_pages, iter_pages, iter_pdf_pages_layout
 
 def download_file_from_drive(file_id, destination_path):
     service = get_drive_service()
@@ -16,38 +15,40 @@ def download_file_from_drive(file_id, destination_path):
     fh.close()
     return destination_path
 
+# Tamaño hasta el que una descarga de Drive se mantiene en memoria; los PDFs más grandes van a disco
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+def iter_pdf_pages(pdf_source):
+    """
+    Recorre las páginas de un PDF (ruta o archivo abierto) con pdfplumber y entrega (número de página, texto) de a una.
+    Libera los objetos de cada página después de leerla, así que la memoria no crece con el largo del documento.
+    """
+    return iter_pdf_pages_layout(pdf_source)
+
 def extract_text_from_pdf(pdf_path):
-    text = ""
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            text += page.extract_text() or ""
-    return text
+    return "".join(text for _, text in iter_pdf_pages(pdf_path))
 
 def extract_text_from_docx(docx_path):
-    doc = docx.Document(docx_path)
-    text = "\n".join([p.text for p in doc.paragraphs])
-    return text
-
-def extract_text_from_file(file_path):
-    ext = os.path.splitext(file_path)[1].lower()
-    if ext == ".pdf":
-        return extract_text_from_pdf(file_path)
-    elif ext in [".docx"]:
-        return extract_text_from_docx(file_path)
-    else:
-        raise ValueError(f"Tipo de archivo no soportado para extracción de texto: {ext}")
+    return "".join(text for _, text in iter_docx_pages(docx_path)).rstrip("\n")
 
-def download_and_extract_text_from_pdf_drive(file_id):
+def extract_text_from_file(file_path, mime_type=None):
+    """Extrae el texto de un archivo local con el extractor de su tipo MIME o de su extensión (ver extractors.py)."""
+    return "\n".join(text.rstrip("\n") for _, text in iter_pages(file_path, mime_type))
+
+def iter_pdf_pages_from_drive(file_id):
+    """
+    Descarga un PDF de Drive y entrega sus páginas como `iter_pdf_pages`. La descarga se guarda en memoria
+    hasta SPOOL_MAX_BYTES y en un archivo temporal si es más grande.
+    """
     service = get_drive_service()
     request = service.files().get_media(fileId=file_id)
-    buffer = io.BytesIO()
-    downloader = MediaIoBaseDownload(buffer, request)
-    done = False
-    while not done:
-        status, done = downloader.next_chunk()
-    buffer.seek(0)
-    text = ""
-    with pdfplumber.open(buffer) as pdf:
-        for page in pdf.pages:
-            text += page.extract_text() or ""
-    return text 
\ No newline at end of file
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as buffer:
+        downloader = MediaIoBaseDownload(buffer, request)
+        done = False
+        while not done:
+            status, done = downloader.next_chunk()
+        buffer.seek(0)
+        yield from iter_pdf_pages(buffer)
+
+def download_and_extract_text_from_pdf_drive(file_id):
+    return "".join(text for _, text in iter_pdf_pages_from_drive(file_id)) 
\ No newline at end of file
@@ -0,0 +1,94 @@
+import logging
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+DEFAULT_FIELDS = "nextPageToken, files(id, name, mimeType, parents, modifiedTime, md5Checksum)"
+
+
+def list_folder(service, folder_id: str, page_size: int = 1000, fields: str = DEFAULT_FIELDS) -> List[Dict[str, Any]]:
+    """Lista todos los elementos de una carpeta de Drive siguiendo `nextPageToken`."""
+    items = []
+    page_token = None
+    while True:
+        response = service.files().list(
+            q=f"'{folder_id}' in parents and trashed = false",
+            spaces='drive',
+            pageSize=page_size,
+            fields=fields,
+            pageToken=page_token
+        ).execute()
+        items.extend(response.get('files', []))
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return items
+
+
+class DriveCrawler:
+    """
+    Recorre carpetas de Drive en anchura listando hasta `max_workers` carpetas a la vez.
+
+    `service_factory` se llama una vez por thread, ya que los servicios de googleapiclient no son thread-safe.
+    Los errores de listado se registran en `errors` y no detienen el recorrido, para que quien llama pueda
+    distinguir un listado incompleto de una carpeta vacía.
+    """
+
+    def __init__(self, service_factory: Callable[[], Any], max_workers: int = 4, page_size: int = 1000,
+                 fields: str = DEFAULT_FIELDS):
+        self.service_factory = service_factory
+        self.max_workers = max(1, max_workers)
+        self.page_size = page_size
+        self.fields = fields
+        self.errors: List[Tuple[str, str]] = []
+        self._local = threading.local()
+
+    def _service(self):
+        if not hasattr(self._local, "service"):
+            self._local.service = self.service_factory()
+        return self._local.service
+
+    def _list(self, folder_id: str) -> List[Dict[str, Any]]:
+        return list_folder(self._service(), folder_id, self.page_size, self.fields)
+
+    def crawl(self, roots: Iterable[Tuple[str, str]], mime_types: Optional[Iterable[str]] = None,
+              include_folders: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Recorre las carpetas `roots` (pares `(folder_id, path)`) y sus subcarpetas, y va entregando los
+        archivos a medida que se listan sus carpetas. Cada archivo incluye `path`, la ruta de su carpeta
+        (p. ej. "/DAP/Manuales/"). Con `mime_types` solo se entregan archivos de esos tipos; con
+        `include_folders` también se entregan las carpetas.
+        """
+        mime_types = set(mime_types) if mime_types else None
+        self.errors = []
+        pending = deque(roots)
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="drive-crawler") as executor:
+            running = {}
+            while pending or running:
+                while pending and len(running) < self.max_workers:
+                    folder_id, path = pending.popleft()
+                    running[executor.submit(self._list, folder_id)] = (folder_id, path)
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    folder_id, path = running.pop(future)
+                    try:
+                        items = future.result()
+                    except Exception as e:
+                        logger.error(f"Error listing Drive folder {path} (ID: {folder_id}): {str(e)}")
+                        self.errors.append((folder_id, str(e)))
+                        continue
+                    for item in items:
+                        item['path'] = path
+                        if item['mimeType'] == FOLDER_MIME_TYPE:
+                            pending.append((item['id'], f"{path}{item['name']}/"))
+                            if include_folders:
+                                yield item
+                        elif mime_types is None or item['mimeType'] in mime_types:
+                            yield item
+
+    def crawl_folder(self, folder_id: str, path: str = "/", **kwargs) -> Iterator[Dict[str, Any]]:
+        """Recorre una sola carpeta raíz. Ver `crawl`."""
+        return self.crawl([(folder_id, path)], **kwargs)
@@ -1,15 +1,5 @@
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-
-SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
-SERVICE_ACCOUNT_FILE = 'service-account.json'
-
-
-def get_drive_service():
-    credentials = service_account.Credentials.from_service_account_file(
-        SERVICE_ACCOUNT_FILE, scopes=SCOPES)
-    service = build('drive', 'v3', credentials=credentials)
-    return service
+from clients import get_drive_service
+from drive_crawler import DriveCrawler, FOLDER_MIME_TYPE
 
 
 def list_files_in_folder(folder_id):
@@ -23,25 +13,15 @@ def list_files_in_folder(folder_id):
     return items
 
 
-def list_files_in_folder_recursive(folder_id):
-    service = get_drive_service()
+def list_files_in_folder_recursive(folder_id, max_workers=4):
+    crawler = DriveCrawler(get_drive_service, max_workers=max_workers)
     all_files = []
-    
-    def _list_files(folder_id, path="/"):
-        results = service.files().list(
-            q=f"'{folder_id}' in parents and trashed = false",
-            pageSize=1000,
-            fields="files(id, name, mimeType)"
-        ).execute()
-        items = results.get('files', [])
-        for item in items:
-            if item['mimeType'] == 'application/vnd.google-apps.folder':
-                print(f"[Carpeta] {path}{item['name']}/ (ID: {item['id']})")
-                _list_files(item['id'], path + item['name'] + "/")
-            else:
-                print(f"[Archivo] {path}{item['name']} (ID: {item['id']}, Tipo: {item['mimeType']})")
-                all_files.append(item)
-    _list_files(folder_id)
+    for item in crawler.crawl_folder(folder_id, include_folders=True):
+        if item['mimeType'] == FOLDER_MIME_TYPE:
+            print(f"[Carpeta] {item['path']}{item['name']}/ (ID: {item['id']})")
+        else:
+            print(f"[Archivo] {item['path']}{item['name']} (ID: {item['id']}, Tipo: {item['mimeType']})")
+            all_files.append(item)
     return all_files
 
 # Ejemplo de uso:
@@ -0,0 +1,170 @@
+"""
+Registro de extractores de texto por tipo MIME.
+
+Cada extractor recorre un archivo local y entrega `(número de página, texto)` de a una, el formato que
+consumen los chunkers. Los formatos sin páginas (DOCX, CSV, texto) entregan todo el documento como una sola
+unidad y se marcan con `paginated=False`, para no guardar números de página que no existen.
+
+Los documentos de Google Workspace no se descargan tal cual: se exportan a `export_mime_type` (Docs a DOCX,
+Sheets a CSV, Slides a texto) y se extraen con el extractor de ese formato.
+
+PDF: la ruta rápida es PyPDF2. Las páginas en que PyPDF2 devuelve poco texto o palabras pegadas (columnas,
+tablas, texto posicionado carácter a carácter) se vuelven a extraer con pdfplumber, que respeta el layout
+pero es varias veces más lento.
+"""
+import csv
+import os
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+PDF_MIME_TYPE = "application/pdf"
+DOCX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+CSV_MIME_TYPE = "text/csv"
+TEXT_MIME_TYPE = "text/plain"
+GOOGLE_DOC_MIME_TYPE = "application/vnd.google-apps.document"
+GOOGLE_SHEET_MIME_TYPE = "application/vnd.google-apps.spreadsheet"
+GOOGLE_SLIDES_MIME_TYPE = "application/vnd.google-apps.presentation"
+
+# Una página de PDF con menos caracteres, o con palabras más largas que esto en promedio, se reextrae con pdfplumber
+PDF_FALLBACK_MIN_CHARS = int(os.getenv("PDF_FALLBACK_MIN_CHARS", "20"))
+PDF_FALLBACK_MAX_WORD_LENGTH = float(os.getenv("PDF_FALLBACK_MAX_WORD_LENGTH", "25"))
+
+Page = Tuple[int, str]
+
+
+@dataclass(frozen=True)
+class Extractor:
+    """Cómo obtener y recorrer un tipo de archivo."""
+    format: str
+    extension: str
+    iter_pages: Callable[[str], Iterator[Page]]
+    paginated: bool = True
+    export_mime_type: Optional[str] = None
+
+
+EXTRACTORS: Dict[str, Extractor] = {}
+_BY_EXTENSION: Dict[str, Extractor] = {}
+
+
+def register(mime_type: str, extractor: Extractor) -> Extractor:
+    """Registra `extractor` para `mime_type`. La primera extensión registrada sin exportación resuelve los archivos locales."""
+    EXTRACTORS[mime_type] = extractor
+    if extractor.export_mime_type is None:
+        _BY_EXTENSION.setdefault(extractor.extension, extractor)
+    return extractor
+
+
+def get_extractor(mime_type: Optional[str] = None, path: Optional[str] = None) -> Optional[Extractor]:
+    """Extractor del tipo MIME o, si no se indica, de la extensión de `path`. None si el formato no está soportado."""
+    if mime_type:
+        return EXTRACTORS.get(mime_type)
+    if path:
+        return _BY_EXTENSION.get(os.path.splitext(path)[1].lower())
+    return None
+
+
+def supported_mime_types() -> List[str]:
+    return list(EXTRACTORS)
+
+
+def supported_extensions() -> List[str]:
+    return list(_BY_EXTENSION)
+
+
+def iter_pages(path: str, mime_type: Optional[str] = None) -> Iterator[Page]:
+    """Recorre las páginas de un archivo local con el extractor de su tipo MIME o de su extensión."""
+    extractor = get_extractor(mime_type, path)
+    if extractor is None:
+        raise ValueError(f"Tipo de archivo no soportado para extracción de texto: {mime_type or os.path.splitext(path)[1]}")
+    return extractor.iter_pages(path)
+
+
+def pdf_page_needs_layout(text: str) -> bool:
+    """Indica si el texto de PyPDF2 de una página parece incompleto o con palabras pegadas."""
+    stripped = text.strip()
+    if len(stripped) < PDF_FALLBACK_MIN_CHARS:
+        return True
+    words = stripped.split()
+    return len(stripped) / len(words) > PDF_FALLBACK_MAX_WORD_LENGTH
+
+
+def iter_pdf_pages_layout(pdf_source) -> Iterator[Page]:
+    """
+    Recorre las páginas de un PDF (ruta o archivo abierto) con pdfplumber. Libera los objetos de cada página
+    después de leerla, así que la memoria no crece con el largo del documento.
+    """
+    import pdfplumber
+
+    with pdfplumber.open(pdf_source) as pdf:
+        for page_number, page in enumerate(pdf.pages, 1):
+            text = page.extract_text() or ""
+            page.close()
+            yield page_number, text
+
+
+def iter_pdf_pages(pdf_path: str) -> Iterator[Page]:
+    """
+    Recorre las páginas de un PDF con PyPDF2, que lee cada página recién cuando se accede a ella, y reextrae
+    con pdfplumber las que lo necesitan (`pdf_page_needs_layout`). pdfplumber abre el archivo solo si hace falta.
+    """
+    import PyPDF2
+
+    layout = None
+    try:
+        with open(pdf_path, 'rb') as file:
+            reader = PyPDF2.PdfReader(file)
+            for page_number, page in enumerate(reader.pages, 1):
+                try:
+                    text = page.extract_text() or ""
+                except Exception:
+                    text = ""
+                if pdf_page_needs_layout(text):
+                    if layout is None:
+                        import pdfplumber
+                        layout = pdfplumber.open(pdf_path)
+                    layout_page = layout.pages[page_number - 1]
+                    text = max(text, layout_page.extract_text() or "", key=lambda t: len(t.strip()))
+                    layout_page.close()
+                yield page_number, text + "\n"
+    finally:
+        if layout is not None:
+            layout.close()
+
+
+def iter_docx_pages(docx_path: str) -> Iterator[Page]:
+    """Texto de un DOCX: los párrafos y, después, las tablas con las celdas de cada fila separadas por " | "."""
+    import docx
+
+    document = docx.Document(docx_path)
+    lines = [paragraph.text for paragraph in document.paragraphs if paragraph.text.strip()]
+    for table in document.tables:
+        for row in table.rows:
+            cells = [cell.text.strip() for cell in row.cells]
+            if any(cells):
+                lines.append(" | ".join(cells))
+    yield 1, "\n".join(lines) + "\n"
+
+
+def iter_csv_pages(csv_path: str) -> Iterator[Page]:
+    """Filas de un CSV (p. ej. la exportación de una planilla), con las celdas separadas por " | "."""
+    with open(csv_path, newline='', encoding='utf-8-sig') as file:
+        lines = [" | ".join(cell.strip() for cell in row) for row in csv.reader(file) if any(cell.strip() for cell in row)]
+    yield 1, "\n".join(lines) + "\n"
+
+
+def iter_text_pages(text_path: str) -> Iterator[Page]:
+    with open(text_path, encoding='utf-8-sig', errors='replace') as file:
+        yield 1, file.read() + "\n"
+
+
+register(PDF_MIME_TYPE, Extractor("pdf", ".pdf", iter_pdf_pages))
+register(DOCX_MIME_TYPE, Extractor("docx", ".docx", iter_docx_pages, paginated=False))
+register(CSV_MIME_TYPE, Extractor("csv", ".csv", iter_csv_pages, paginated=False))
+register(TEXT_MIME_TYPE, Extractor("txt", ".txt", iter_text_pages, paginated=False))
+# Google Workspace: Sheets se exporta a CSV, que incluye solo la primera hoja de la planilla
+register(GOOGLE_DOC_MIME_TYPE, Extractor("gdoc", ".docx", iter_docx_pages, paginated=False,
+                                         export_mime_type=DOCX_MIME_TYPE))
+register(GOOGLE_SHEET_MIME_TYPE, Extractor("gsheet", ".csv", iter_csv_pages, paginated=False,
+                                           export_mime_type=CSV_MIME_TYPE))
+register(GOOGLE_SLIDES_MIME_TYPE, Extractor("gslides", ".txt", iter_text_pages, paginated=False,
+                                            export_mime_type=TEXT_MIME_TYPE))
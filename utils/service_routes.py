@@ -0,0 +1,32 @@
+from typing import Callable, Optional
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+
+def add_service_routes(app: FastAPI, readiness: Callable[[], dict],
+                       render_metrics: Optional[Callable[[], str]] = None) -> None:
+    """
+    Registra en `app` `/ready` (200 cuando `readiness()["ready"]` es verdadero, 503 mientras tanto) y, con
+    `render_metrics`, `/metrics` con su texto en el formato de Prometheus.
+
+    Starlette resuelve las rutas en orden y `get_fast_api_app(..., web=True)` monta la interfaz web de ADK
+    (StaticFiles) en "/", que captura cualquier ruta agregada después. Por eso estas rutas se mueven al
+    principio de la tabla de rutas.
+    """
+    existing = list(app.router.routes)
+
+    @app.get("/ready")
+    def ready():
+        """Readiness: 200 cuando el modelo de embeddings y el backend de búsqueda están listos, 503 mientras tanto."""
+        status = readiness()
+        return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+    if render_metrics is not None:
+        @app.get("/metrics")
+        def metrics():
+            """Métricas de la búsqueda en formato de texto de Prometheus (latencias por etapa y categoría, errores, tokens)."""
+            return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+    added = app.router.routes[len(existing):]
+    app.router.routes[:] = added + existing
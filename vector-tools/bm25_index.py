@@ -0,0 +1,129 @@
+import json
+import math
+import os
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+_TOKEN = re.compile(r"\w+")
+
+# Palabras vacías del español (y conectores frecuentes en los manuales) que no aportan a la búsqueda léxica
+STOPWORDS = frozenset("""
+a al algo algun alguna algunas alguno algunos ante antes como con contra cual cuales cuando de del desde
+donde durante e el ella ellas ellos en entre era es esa esas ese eso esos esta estan estas este esto estos
+fue fueron ha hay la las le les lo los mas me mi mis muy no nos o otra otras otro otros para pero por que
+se segun sea ser si sin sobre son su sus tambien te tiene tu tus un una unas uno unos y ya
+""".split())
+
+
+def tokenize(texto: str) -> List[str]:
+    """Términos de un texto para BM25: minúsculas, sin tildes y sin palabras vacías. Conserva siglas y números."""
+    texto = unicodedata.normalize("NFD", texto.casefold())
+    texto = "".join(c for c in texto if unicodedata.category(c) != "Mn")
+    return [token for token in _TOKEN.findall(texto) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Índice invertido BM25 sobre el contenido de los chunks, en formato CSR:
+
+    - `vocab`: término -> id.
+    - `indptr[t]:indptr[t + 1]`: rango de postings del término `t`.
+    - `docs`: fila del chunk de cada posting (ordenadas dentro de cada término).
+    - `weights`: aporte BM25 ya calculado de cada posting (idf * tf saturado y normalizado por largo).
+
+    Con los pesos precalculados, puntuar una consulta es sumar los rangos de postings de sus términos.
+    Las filas coinciden con las del snapshot, así que los rangos de categoría del snapshot sirven de filtro.
+    """
+
+    def __init__(self, vocab: Dict[str, int], indptr: np.ndarray, docs: np.ndarray, weights: np.ndarray,
+                 params: Dict[str, float]):
+        self.vocab = vocab
+        self.indptr = indptr
+        self.docs = docs
+        self.weights = weights
+        self.params = params
+
+    @classmethod
+    def build(cls, contents: Iterable[str], k1: float = 1.2, b: float = 0.75) -> "BM25Index":
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        lengths = []
+        for row, content in enumerate(contents):
+            tokens = tokenize(content or "")
+            lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                postings.setdefault(term, []).append((row, tf))
+        count = len(lengths)
+        avgdl = (sum(lengths) / count) if count else 0.0
+        lengths = np.asarray(lengths, dtype=np.float32)
+
+        terms = sorted(postings)
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        for t, term in enumerate(terms):
+            indptr[t + 1] = indptr[t] + len(postings[term])
+        docs = np.empty(indptr[-1], dtype=np.int32)
+        weights = np.empty(indptr[-1], dtype=np.float32)
+        for t, term in enumerate(terms):
+            rows, tfs = zip(*postings[term])
+            rows = np.asarray(rows, dtype=np.int32)
+            tfs = np.asarray(tfs, dtype=np.float32)
+            df = len(rows)
+            idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+            norm = k1 * (1 - b + b * lengths[rows] / avgdl) if avgdl else k1
+            docs[indptr[t]:indptr[t + 1]] = rows
+            weights[indptr[t]:indptr[t + 1]] = idf * tfs * (k1 + 1) / (tfs + norm)
+        params = {"k1": k1, "b": b, "avgdl": avgdl, "count": count, "terms": len(terms), "postings": int(indptr[-1])}
+        return cls({term: t for t, term in enumerate(terms)}, indptr, docs, weights, params)
+
+    def save(self, path: str) -> None:
+        """Guarda el índice en el directorio `path` (`bm25_vocab.json`, `bm25.json` y arreglos `.npy`)."""
+        terms = sorted(self.vocab, key=self.vocab.get)
+        with open(os.path.join(path, "bm25_vocab.json"), "w", encoding="utf-8") as f:
+            json.dump(terms, f, ensure_ascii=False)
+        np.save(os.path.join(path, "bm25_indptr.npy"), self.indptr)
+        np.save(os.path.join(path, "bm25_docs.npy"), self.docs)
+        np.save(os.path.join(path, "bm25_weights.npy"), self.weights)
+        with open(os.path.join(path, "bm25.json"), "w", encoding="utf-8") as f:
+            json.dump(self.params, f)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> Optional["BM25Index"]:
+        """Carga el índice guardado en `path`, o devuelve None si el directorio no tiene uno."""
+        if not os.path.exists(os.path.join(path, "bm25.json")):
+            return None
+        mmap_mode = "r" if mmap else None
+        with open(os.path.join(path, "bm25_vocab.json"), encoding="utf-8") as f:
+            vocab = {term: t for t, term in enumerate(json.load(f))}
+        with open(os.path.join(path, "bm25.json"), encoding="utf-8") as f:
+            params = json.load(f)
+        return cls(
+            vocab,
+            np.load(os.path.join(path, "bm25_indptr.npy"), mmap_mode=mmap_mode),
+            np.load(os.path.join(path, "bm25_docs.npy"), mmap_mode=mmap_mode),
+            np.load(os.path.join(path, "bm25_weights.npy"), mmap_mode=mmap_mode),
+            params,
+        )
+
+    def search(self, query: str, top_k: int, start: int = 0, end: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Devuelve hasta `top_k` pares (fila, puntaje BM25) de las filas `[start, end)`, de mayor a menor puntaje."""
+        end = self.params["count"] if end is None else end
+        if top_k <= 0 or end <= start:
+            return []
+        scores = np.zeros(end - start, dtype=np.float32)
+        for term in set(tokenize(query)):
+            t = self.vocab.get(term)
+            if t is None:
+                continue
+            lo, hi = int(self.indptr[t]), int(self.indptr[t + 1])
+            docs = self.docs[lo:hi]
+            # Los postings están ordenados por fila: el filtro por rango es una búsqueda binaria
+            a, z = np.searchsorted(docs, start), np.searchsorted(docs, end)
+            scores[docs[a:z] - start] += self.weights[lo + a:lo + z]
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > top_k:
+            candidates = candidates[np.argpartition(scores[candidates], -top_k)[-top_k:]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(start + int(i), float(scores[i])) for i in candidates]
@@ -0,0 +1,293 @@
+import re
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# (número de página, texto de la página)
+Page = Tuple[int, str]
+# (índice del chunk, texto del chunk, metadata propia del chunk)
+Chunk = Tuple[int, str, Dict[str, Any]]
+
+# Limpieza del chunker por caracteres (la de limpiar_texto original), con las expresiones compiladas una vez
+_WORD_LINE_BREAK = re.compile(r'(\w)\s+\n\s*(\w)')
+_NEWLINES = re.compile(r'\n+')
+_SPACES = re.compile(r'\s{2,}')
+
+# Limpieza del chunker por tokens: se aplica una vez por página y conserva los límites de párrafo y oración
+_HYPHEN_BREAK = re.compile(r'(\w)-\n(\w)')
+_PARAGRAPH_BREAK = re.compile(r'\n\s*\n|\n(?=\s*(?:[•▪◦●\-*]|\d{1,2}[.)])\s)')
+_WHITESPACE = re.compile(r'\s+')
+_SENTENCE_BREAK = re.compile(r'([.!?…][\"\'»”)\]]*)\s+(?=[¿¡\"\'«“(\[]?[A-ZÁÉÍÓÚÑÜ0-9])')
+_SENTENCE_END = re.compile(r'[.!?…:;][\"\'»”)\]]*$')
+# Fragmentos que terminan en número de lista o abreviatura ("3.", "Sr.", "art.") no cierran una oración
+_ABBREVIATION_END = re.compile(r'(?:^|\s)(?:\d{1,3}|[A-Za-z]|Sr|Sra|Srta|Dr|Dra|Av|Nro|N°|Art|art|Pág|pág|Ej|ej)\.$')
+
+
+def limpiar_texto(texto: str) -> str:
+    """Une palabras separadas por saltos de línea o espacios extraños y colapsa los espacios."""
+    texto = _WORD_LINE_BREAK.sub(r'\1 \2', texto)
+    texto = _NEWLINES.sub(' ', texto)
+    texto = _SPACES.sub(' ', texto)
+    return texto.strip()
+
+
+def split_sentences(texto: str) -> List[str]:
+    """
+    Limpia el texto de una página y lo divide en oraciones. Los párrafos (líneas en blanco o viñetas) son
+    siempre un límite; dentro de un párrafo se corta después de `.`, `!`, `?` o `…` seguidos de mayúscula o número.
+    """
+    texto = _HYPHEN_BREAK.sub(r'\1\2', texto)
+    sentences = []
+    for paragraph in _PARAGRAPH_BREAK.split(texto):
+        paragraph = _WHITESPACE.sub(' ', paragraph).strip()
+        if not paragraph:
+            continue
+        fragment = ""
+        for sentence in _SENTENCE_BREAK.sub('\\1\n', paragraph).split('\n'):
+            fragment = f"{fragment} {sentence}" if fragment else sentence
+            if not _ABBREVIATION_END.search(fragment):
+                sentences.append(fragment)
+                fragment = ""
+        if fragment:
+            sentences.append(fragment)
+    return sentences
+
+
+def stream_chunks(pages: Iterable[Page], chunk_size: int = 1000, overlap: int = 200) -> Iterator[Chunk]:
+    """
+    Divide en chunks de `chunk_size` caracteres con `overlap` el texto de una secuencia de páginas,
+    consumiéndolas de a una.
+
+    Produce los mismos chunks que `chunk_text` aplicado al texto completo (las páginas concatenadas), pero
+    solo retiene en memoria la ventana del chunk en curso, así que nunca arma el documento entero. Los
+    chunks pueden cruzar el límite entre páginas; cada uno lleva en su metadata `page_start` y `page_end`,
+    la primera y la última página de las que tiene texto.
+    """
+    step = chunk_size - overlap
+    if step <= 0:
+        raise ValueError("chunk_size debe ser mayor que overlap")
+
+    buffer = ""
+    buffer_start = 0  # offset en el documento del primer carácter de `buffer`
+    spans: deque = deque()  # (inicio, fin, página) de las páginas que todavía tienen texto en `buffer`
+    next_start = 0
+    index = 0
+
+    def page_range(start: int, end: int) -> Dict[str, Any]:
+        numbers = [page for page_start, page_end, page in spans if page_start < end and page_end > start]
+        return {"page_start": numbers[0], "page_end": numbers[-1]} if numbers else {}
+
+    def advance() -> None:
+        nonlocal buffer, buffer_start
+        buffer = buffer[next_start - buffer_start:]
+        buffer_start = next_start
+        while spans and spans[0][1] <= buffer_start:
+            spans.popleft()
+
+    for page_number, text in pages:
+        if not text:
+            continue
+        end = buffer_start + len(buffer)
+        spans.append((end, end + len(text), page_number))
+        buffer += text
+        # Emitir todos los chunks completos que ya entran en el buffer
+        while next_start + chunk_size <= buffer_start + len(buffer):
+            offset = next_start - buffer_start
+            yield index, buffer[offset:offset + chunk_size], page_range(next_start, next_start + chunk_size)
+            index += 1
+            next_start += step
+            advance()
+
+    # Chunks finales, más cortos que chunk_size: se descartan los muy pequeños como en chunk_text
+    end = buffer_start + len(buffer)
+    while next_start < end:
+        offset = next_start - buffer_start
+        chunk = buffer[offset:offset + chunk_size]
+        if len(chunk) > chunk_size / 2:
+            yield index, chunk, page_range(next_start, next_start + len(chunk))
+            index += 1
+        next_start += step
+
+
+class CharChunker:
+    """Chunker por caracteres: ventanas de `chunk_size` con `overlap` y limpieza de cada chunk (el algoritmo original)."""
+
+    name = "chars"
+
+    def __init__(self, chunk_size: int = 1000, overlap: int = 200):
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+
+    def config(self) -> Dict[str, Any]:
+        """Parámetros que determinan los chunks; el manifiesto los guarda para detectar un cambio de chunker."""
+        return {"name": self.name, "chunk_size": self.chunk_size, "overlap": self.overlap}
+
+    def chunk_document(self, pages: Iterable[Page]) -> Tuple[int, List[Chunk]]:
+        """Devuelve el total de chunks y los (índice, chunk limpio, páginas) no vacíos."""
+        total = 0
+        chunks = []
+        for i, chunk, page_range in stream_chunks(pages, self.chunk_size, self.overlap):
+            total += 1
+            chunk = limpiar_texto(chunk)
+            if chunk:
+                chunks.append((i, chunk, page_range))
+        return total, chunks
+
+
+# Tokenizers cargados por ruta, uno por proceso (los workers de extracción reciben el chunker sin tokenizer)
+_tokenizers: Dict[str, Any] = {}
+_tokenizers_lock = threading.Lock()
+
+
+def load_tokenizer(path: str):
+    with _tokenizers_lock:
+        if path not in _tokenizers:
+            from transformers import AutoTokenizer
+            _tokenizers[path] = AutoTokenizer.from_pretrained(path)
+        return _tokenizers[path]
+
+
+class TokenChunker:
+    """
+    Chunker por oraciones con límite de tokens del modelo de embeddings.
+
+    - Limpia cada página una sola vez (expresiones precompiladas) y la divide en oraciones.
+    - Agrupa oraciones hasta `max_tokens` tokens, contando los tokens especiales del modelo, para que
+      ningún chunk se trunque al generar su embedding. Una oración que no entra sola se corta por palabras.
+    - Repite entre chunks consecutivos las últimas oraciones que sumen hasta `overlap_tokens` tokens.
+    - Una oración que continúa en la página siguiente se une antes de dividir, y el chunk registra ambas páginas.
+
+    El tokenizer se pasa directamente o se carga desde `tokenizer_path`. Con `tokenizer_path`, al serializar el
+    chunker para otro proceso no se incluye el tokenizer: cada proceso lo carga una vez.
+    """
+
+    name = "tokens"
+
+    def __init__(self, tokenizer=None, tokenizer_path: Optional[str] = None, max_tokens: int = 256,
+                 overlap_tokens: int = 32):
+        if tokenizer is None and tokenizer_path is None:
+            raise ValueError("TokenChunker requiere tokenizer o tokenizer_path")
+        self._tokenizer = tokenizer
+        self.tokenizer_path = tokenizer_path
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+
+    def config(self) -> Dict[str, Any]:
+        """Parámetros que determinan los chunks; el manifiesto los guarda para detectar un cambio de chunker."""
+        tokenizer = self.tokenizer_path or getattr(self._tokenizer, "name_or_path", None)
+        return {"name": self.name, "max_tokens": self.max_tokens, "overlap_tokens": self.overlap_tokens,
+                "tokenizer": tokenizer}
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        if self.tokenizer_path:
+            state["_tokenizer"] = None
+        return state
+
+    @property
+    def tokenizer(self):
+        if self._tokenizer is None:
+            self._tokenizer = load_tokenizer(self.tokenizer_path)
+        return self._tokenizer
+
+    @property
+    def budget(self) -> int:
+        """Tokens disponibles para el texto, descontando [CLS]/[SEP] u otros tokens especiales del modelo."""
+        return max(1, self.max_tokens - self.tokenizer.num_special_tokens_to_add())
+
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        if not texts:
+            return []
+        return [len(ids) for ids in self.tokenizer(texts, add_special_tokens=False, verbose=False)["input_ids"]]
+
+    def _split_long(self, sentence: str, budget: int) -> List[Tuple[str, int]]:
+        """Corta por palabras una oración de más de `budget` tokens."""
+        words = sentence.split(" ")
+        pieces, current, current_tokens = [], [], 0
+        for word, tokens in zip(words, self.count_tokens(words)):
+            if current and current_tokens + tokens > budget:
+                pieces.append((" ".join(current), current_tokens))
+                current, current_tokens = [], 0
+            current.append(word)
+            current_tokens += tokens
+        if current:
+            pieces.append((" ".join(current), current_tokens))
+        return pieces
+
+    def _units(self, pages: Iterable[Page]) -> Iterator[Tuple[str, int, int, int]]:
+        """Oraciones del documento como (texto, tokens, página inicial, página final)."""
+        budget = self.budget
+        pending, pending_page = "", None
+        for page_number, text in pages:
+            sentences = split_sentences(text)
+            if not sentences:
+                continue
+            first_pages = [page_number] * len(sentences)
+            if pending:
+                # La última oración de la página anterior no terminaba: se completa con la primera de esta
+                sentences[0] = f"{pending} {sentences[0]}"
+                first_pages[0] = pending_page
+                pending = ""
+            if not _SENTENCE_END.search(sentences[-1]):
+                pending, pending_page = sentences.pop(), first_pages.pop()
+            for sentence, first_page, tokens in zip(sentences, first_pages, self.count_tokens(sentences)):
+                if tokens > budget:
+                    for piece, piece_tokens in self._split_long(sentence, budget):
+                        yield piece, piece_tokens, first_page, page_number
+                else:
+                    yield sentence, tokens, first_page, page_number
+        if pending:
+            tokens = self.count_tokens([pending])[0]
+            pieces = self._split_long(pending, budget) if tokens > budget else [(pending, tokens)]
+            for piece, piece_tokens in pieces:
+                yield piece, piece_tokens, pending_page, pending_page
+
+    def iter_chunks(self, pages: Iterable[Page]) -> Iterator[Chunk]:
+        """Recorre las páginas de a una y produce (índice, chunk, {page_start, page_end})."""
+        budget = self.budget
+        current: deque = deque()
+        current_tokens = 0
+        has_new = False  # el chunk en curso tiene oraciones que no son solo overlap del anterior
+        index = 0
+
+        def emit() -> Chunk:
+            text = " ".join(unit[0] for unit in current)
+            page_range = {"page_start": min(u[2] for u in current), "page_end": max(u[3] for u in current)}
+            return index, text, page_range
+
+        for unit in self._units(pages):
+            tokens = unit[1]
+            if current and current_tokens + tokens > budget:
+                if has_new:
+                    yield emit()
+                    index += 1
+                # Conservar como overlap las últimas oraciones que sumen hasta overlap_tokens
+                carry, carry_tokens = [], 0
+                for previous in reversed(current):
+                    if carry_tokens + previous[1] > self.overlap_tokens:
+                        break
+                    carry.insert(0, previous)
+                    carry_tokens += previous[1]
+                while carry and carry_tokens + tokens > budget:
+                    carry_tokens -= carry.pop(0)[1]
+                current, current_tokens, has_new = deque(carry), carry_tokens, False
+            current.append(unit)
+            current_tokens += tokens
+            has_new = True
+        if current and has_new:
+            yield emit()
+
+    def chunk_document(self, pages: Iterable[Page]) -> Tuple[int, List[Chunk]]:
+        """Devuelve el total de chunks y los (índice, chunk, páginas), ya limpios."""
+        chunks = list(self.iter_chunks(pages))
+        return len(chunks), chunks
+
+
+def create_chunker(name: str = "tokens", tokenizer=None, tokenizer_path: Optional[str] = None,
+                   max_tokens: int = 256, overlap_tokens: int = 32, chunk_size: int = 1000, overlap: int = 200):
+    """Crea el chunker indicado: "tokens" (por oraciones con límite de tokens) o "chars" (ventanas de caracteres)."""
+    if name == "tokens":
+        return TokenChunker(tokenizer, tokenizer_path, max_tokens, overlap_tokens)
+    if name == "chars":
+        return CharChunker(chunk_size, overlap)
+    raise ValueError(f"Chunker desconocido: {name}")
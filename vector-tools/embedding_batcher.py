@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """
+    Agrupa pedidos de embedding concurrentes en un solo lote.
+
+    Cada `submit` encola un texto y devuelve un `Future`. Un thread de fondo toma el primer pedido de la
+    cola y sigue juntando pedidos hasta reunir `max_batch` textos o hasta que pasen `max_wait_ms`
+    milisegundos. Después llama una sola vez a `encode_batch` con todo el lote y resuelve el `Future` de
+    cada pedido con su fila. Con poca carga el lote es de un texto y la espera extra es como máximo
+    `max_wait_ms`. Con muchas sesiones simultáneas el modelo procesa lotes en vez de frases sueltas.
+    """
+
+    def __init__(self, encode_batch: Callable[[List[str]], Sequence], max_batch: int = 32,
+                 max_wait_ms: float = 5.0, name: str = "embed-batcher"):
+        if max_batch < 1:
+            raise ValueError("max_batch debe ser al menos 1")
+        self.encode_batch = encode_batch
+        self.max_batch = max_batch
+        self.max_wait = max(max_wait_ms, 0.0) / 1000.0
+        self.name = name
+        self._queue: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.batches = 0
+        self.items = 0
+        self.errors = 0
+        self.max_batch_seen = 0
+        self.max_queue_depth = 0
+        self.wait_seconds = 0.0
+
+    def _ensure_started(self) -> None:
+        # El thread se crea en el primer pedido, así importar el módulo no arranca nada
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                    self._thread.start()
+
+    def submit(self, texto: str) -> Future:
+        """Encola `texto` y devuelve un `Future` que se resuelve con su embedding (`np.ndarray`)."""
+        if self._closed:
+            raise RuntimeError("MicroBatcher cerrado")
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((texto, future, time.perf_counter()))
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+        return future
+
+    def encode(self, texto: str, timeout: Optional[float] = None) -> np.ndarray:
+        """Versión bloqueante de `submit`: espera el embedding de `texto`."""
+        return self.submit(texto).result(timeout=timeout)
+
+    async def aencode(self, texto: str) -> np.ndarray:
+        """Versión asíncrona de `encode`: espera el lote sin bloquear el event loop."""
+        return await asyncio.wrap_future(self.submit(texto))
+
+    def _collect(self, first) -> List[tuple]:
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                # Se vuelve a encolar para que el loop principal termine después de este lote
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch = self._collect(first)
+            # Los pedidos cancelados (p. ej. por un timeout de quien esperaba) no se calculan
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            started = time.perf_counter()
+            with self._lock:
+                self.batches += 1
+                self.items += len(batch)
+                self.max_batch_seen = max(self.max_batch_seen, len(batch))
+                self.wait_seconds += sum(started - enqueued for _, _, enqueued in batch)
+            try:
+                embeddings = self.encode_batch([texto for texto, _, _ in batch])
+                if len(embeddings) != len(batch):
+                    raise ValueError(f"encode_batch devolvió {len(embeddings)} embeddings para {len(batch)} textos")
+            except Exception as e:
+                logger.error(f"Error generando un lote de {len(batch)} embeddings: {str(e)}")
+                with self._lock:
+                    self.errors += 1
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future, _), embedding in zip(batch, embeddings):
+                future.set_result(np.asarray(embedding, dtype=np.float32))
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+                "batches": self.batches,
+                "items": self.items,
+                "errors": self.errors,
+                "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+                "max_batch_size": self.max_batch_seen,
+                "avg_wait_ms": self.wait_seconds / self.items * 1000 if self.items else 0.0,
+            }
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Termina el thread de fondo después de procesar los pedidos ya encolados."""
+        self._closed = True
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
@@ -0,0 +1,138 @@
+import logging
+import os
+import re
+import tempfile
+import threading
+import unicodedata
+from collections import OrderedDict
+from dataclasses import replace
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalizar_consulta(texto: str) -> str:
+    """
+    Normaliza una consulta para usarla como clave de caché: minúsculas, sin tildes y con espacios colapsados.
+    all-MiniLM-L6-v2 usa un tokenizer uncased que ya descarta mayúsculas y tildes, así que consultas
+    con la misma forma normalizada producen el mismo embedding.
+    """
+    texto = unicodedata.normalize("NFD", texto.casefold())
+    texto = "".join(c for c in texto if unicodedata.category(c) != "Mn")
+    return _WHITESPACE.sub(" ", texto).strip()
+
+
+class EmbeddingCache:
+    """
+    Caché LRU acotada de embeddings de consultas, con métricas de aciertos y fallos.
+    Opcionalmente se persiste en un archivo `.npz` para conservarla entre arranques en frío.
+
+    Las claves son solo el texto de la consulta, así que con `spec` (el `EmbeddingSpec` del modelo cargado)
+    el archivo guarda el modelo, la versión y la dimensión con que se calcularon los embeddings, y `load`
+    descarta un archivo de otro modelo (o de antes de guardar el modelo) en vez de devolver vectores que no
+    se pueden comparar con el índice.
+    """
+
+    def __init__(self, max_size: int = 1024, path: Optional[str] = None, spec=None):
+        self.max_size = max_size
+        self.path = path
+        self.spec = spec
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+    def put(self, key: str, embedding) -> None:
+        if self.max_size <= 0:
+            return
+        embedding = np.asarray(embedding, dtype=np.float32)
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, texto: str, compute: Callable[[str], object]) -> np.ndarray:
+        """Devuelve el embedding de `texto` desde la caché, o lo calcula con `compute` y lo guarda."""
+        key = normalizar_consulta(texto)
+        embedding = self.get(key)
+        if embedding is None:
+            embedding = np.asarray(compute(texto), dtype=np.float32)
+            self.put(key, embedding)
+        return embedding
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def save(self, path: Optional[str] = None) -> None:
+        """Guarda las entradas (de la menos a la más usada) en un `.npz` de forma atómica."""
+        path = path or self.path
+        if not path:
+            return
+        with self._lock:
+            keys: List[str] = list(self._entries.keys())
+            vectors = np.stack(list(self._entries.values())) if keys else np.zeros((0, 0), dtype=np.float32)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        spec = {}
+        if self.spec is not None:
+            dim = self.spec.dim or (vectors.shape[1] if keys else 0)
+            spec = {"spec_model": self.spec.model, "spec_version": str(self.spec.version), "spec_dim": dim}
+        with tempfile.NamedTemporaryFile(dir=directory, suffix=".npz", delete=False) as tmp:
+            np.savez(tmp, keys=np.array(keys, dtype=str), vectors=vectors, **spec)
+        os.replace(tmp.name, path)
+        logger.info(f"Caché de embeddings guardada en {path}: {len(keys)} consultas")
+
+    def load(self, path: str) -> None:
+        """
+        Carga entradas desde un `.npz` generado por `save`, respetando `max_size`. Con `spec`, descarta el
+        archivo si no es del mismo modelo.
+        """
+        try:
+            with np.load(path) as data:
+                keys, vectors = data["keys"], data["vectors"]
+                stored = None
+                if self.spec is not None and "spec_model" in data:
+                    stored = replace(self.spec, model=str(data["spec_model"]), version=str(data["spec_version"]),
+                                     dim=int(data["spec_dim"]) or None)
+        except Exception as e:
+            logger.warning(f"No se pudo cargar la caché de embeddings desde {path}: {str(e)}")
+            return
+        if self.spec is not None and (stored is None or not stored.matches(self.spec)):
+            logger.warning(f"Caché de embeddings descartada: {path} es del modelo {stored or 'desconocido'} "
+                           f"y el modelo cargado es {self.spec}")
+            return
+        for key, vector in zip(keys, vectors):
+            self.put(str(key), vector)
+        logger.info(f"Caché de embeddings cargada desde {path}: {len(self._entries)} consultas")
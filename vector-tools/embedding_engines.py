@@ -0,0 +1,238 @@
+"""
+Motores de inferencia para el modelo de embeddings.
+
+- `torch`: `SentenceTransformer` en PyTorch (por defecto). Con `quantize="int8"` aplica cuantización
+  dinámica int8 a las capas lineales.
+- `onnx`: el transformer exportado a ONNX y ejecutado con ONNX Runtime en CPU. El pooling (mean/CLS) y la
+  normalización se hacen en NumPy igual que en el `SentenceTransformer` original. Con `quantize="int8"`
+  usa el modelo cuantizado con `onnxruntime.quantization.quantize_dynamic`.
+
+Ambos exponen `encode(textos, batch_size=..., show_progress_bar=...)` con la misma salida que
+`SentenceTransformer.encode` (`np.ndarray` float32), así que se pueden usar en lugar de `model`, además de
+`tokenizer`, `tokenizer_path` (ruta desde la que otro proceso puede cargar el tokenizer) y `max_seq_length`.
+
+La exportación ONNX se hace una vez y se guarda en `EMBEDDING_ONNX_DIR`. Se puede hacer por adelantado,
+por ejemplo en el build del contenedor:
+
+    python embedding_engines.py --quantize int8
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import time
+from typing import List, Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_NAME = "all-MiniLM-L6-v2"
+DEFAULT_ONNX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "onnx_models")
+SUPPORTED_ENGINES = ("torch", "onnx")
+SUPPORTED_QUANTIZATION = ("none", "int8")
+
+ONNX_INPUTS = ("input_ids", "attention_mask", "token_type_ids")
+
+
+def _check_quantize(quantize: str) -> str:
+    quantize = (quantize or "none").lower()
+    if quantize not in SUPPORTED_QUANTIZATION:
+        raise ValueError(f"Cuantización no soportada: {quantize}")
+    return quantize
+
+
+def _batches(texts: List[str], batch_size: int):
+    """Recorre los textos ordenados por largo (menos padding por lote), como SentenceTransformer.encode."""
+    order = np.argsort([-len(text) for text in texts], kind="stable")
+    for start in range(0, len(texts), batch_size):
+        indices = order[start:start + batch_size]
+        yield indices, [texts[i] for i in indices]
+
+
+class TorchEngine:
+    """`SentenceTransformer` en PyTorch, opcionalmente con cuantización dinámica int8 de las capas lineales."""
+
+    name = "torch"
+
+    def __init__(self, model_name: str = DEFAULT_MODEL_NAME, quantize: str = "none", threads: int = 0):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        self.quantize = _check_quantize(quantize)
+        if threads > 0:
+            torch.set_num_threads(threads)
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.tokenizer = self.model.tokenizer
+        self.tokenizer_path = self.tokenizer.name_or_path
+        self.max_seq_length = self.model.max_seq_length
+        if self.quantize == "int8":
+            self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    def encode(self, texts: Union[str, List[str]], batch_size: int = 32, show_progress_bar: bool = False,
+               **kwargs) -> np.ndarray:
+        return np.asarray(
+            self.model.encode(texts, batch_size=batch_size, show_progress_bar=show_progress_bar, **kwargs),
+            dtype=np.float32,
+        )
+
+
+def export_onnx(model_name: str = DEFAULT_MODEL_NAME, output_dir: Optional[str] = None,
+                quantize: str = "none") -> str:
+    """
+    Exporta el transformer de `model_name` a ONNX en `output_dir`, junto con el tokenizer y la
+    configuración de pooling (`pooling.json`). Con `quantize="int8"` genera además `model_int8.onnx`.
+    Si los archivos ya existen no se vuelven a generar. Devuelve `output_dir`.
+    """
+    quantize = _check_quantize(quantize)
+    output_dir = output_dir or onnx_model_dir(model_name)
+    model_path = os.path.join(output_dir, "model.onnx")
+
+    if not os.path.exists(model_path):
+        import torch
+        from sentence_transformers import SentenceTransformer
+        from sentence_transformers.models import Normalize, Pooling
+
+        start = time.perf_counter()
+        st_model = SentenceTransformer(model_name, device="cpu")
+        transformer = st_model[0]
+        pooling = next(module for module in st_model if isinstance(module, Pooling))
+        os.makedirs(output_dir, exist_ok=True)
+        transformer.tokenizer.save_pretrained(output_dir)
+
+        sample = transformer.tokenizer(["exportar modelo"], padding=True, return_tensors="pt")
+        input_names = [name for name in ONNX_INPUTS if name in sample]
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+        tmp_path = f"{model_path}.tmp-{os.getpid()}"
+        with torch.no_grad():
+            torch.onnx.export(
+                transformer.auto_model.eval(),
+                tuple(sample[name] for name in input_names),
+                tmp_path,
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=14,
+                dynamo=False,
+            )
+        with open(os.path.join(output_dir, "pooling.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "model_name": model_name,
+                "pooling": "cls" if pooling.pooling_mode_cls_token else "mean",
+                "normalize": any(isinstance(module, Normalize) for module in st_model),
+                "max_seq_length": st_model.max_seq_length,
+            }, f, indent=1)
+        # El modelo se publica al final: un directorio sin model.onnx se vuelve a exportar
+        os.replace(tmp_path, model_path)
+        logger.info(f"Modelo {model_name} exportado a ONNX en {output_dir} "
+                    f"({time.perf_counter() - start:.1f} s)")
+
+    if quantize == "int8" and not os.path.exists(os.path.join(output_dir, "model_int8.onnx")):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        tmp_path = os.path.join(output_dir, f"model_int8.onnx.tmp-{os.getpid()}")
+        quantize_dynamic(model_path, tmp_path, weight_type=QuantType.QInt8)
+        os.replace(tmp_path, os.path.join(output_dir, "model_int8.onnx"))
+        logger.info(f"Modelo ONNX cuantizado a int8 en {output_dir}")
+    return output_dir
+
+
+def onnx_model_dir(model_name: str, base_dir: Optional[str] = None) -> str:
+    """Directorio de la exportación ONNX de `model_name` dentro de `EMBEDDING_ONNX_DIR`."""
+    base_dir = base_dir or os.getenv("EMBEDDING_ONNX_DIR") or DEFAULT_ONNX_DIR
+    return os.path.join(base_dir, re.sub(r"[^A-Za-z0-9_.-]+", "__", model_name))
+
+
+class OnnxEngine:
+    """Transformer exportado a ONNX, ejecutado con ONNX Runtime en CPU con pooling y normalización en NumPy."""
+
+    name = "onnx"
+
+    def __init__(self, model_name: str = DEFAULT_MODEL_NAME, quantize: str = "none", threads: int = 0,
+                 model_dir: Optional[str] = None):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.quantize = _check_quantize(quantize)
+        self.model_dir = export_onnx(model_name, model_dir or onnx_model_dir(model_name), self.quantize)
+        with open(os.path.join(self.model_dir, "pooling.json"), encoding="utf-8") as f:
+            config = json.load(f)
+        self.pooling = config["pooling"]
+        self.normalize = config["normalize"]
+        self.max_seq_length = config["max_seq_length"]
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_dir)
+        self.tokenizer_path = self.model_dir
+
+        options = ort.SessionOptions()
+        if threads > 0:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        filename = "model_int8.onnx" if self.quantize == "int8" else "model.onnx"
+        self.session = ort.InferenceSession(os.path.join(self.model_dir, filename), options,
+                                            providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encoded = self.tokenizer(texts, padding=True, truncation="longest_first",
+                                 max_length=self.max_seq_length, return_tensors="np")
+        hidden = self.session.run(None, {name: encoded[name].astype(np.int64) for name in self.input_names})[0]
+        if self.pooling == "cls":
+            embeddings = hidden[:, 0]
+        else:
+            mask = encoded["attention_mask"][..., None].astype(np.float32)
+            embeddings = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            embeddings = embeddings / np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings.astype(np.float32)
+
+    def encode(self, texts: Union[str, List[str]], batch_size: int = 32, show_progress_bar: bool = False,
+               **kwargs) -> np.ndarray:
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        output = None
+        for indices, batch in _batches(texts, batch_size):
+            embeddings = self._encode_batch(batch)
+            if output is None:
+                output = np.empty((len(texts), embeddings.shape[1]), dtype=np.float32)
+            output[indices] = embeddings
+        if output is None:
+            return np.zeros((0,), dtype=np.float32)
+        return output[0] if single else output
+
+
+def create_engine(engine: Optional[str] = None, model_name: str = DEFAULT_MODEL_NAME,
+                  quantize: Optional[str] = None, threads: Optional[int] = None):
+    """
+    Crea el motor de embeddings. Los parámetros omitidos se leen del entorno: `EMBEDDING_ENGINE`
+    (`torch` u `onnx`), `EMBEDDING_QUANTIZE` (`none` o `int8`) y `EMBEDDING_THREADS` (0 = valor por defecto).
+    """
+    engine = (engine or os.getenv("EMBEDDING_ENGINE", "torch")).lower()
+    quantize = quantize or os.getenv("EMBEDDING_QUANTIZE", "none")
+    threads = threads if threads is not None else int(os.getenv("EMBEDDING_THREADS", "0"))
+    start = time.perf_counter()
+    if engine == "torch":
+        instance = TorchEngine(model_name, quantize, threads)
+    elif engine == "onnx":
+        instance = OnnxEngine(model_name, quantize, threads)
+    else:
+        raise ValueError(f"Motor de embeddings desconocido: {engine}")
+    logger.info(f"Motor de embeddings '{engine}' ({instance.quantize}) cargado para {model_name} "
+                f"en {time.perf_counter() - start:.1f} s")
+    return instance
+
+
+def embedding_dimension(engine) -> int:
+    """Dimensión de los embeddings de un motor, medida codificando un texto."""
+    return int(engine.encode(["dimension"]).shape[-1])
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Exporta el modelo de embeddings a ONNX")
+    parser.add_argument("--model", default=DEFAULT_MODEL_NAME)
+    parser.add_argument("--output-dir", default=None)
+    parser.add_argument("--quantize", choices=SUPPORTED_QUANTIZATION, default="none")
+    args = parser.parse_args()
+    print(export_onnx(args.model, args.output_dir or onnx_model_dir(args.model), args.quantize))
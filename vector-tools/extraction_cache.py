@@ -0,0 +1,142 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+import zlib
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Cambiarla invalida todas las entradas (p. ej. si cambia la forma en que los extractores leen las páginas)
+CACHE_VERSION = 1
+ENTRY_SUFFIX = ".jsonl.z"
+# Archivos temporales de escrituras interrumpidas que se eliminan al evictar
+STALE_TMP_SECONDS = 3600
+
+Page = Tuple[int, str]
+
+
+class ExtractionCache:
+    """
+    Caché local de la extracción de texto, direccionada por contenido: la clave es el MD5 del archivo (el
+    `md5Checksum` de Drive) y su formato, así que un archivo sin cambios no se vuelve a descargar ni a parsear,
+    aunque cambien el chunker o el modelo de embeddings.
+
+    Cada entrada guarda las páginas extraídas, antes del chunking, como líneas JSON comprimidas con zlib; se
+    escriben y se leen de a una página, sin armar el documento completo en memoria. Las escrituras son
+    atómicas (archivo temporal + rename), por lo que varios procesos de extracción pueden llenar la caché a la
+    vez. El tamaño se acota a `max_bytes` descartando las entradas usadas menos recientemente (`evict`).
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 ** 2, level: int = 6):
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self.level = level
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, checksum: str, fmt: str) -> str:
+        return hashlib.sha1(f"{CACHE_VERSION}:{fmt}:{checksum}".encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def owns(self, path: Optional[str]) -> bool:
+        """Indica si `path` es una entrada de esta caché (y no un archivo descargado)."""
+        return bool(path) and os.path.dirname(os.path.abspath(path)) == self.directory and path.endswith(ENTRY_SUFFIX)
+
+    def get(self, checksum: Optional[str], fmt: Optional[str]) -> Optional[str]:
+        """Ruta de la entrada del archivo con ese checksum y formato, o None. Marca la entrada como usada."""
+        if not checksum or not fmt:
+            return None
+        path = self.path(self.key(checksum, fmt))
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def read(self, path: str) -> Tuple[Dict[str, Any], Iterator[Page]]:
+        """Cabecera de una entrada (`format`, `paginated`) y un iterador de sus páginas."""
+        lines = self._iter_lines(path)
+        header = json.loads(next(lines))
+        return header, ((page, text) for page, text in map(json.loads, lines))
+
+    def _iter_lines(self, path: str, block_size: int = 1 << 16) -> Iterator[str]:
+        decompressor = zlib.decompressobj()
+        pending = b""
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                pending += decompressor.decompress(block)
+                *lines, pending = pending.split(b"\n")
+                for line in lines:
+                    yield line.decode("utf-8")
+        pending += decompressor.flush()
+        if pending:
+            yield pending.decode("utf-8")
+
+    def record(self, checksum: str, fmt: str, pages: Iterable[Page], paginated: bool = True) -> Iterator[Page]:
+        """
+        Entrega las páginas de `pages` a medida que llegan y las guarda en la caché. La entrada se publica solo
+        si `pages` se recorre completo: si la extracción falla o se abandona, no queda nada en la caché.
+        """
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        committed = False
+        try:
+            with os.fdopen(fd, "wb") as f:
+                compressor = zlib.compressobj(self.level)
+                header = {"format": fmt, "paginated": paginated, "checksum": checksum}
+                f.write(compressor.compress(json.dumps(header).encode("utf-8")))
+                for page in pages:
+                    f.write(compressor.compress(b"\n" + json.dumps(page, ensure_ascii=False).encode("utf-8")))
+                    yield page
+                f.write(compressor.flush())
+            os.replace(tmp, self.path(self.key(checksum, fmt)))
+            committed = True
+        finally:
+            if not committed:
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+
+    def size(self) -> int:
+        return sum(size for _, _, size in self._entries())
+
+    def _entries(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(ENTRY_SUFFIX):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                yield entry.path, stat.st_mtime, stat.st_size
+
+    def evict(self) -> int:
+        """Elimina las entradas usadas menos recientemente hasta que la caché quede bajo `max_bytes`. Devuelve las eliminadas."""
+        now = time.time()
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".tmp"):
+                try:
+                    if now - entry.stat().st_mtime > STALE_TMP_SECONDS:
+                        os.unlink(entry.path)
+                except OSError:
+                    pass
+
+        entries = sorted(self._entries(), key=lambda e: e[1])
+        total = sum(size for _, _, size in entries)
+        removed = 0
+        for path, _, size in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError as e:
+                logger.warning(f"No se pudo eliminar la entrada de caché {path}: {str(e)}")
+                continue
+            total -= size
+            removed += 1
+        if removed:
+            logger.info(f"Caché de extracción: {removed} entradas eliminadas, {total / 1024 ** 2:.1f} MB en uso")
+        return removed
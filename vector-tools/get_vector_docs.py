@@ -1,21 +1,183 @@
 # from google.adk import Tool, Parameter
 # from google.adk.tool import ToolContext
-from supabase import create_client
-from sentence_transformers import SentenceTransformer
 import os
 from dotenv import load_dotenv
-import pprint
+import atexit
+import asyncio
+import logging
+import threading
+import time
+from embedding_cache import EmbeddingCache, normalizar_consulta
+from index_registry import EmbeddingSpec
+from embedding_batcher import MicroBatcher
+from result_formatter import compactar_resultados, describir_fuente
+from instrumentation import RESULT_TOKENS, log_event, span, will_log
 
 # Load environment variables from root .env file
 load_dotenv(os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env'))
 
-# Configuración de Supabase
-supabase_url = os.getenv("SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_KEY")
-supabase = create_client(supabase_url, supabase_key)
+# Backend de búsqueda configurable: RPC de Supabase o índice local en memoria
+from retrieval_backends import get_retrieval_backend
 
-# Modelo de embeddings (debe coincidir con el usado para crear los embeddings)
-model = SentenceTransformer('all-MiniLM-L6-v2')
+logger = logging.getLogger(__name__)
+
+# Modelo de embeddings (debe coincidir con el usado para crear los embeddings). Se carga en el primer uso
+# o en el warmup de fondo, no al importar el módulo: importar torch y cargar el modelo toma varios segundos
+EMBEDDING_MODEL_NAME = os.getenv('EMBEDDING_MODEL_NAME', 'all-MiniLM-L6-v2')
+_model = None
+_model_lock = threading.Lock()
+
+# Duración en segundos de cada etapa de la inicialización (se informa en /ready y en el log de arranque)
+startup_timings = {}
+_warmup_thread = None
+_warmup_lock = threading.Lock()
+_warmup_error = None
+_ready = threading.Event()
+WARMUP_ATTEMPTS = int(os.getenv("WARMUP_ATTEMPTS", "3"))
+
+def get_model():
+    """Devuelve el modelo de embeddings, cargándolo la primera vez (una sola vez aunque haya llamadas concurrentes)."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                start = time.perf_counter()
+                from embedding_engines import create_engine
+                startup_timings["import_embedding_engines"] = time.perf_counter() - start
+                start = time.perf_counter()
+                # Motor según EMBEDDING_ENGINE (torch u onnx), EMBEDDING_QUANTIZE y EMBEDDING_THREADS
+                _model = create_engine(model_name=EMBEDDING_MODEL_NAME)
+                startup_timings["model_load"] = time.perf_counter() - start
+    return _model
+
+# Caché LRU de embeddings de consultas; con QUERY_CACHE_PATH se persiste al terminar el proceso, junto con el
+# modelo que calculó los embeddings: al arrancar con otro modelo (o versión) el archivo se descarta
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "2048"))
+QUERY_CACHE_PATH = os.getenv("QUERY_CACHE_PATH") or None
+query_cache = EmbeddingCache(QUERY_CACHE_SIZE, QUERY_CACHE_PATH, spec=EmbeddingSpec.from_env())
+if QUERY_CACHE_PATH:
+    atexit.register(query_cache.save)
+
+# Las consultas concurrentes se agrupan en lotes de hasta EMBEDDING_MAX_BATCH textos, esperando como
+# máximo EMBEDDING_BATCH_WAIT_MS milisegundos, y se codifican con una sola llamada a model.encode
+EMBEDDING_BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5"))
+EMBEDDING_MAX_BATCH = int(os.getenv("EMBEDDING_MAX_BATCH", "32"))
+embedding_batcher = MicroBatcher(
+    lambda textos: get_model().encode(textos, batch_size=len(textos), show_progress_bar=False),
+    max_batch=EMBEDDING_MAX_BATCH,
+    max_wait_ms=EMBEDDING_BATCH_WAIT_MS,
+)
+
+# Tiempo máximo en segundos de una búsqueda asíncrona (embedding + consulta al backend)
+SEARCH_TIMEOUT = float(os.getenv("SEARCH_TIMEOUT", "15"))
+# Máximo de resultados de una búsqueda sobre varios productos, después de fusionarlos
+MULTI_SEARCH_MAX_RESULTS = int(os.getenv("MULTI_SEARCH_MAX_RESULTS", "10"))
+# Tokens (aproximados) de contenido que cada búsqueda entrega al agente; 0 entrega los chunks completos
+RESULT_TOKEN_BUDGET = int(os.getenv("RESULT_TOKEN_BUDGET", "1000"))
+# Tokens acumulados por el post-procesado de resultados desde el arranque
+format_stats = {"calls": 0, "tokens_in": 0, "tokens_out": 0, "tokens_saved": 0}
+
+def warmup() -> dict:
+    """
+    Inicializa todo lo que la primera búsqueda necesitaría: carga el modelo, codifica una consulta de prueba
+    (la primera inferencia es la más lenta) y crea el backend de búsqueda. Devuelve `startup_timings`.
+    """
+    global _warmup_error
+    total = time.perf_counter()
+    try:
+        get_model()
+        start = time.perf_counter()
+        embedding_batcher.encode("warmup")
+        startup_timings["first_encode"] = time.perf_counter() - start
+        start = time.perf_counter()
+        get_retrieval_backend()
+        startup_timings["retrieval_backend"] = time.perf_counter() - start
+    except Exception as e:
+        _warmup_error = str(e)
+        logger.error(f"Error en el warmup de búsqueda: {_warmup_error}")
+        raise
+    startup_timings["warmup_total"] = time.perf_counter() - total
+    _warmup_error = None
+    _ready.set()
+    logger.info("Warmup de búsqueda completo: " + ", ".join(
+        f"{stage}={seconds * 1000:.0f} ms" for stage, seconds in startup_timings.items()))
+    return startup_timings
+
+def start_warmup() -> threading.Thread:
+    """
+    Lanza `warmup` en un thread de fondo (una sola vez), para no retrasar que el servidor abra el puerto.
+    Si falla se reintenta hasta `WARMUP_ATTEMPTS` veces; el último error queda en `readiness()`.
+    """
+    global _warmup_thread
+    with _warmup_lock:
+        if _warmup_thread is None:
+            def _run():
+                # Reintentos con espera creciente ante fallas transitorias (p. ej. la descarga del modelo)
+                for attempt in range(WARMUP_ATTEMPTS):
+                    try:
+                        warmup()
+                        return
+                    except Exception:
+                        if attempt + 1 < WARMUP_ATTEMPTS:
+                            time.sleep(2 ** attempt)
+            _warmup_thread = threading.Thread(target=_run, name="search-warmup", daemon=True)
+            _warmup_thread.start()
+    return _warmup_thread
+
+def readiness() -> dict:
+    """Estado del warmup para el endpoint de readiness: `ready`, `error` y los tiempos por etapa en ms."""
+    return {
+        "ready": _ready.is_set(),
+        "error": _warmup_error,
+        "timings_ms": {stage: round(seconds * 1000, 1) for stage, seconds in startup_timings.items()},
+    }
+
+def embed_query(consulta: str) -> list:
+    """Devuelve el embedding de la consulta, usando la caché de consultas normalizadas."""
+    with span("embed"):
+        return query_cache.get_or_compute(consulta, embedding_batcher.encode).tolist()
+
+async def aembed_query(consulta: str) -> list:
+    """Versión asíncrona de `embed_query`: espera el lote del micro-batcher sin bloquear el event loop."""
+    with span("embed"):
+        key = normalizar_consulta(consulta)
+        embedding = query_cache.get(key)
+        if embedding is None:
+            embedding = await embedding_batcher.aencode(consulta)
+            query_cache.put(key, embedding)
+        return embedding.tolist()
+
+def formatear_resultados(results: list, mostrar_categoria: bool = False) -> str:
+    """Formatea las filas devueltas por el backend como texto para el agente."""
+    if not results:
+        return "No se encontraron documentos relevantes para esta consulta."
+    
+    formatted_results = "Información encontrada en los documentos:\n\n"
+    if RESULT_TOKEN_BUDGET <= 0:
+        for i, result in enumerate(results, 1):
+            formatted_results += f"Resultado {i} (Similitud: {result['similarity']:.2f}):\n"
+            if mostrar_categoria:
+                formatted_results += f"Producto: {result['metadata'].get('category', 'Sin categoría')}\n"
+            formatted_results += f"Contenido: {result['content']}\n"
+            formatted_results += f"Fuente: {result['metadata']['source']}\n\n"
+        return formatted_results
+    
+    # Une chunks solapados del mismo documento y ajusta el contenido al presupuesto de tokens
+    passages, stats = compactar_resultados(results, RESULT_TOKEN_BUDGET)
+    format_stats["calls"] += 1
+    for key in ("tokens_in", "tokens_out", "tokens_saved"):
+        format_stats[key] += stats[key]
+    RESULT_TOKENS.inc(stats["tokens_in"], kind="in")
+    RESULT_TOKENS.inc(stats["tokens_out"], kind="out")
+    log_event("results_compacted", chunks=len(results), passages=len(passages), **stats)
+    for i, passage in enumerate(passages, 1):
+        formatted_results += f"Resultado {i} (Similitud: {passage.similarity:.2f}):\n"
+        if mostrar_categoria:
+            formatted_results += f"Producto: {passage.metadata.get('category', 'Sin categoría')}\n"
+        formatted_results += f"Contenido: {passage.content}\n"
+        formatted_results += f"Fuente: {describir_fuente(passage)}\n\n"
+    
+    return formatted_results
 
 def buscar_documentos(params: dict) -> str:
     """Busca documentos relevantes basados en la consulta proporcionada."""
@@ -24,49 +186,101 @@ def buscar_documentos(params: dict) -> str:
     umbral = params.get("umbral_similitud", 0.1)
     categoria = params.get("categoria", None)
     
-    # Generar embedding para la consulta
-    query_embedding = model.encode(consulta).tolist()
-    print("[LOG] Consulta:", consulta)
-    print("[LOG] Embedding generado (primeros 10 valores):", query_embedding[:10], "... (total:", len(query_embedding), ")")
-    
-    # Payload para Supabase
-    payload = {
-        'query_embedding': query_embedding,
-        'match_threshold': umbral,
-        'match_count': limite
-    }
-    print("[LOG] Payload enviado a Supabase:")
-    pprint.pprint(payload)
-    
-    # Realizar búsqueda en Supabase
-    if categoria:
-        print(f"[LOG] Filtrando por categoría: {categoria}")
-        # Intentar filtrar por la categoría del producto en los metadatos
-        response = supabase.rpc(
-            'match_documents_by_category',
-            {**payload, 'category_name': categoria}
-        ).execute()
-    else:
-        response = supabase.rpc(
-            'match_documents',
-            payload
-        ).execute()
-    
-    print("[LOG] Respuesta cruda de Supabase:")
-    pprint.pprint(response.data)
-    
-    results = response.data
+    with span("search", category=categoria):
+        # Generar embedding para la consulta (o usar el ya calculado por quien llama)
+        query_embedding = params.get("query_embedding") or embed_query(consulta)
+        backend = get_retrieval_backend()
+        # Las estadísticas toman los locks de la caché y del batcher: solo se leen si el evento se registra
+        if will_log():
+            log_event("search", sample=False, consulta=consulta, categoria=categoria, backend=backend.name,
+                      umbral=umbral, limite=limite, query_cache=query_cache.stats(),
+                      batcher=embedding_batcher.stats())
+        log_event("backend_payload", logging.DEBUG, query_embedding=query_embedding, match_threshold=umbral,
+                  match_count=limite)
+        
+        # Realizar búsqueda (Supabase RPC o índice local según RETRIEVAL_BACKEND)
+        with span("rpc", category=categoria, backend=backend.name):
+            results = backend.match(query_embedding, umbral, limite, category=categoria, query_text=consulta)
+        log_event("backend_response", logging.DEBUG, rows=results)
+        
+        # Formatear resultados
+        with span("format", category=categoria):
+            return formatear_resultados(results)
+
+async def buscar_documentos_async(params: dict) -> str:
+    """
+    Versión asíncrona de `buscar_documentos`: el embedding se genera con el micro-batcher y la búsqueda usa
+    el cliente HTTP asíncrono del backend. Si en total tarda más de `SEARCH_TIMEOUT` segundos se cancela y
+    se lanza `asyncio.TimeoutError`.
+    """
+    categoria = params.get("categoria", None)
+    with span("search", category=categoria):
+        results = await asyncio.wait_for(_buscar_filas_async(params), timeout=params.get("timeout", SEARCH_TIMEOUT))
+        with span("format", category=categoria):
+            return formatear_resultados(results)
+
+async def _buscar_filas_async(params: dict) -> list:
+    consulta = params.get("consulta")
+    limite = params.get("numero_resultados", 5)
+    umbral = params.get("umbral_similitud", 0.1)
+    categoria = params.get("categoria", None)
     
-    if not results:
-        return "No se encontraron documentos relevantes para esta consulta."
+    query_embedding = params.get("query_embedding") or await aembed_query(consulta)
+    backend = get_retrieval_backend()
+    log_event("search", consulta=consulta, categoria=categoria, backend=backend.name, umbral=umbral, limite=limite)
+    log_event("backend_payload", logging.DEBUG, query_embedding=query_embedding, match_threshold=umbral,
+              match_count=limite)
+    with span("rpc", category=categoria, backend=backend.name):
+        results = await backend.amatch(query_embedding, umbral, limite, category=categoria, query_text=consulta)
+    log_event("backend_response", logging.DEBUG, rows=results)
+    return results
+
+def _clave_chunk(result: dict):
+    metadata = result.get("metadata") or {}
+    if metadata.get("source") is None:
+        return result.get("id")
+    return metadata["source"], metadata.get("chunk_index")
+
+def fusionar_resultados(listas: list, limite: int) -> list:
+    """
+    Une los resultados de varias búsquedas en una sola lista ordenada por similitud. Un mismo chunk
+    (`metadata.source` + `metadata.chunk_index`) aparece una vez, con su mayor similitud. El mejor resultado
+    de cada búsqueda entra primero, así ningún producto queda fuera por tener similitudes más bajas.
+    """
+    mejores = {}
+    for results in listas:
+        for result in results:
+            clave = _clave_chunk(result)
+            if clave not in mejores or result["similarity"] > mejores[clave]["similarity"]:
+                mejores[clave] = result
     
-    # Formatear resultados
-    formatted_results = "Información encontrada en los documentos:\n\n"
-    for i, result in enumerate(results, 1):
-        formatted_results += f"Resultado {i} (Similitud: {result['similarity']:.2f}):\n"
-        formatted_results += f"Contenido: {result['content']}\n"
-        formatted_results += f"Fuente: {result['metadata']['source']}\n\n"
+    elegidas = list(dict.fromkeys(_clave_chunk(results[0]) for results in listas if results))
+    ordenadas = sorted(mejores, key=lambda clave: -mejores[clave]["similarity"])
+    elegidas = list(dict.fromkeys(elegidas + ordenadas))[:max(limite, 0)]
+    return sorted((mejores[clave] for clave in elegidas), key=lambda result: -result["similarity"])
+
+async def buscar_documentos_multiples_async(busquedas: list, limite: int = None) -> str:
+    """
+    Ejecuta en paralelo varias búsquedas (una por producto, con los mismos parámetros que
+    `buscar_documentos_async`) y devuelve un solo resultado fusionado con `fusionar_resultados`, de hasta
+    `limite` filas (por defecto `MULTI_SEARCH_MAX_RESULTS`). Si una búsqueda falla se omite; si fallan
+    todas se relanza el error. El conjunto se cancela si tarda más de `SEARCH_TIMEOUT` segundos.
+    """
+    async def _buscar_todas():
+        return await asyncio.gather(*(_buscar_filas_async(params) for params in busquedas), return_exceptions=True)
     
-    return formatted_results
+    with span("search", category="multi", searches=len(busquedas)):
+        respuestas = await asyncio.wait_for(_buscar_todas(), timeout=SEARCH_TIMEOUT)
+        listas = []
+        for params, respuesta in zip(busquedas, respuestas):
+            if isinstance(respuesta, BaseException):
+                log_event("search_failed", logging.ERROR, categoria=params.get("categoria"), error=str(respuesta))
+            else:
+                listas.append(respuesta)
+        if not listas and respuestas:
+            raise respuestas[0]
+        results = fusionar_resultados(listas, limite if limite is not None else MULTI_SEARCH_MAX_RESULTS)
+        with span("format", category="multi"):
+            return formatear_resultados(results, mostrar_categoria=True)
 
 # Más herramientas pueden ser agregadas según sea necesario...
\ No newline at end of file
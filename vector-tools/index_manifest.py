@@ -0,0 +1,119 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+
+def content_hash(text: str) -> str:
+    """Hash estable del contenido de un chunk, usado para detectar cambios entre sincronizaciones."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def file_md5(path: str, block_size: int = 1 << 20) -> str:
+    """MD5 de un archivo local, equivalente al `md5Checksum` que informa Drive."""
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IndexManifest:
+    """
+    Manifiesto local del índice: por cada archivo de origen guarda su `modifiedTime`/`md5Checksum`,
+    la configuración del chunker con que se dividió y los hashes de los chunks que tiene insertados en Supabase.
+    Los archivos eliminados quedan como tombstones para no volver a procesarlos.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.exists = os.path.exists(path)
+        if self.exists:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != MANIFEST_VERSION:
+                logger.warning(f"Versión de manifiesto desconocida en {path}: {data.get('version')}")
+            self.files = data.get("files", {})
+
+    def get(self, file_id: str) -> Optional[Dict[str, Any]]:
+        """Devuelve la entrada del archivo, o None si no está o fue eliminado."""
+        entry = self.files.get(file_id)
+        if entry is None or entry.get("deleted"):
+            return None
+        return entry
+
+    def is_unchanged(self, file: Dict[str, Any], chunker: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Indica si el archivo ya está indexado con el mismo checksum (o modifiedTime si no hay checksum) y,
+        si se indica `chunker`, con esa misma configuración de chunker. Las entradas anteriores a guardar
+        el chunker cuentan como cambiadas, así un cambio de chunker vuelve a dividir todos los archivos.
+        """
+        entry = self.get(file["id"])
+        if entry is None:
+            return False
+        if chunker is not None and entry.get("chunker") != chunker:
+            return False
+        if file.get("md5Checksum"):
+            return entry.get("md5Checksum") == file["md5Checksum"]
+        return bool(file.get("modifiedTime")) and entry.get("modifiedTime") == file["modifiedTime"]
+
+    def chunk_hashes(self, file_id: str) -> Dict[str, int]:
+        """Hashes de chunks indexados del archivo, con su chunk_index."""
+        entry = self.get(file_id)
+        return dict(entry.get("chunks", {})) if entry else {}
+
+    def record_file(self, file: Dict[str, Any], chunks: Dict[str, int], category: str = None,
+                    complete: bool = True, chunker: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Registra el estado indexado de un archivo, dividido con la configuración de chunker `chunker`.
+        Si `complete` es False el checksum no se guarda, de modo que la próxima sincronización vuelva a
+        revisar el archivo.
+        """
+        self.files[file["id"]] = {
+            "name": file.get("name"),
+            "path": file.get("path"),
+            "category": category,
+            "modifiedTime": file.get("modifiedTime") if complete else None,
+            "md5Checksum": file.get("md5Checksum") if complete else None,
+            "chunker": chunker,
+            "chunks": chunks,
+            "indexed_at": datetime.now(timezone.utc).isoformat(),
+        }
+
+    def tombstone(self, file_id: str) -> None:
+        """Marca un archivo como eliminado del origen."""
+        entry = self.files.get(file_id, {})
+        self.files[file_id] = {
+            "name": entry.get("name"),
+            "path": entry.get("path"),
+            "category": entry.get("category"),
+            "deleted": True,
+            "deleted_at": datetime.now(timezone.utc).isoformat(),
+            "chunks": {},
+        }
+
+    def active_file_ids(self) -> List[str]:
+        """IDs de archivos indexados que no han sido eliminados."""
+        return [file_id for file_id, entry in self.files.items() if not entry.get("deleted")]
+
+    def reset(self) -> None:
+        """Olvida todo el estado (reindexación completa)."""
+        self.files = {}
+
+    def save(self) -> None:
+        """Guarda el manifiesto de forma atómica."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=directory, delete=False,
+                                         suffix=".tmp") as tmp:
+            json.dump({"version": MANIFEST_VERSION, "files": self.files}, tmp, ensure_ascii=False, indent=1)
+        os.replace(tmp.name, self.path)
+        self.exists = True
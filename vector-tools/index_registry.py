@@ -0,0 +1,196 @@
+"""
+Registro de índices vectoriales y del modelo de embeddings con que se construyó cada uno.
+
+Cada índice es una tabla de chunks con sus funciones RPC de búsqueda (`match_documents` /
+`match_documents_by_category` para la tabla `documents`) y un `EmbeddingSpec`: modelo, versión y dimensión.
+Los embeddings de un modelo solo se pueden comparar con los de ese mismo modelo, así que:
+
+- La búsqueda consulta el índice que corresponde al modelo que tiene cargado (`resolve_index`).
+- La ingesta solo escribe en el índice activo, y solo si usa su mismo modelo.
+- Un cambio de modelo construye un índice nuevo en paralelo (`reembed.py`, estado `building`) y lo activa
+  al final con `activate`, que cambia de índice activo en una sola sentencia. El índice anterior queda como
+  `retired`: las instancias que siguen con el modelo anterior lo consultan hasta que se actualizan.
+
+Sin índices registrados (o sin la tabla `index_registry`) se usa la tabla `documents`, como antes del registro.
+"""
+import logging
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+# Agregar la ruta del directorio utils al path para usar el registro compartido de clientes
+utils_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'utils')
+if utils_path not in sys.path:
+    sys.path.append(utils_path)
+
+from clients import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+# Tabla de Supabase con los índices registrados (ver README); vacía desactiva el registro
+INDEX_REGISTRY_TABLE = os.getenv("INDEX_REGISTRY_TABLE", "index_registry")
+DEFAULT_MODEL_NAME = "all-MiniLM-L6-v2"
+DEFAULT_MODEL_VERSION = "1"
+
+# Estados de un índice: en construcción, completo, el que recibe la ingesta, y el activo anterior
+BUILDING, READY, ACTIVE, RETIRED = "building", "ready", "active", "retired"
+_SERVING_PRIORITY = {ACTIVE: 0, READY: 1, RETIRED: 2}
+
+
+@dataclass(frozen=True)
+class EmbeddingSpec:
+    """Modelo de embeddings de un índice. La versión distingue pesos distintos bajo un mismo nombre."""
+    model: str
+    version: str = DEFAULT_MODEL_VERSION
+    dim: Optional[int] = None
+
+    @classmethod
+    def from_env(cls, dim: Optional[int] = None) -> "EmbeddingSpec":
+        """El modelo configurado con EMBEDDING_MODEL_NAME y EMBEDDING_MODEL_VERSION."""
+        return cls(os.getenv("EMBEDDING_MODEL_NAME", DEFAULT_MODEL_NAME),
+                   os.getenv("EMBEDDING_MODEL_VERSION", DEFAULT_MODEL_VERSION), dim)
+
+    def matches(self, other: "EmbeddingSpec") -> bool:
+        """Mismo modelo y versión; la dimensión se compara solo si ambos la conocen."""
+        return (self.model == other.model and str(self.version) == str(other.version)
+                and (self.dim is None or other.dim is None or self.dim == other.dim))
+
+    def metadata(self) -> Dict[str, Any]:
+        """Campos que se guardan en la metadata de cada chunk."""
+        return {"embedding_model": self.model, "embedding_version": str(self.version), "embedding_dim": self.dim}
+
+    def slug(self) -> str:
+        """Sufijo para nombrar la tabla y las funciones de un índice (p. ej. "multilingual_e5_small_v1")."""
+        name = re.sub(r"[^a-z0-9]+", "_", os.path.basename(self.model.rstrip("/")).lower()).strip("_")
+        return f"{name}_v{re.sub(r'[^a-z0-9]+', '_', str(self.version).lower())}"
+
+    def __str__(self) -> str:
+        return f"{self.model} v{self.version}" + (f" ({self.dim} dim)" if self.dim else "")
+
+
+@dataclass
+class IndexInfo:
+    """Un índice registrado: tabla, funciones RPC de búsqueda, modelo y estado."""
+    name: str
+    table: str
+    match_function: str
+    match_by_category_function: str
+    embedding: EmbeddingSpec
+    status: str = BUILDING
+    updated_at: Optional[str] = field(default=None, compare=False)
+
+    @classmethod
+    def for_spec(cls, spec: EmbeddingSpec, name: Optional[str] = None) -> "IndexInfo":
+        """Índice con los nombres por defecto para un modelo: tabla `documents_<slug>` y sus funciones."""
+        name = name or f"documents_{spec.slug()}"
+        return cls(name, name, f"match_{name}", f"match_{name}_by_category", spec)
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "IndexInfo":
+        return cls(
+            name=row["name"],
+            table=row["table_name"],
+            match_function=row["match_function"],
+            match_by_category_function=row["match_by_category_function"],
+            embedding=EmbeddingSpec(row["embedding_model"], str(row["embedding_version"]), row.get("embedding_dim")),
+            status=row["status"],
+            updated_at=row.get("updated_at"),
+        )
+
+    def to_row(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "table_name": self.table,
+            "match_function": self.match_function,
+            "match_by_category_function": self.match_by_category_function,
+            "embedding_model": self.embedding.model,
+            "embedding_version": str(self.embedding.version),
+            "embedding_dim": self.embedding.dim,
+            "status": self.status,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }
+
+
+def legacy_index(spec: Optional[EmbeddingSpec] = None) -> IndexInfo:
+    """La tabla `documents` original, que se supone construida con el modelo configurado."""
+    return IndexInfo("documents", "documents", "match_documents", "match_documents_by_category",
+                     spec or EmbeddingSpec.from_env(), ACTIVE)
+
+
+def resolve_index(indexes: List[IndexInfo], spec: EmbeddingSpec) -> IndexInfo:
+    """
+    Índice para consultar con el modelo `spec`: el activo si usa ese modelo; si no, uno completo (`ready`) o
+    retirado con el mismo modelo, el más reciente. Sin índices registrados, la tabla `documents`. Lanza
+    ValueError si hay índices pero ninguno es del modelo, en vez de comparar embeddings de modelos distintos.
+    """
+    if not indexes:
+        return legacy_index(spec)
+    candidates = [index for index in indexes if index.status in _SERVING_PRIORITY and index.embedding.matches(spec)]
+    if not candidates:
+        available = ", ".join(f"{index.name} ({index.embedding}, {index.status})" for index in indexes)
+        raise ValueError(f"No hay un índice construido con el modelo {spec}. Índices registrados: {available}")
+    candidates.sort(key=lambda index: index.updated_at or "", reverse=True)
+    candidates.sort(key=lambda index: _SERVING_PRIORITY[index.status])
+    chosen = candidates[0]
+    if chosen.status != ACTIVE:
+        logger.warning(f"El índice {chosen.name} del modelo {spec} no es el activo ({chosen.status}); "
+                       f"no recibe documentos nuevos")
+    return chosen
+
+
+class IndexRegistry:
+    """Acceso a la tabla `index_registry` de Supabase."""
+
+    def __init__(self, table: str = INDEX_REGISTRY_TABLE, client_factory=get_supabase_client):
+        self.table = table
+        self.client_factory = client_factory
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.table)
+
+    def list(self) -> List[IndexInfo]:
+        if not self.enabled:
+            return []
+        response = self.client_factory().table(self.table).select("*").execute()
+        return [IndexInfo.from_row(row) for row in response.data or []]
+
+    def get(self, name: str) -> Optional[IndexInfo]:
+        return next((index for index in self.list() if index.name == name), None)
+
+    def active(self) -> Optional[IndexInfo]:
+        return next((index for index in self.list() if index.status == ACTIVE), None)
+
+    def building(self) -> List[IndexInfo]:
+        return [index for index in self.list() if index.status == BUILDING]
+
+    def register(self, index: IndexInfo) -> None:
+        """Crea o actualiza el registro del índice (la tabla y sus funciones se crean aparte, ver README)."""
+        self.client_factory().table(self.table).upsert(index.to_row()).execute()
+        logger.info(f"Índice registrado: {index.name} ({index.embedding}, {index.status})")
+
+    def set_status(self, name: str, status: str) -> None:
+        self.client_factory().table(self.table).update({
+            "status": status,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }).eq("name", name).execute()
+
+    def activate(self, name: str) -> None:
+        """
+        Activa el índice `name` y retira el activo anterior con la función `activate_index`, que lo hace en una
+        sola sentencia: ninguna consulta ve dos índices activos ni ninguno.
+        """
+        self.client_factory().rpc("activate_index", {"index_name": name}).execute()
+        logger.info(f"Índice activo: {name}")
+
+    def resolve(self, spec: EmbeddingSpec) -> IndexInfo:
+        """`resolve_index` sobre los índices registrados. Si el registro no se puede leer, usa la tabla `documents`."""
+        try:
+            indexes = self.list()
+        except Exception as e:
+            logger.warning(f"No se pudo leer el registro de índices ({str(e)}); se usa la tabla 'documents'")
+            return legacy_index(spec)
+        return resolve_index(indexes, spec)
@@ -0,0 +1,41 @@
+import logging
+import os
+import sys
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+# Agregar la ruta del directorio utils al path para usar el registro compartido de clientes
+utils_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'utils')
+if utils_path not in sys.path:
+    sys.path.append(utils_path)
+
+from clients import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+# Tabla de Supabase con el estado de cada índice (ver README)
+INDEX_STATE_TABLE = os.getenv("INDEX_STATE_TABLE", "index_state")
+DEFAULT_INDEX = "documents"
+
+
+def get_index_version(name: str = DEFAULT_INDEX) -> Optional[str]:
+    """Devuelve el sello de versión actual del índice, o None si todavía no se ha registrado ninguno."""
+    response = get_supabase_client().table(INDEX_STATE_TABLE) \
+        .select("version") \
+        .eq("name", name) \
+        .limit(1) \
+        .execute()
+    return response.data[0]["version"] if response.data else None
+
+
+def bump_index_version(name: str = DEFAULT_INDEX) -> str:
+    """Registra un nuevo sello de versión del índice, invalidando las cachés de resultados que lo observan."""
+    version = f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}-{uuid.uuid4().hex[:8]}"
+    get_supabase_client().table(INDEX_STATE_TABLE).upsert({
+        "name": name,
+        "version": version,
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }).execute()
+    logger.info(f"Nueva versión del índice '{name}': {version}")
+    return version
@@ -0,0 +1,283 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from stage_timer import StageTimer
+
+logger = logging.getLogger(__name__)
+
+# Marca de fin de cola
+_DONE = object()
+
+
+@dataclass
+class FileJob:
+    """Estado de un archivo a lo largo del pipeline."""
+    file: Dict[str, Any]
+    path: Optional[str] = None
+    total_chunks: int = 0
+    chunks: List[tuple] = field(default_factory=list)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    inserted: List[Dict[str, Any]] = field(default_factory=list)
+    pending: int = 0
+    failed: bool = False
+    state: Dict[str, Any] = field(default_factory=dict)
+
+
+def _timed_call(fn: Callable, *args) -> Tuple[float, Any]:
+    """Ejecuta `fn` en el worker y devuelve también cuánto tardó (se mide dentro del proceso hijo)."""
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def default_row(job: FileJob, index: int, text: str, embedding: List[float],
+                chunk_metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Fila de la tabla 'documents' para un chunk: metadata del archivo más la propia del chunk (p. ej. páginas)."""
+    return {
+        "content": text,
+        "metadata": {**job.metadata, **(chunk_metadata or {}), "chunk_index": index},
+        "embedding": embedding,
+    }
+
+
+class IngestPipeline:
+    """
+    Pipeline de ingesta en tres etapas que se solapan:
+
+    1. Descargas en un pool de threads (`download_workers`).
+    2. Extracción, limpieza y chunking en un pool de procesos (`extract_workers`).
+    3. Un único embedder que agrupa chunks de varios archivos en lotes de `batch_size` y los escribe.
+
+    Entre etapas hay colas acotadas (`queue_size`), así que si el embedder se atrasa las descargas se
+    detienen en vez de acumular archivos en disco y memoria.
+
+    `extract(path)` debe devolver `(total_chunks, [(chunk_index, texto), ...])` y ser serializable con
+    pickle (una función de módulo), ya que se ejecuta en otro proceso. Cada chunk puede traer un tercer
+    elemento con metadata propia (p. ej. `{"page_start": 3, "page_end": 4}`), que se pasa a `make_row`.
+    Con `extract_workers=0` la extracción se ejecuta en el thread de descarga.
+
+    `cleanup` indica si se eliminan los archivos descargados después de extraerlos; puede ser una función
+    de la ruta para conservar algunos (p. ej. las entradas de una caché).
+
+    Con `extract_format(job)`, el tiempo de extracción se acumula por formato (`extract:pdf`,
+    `extract:docx`, ...) en vez de en una sola etapa `extract`.
+    """
+
+    def __init__(self,
+                 download: Callable[[Dict[str, Any]], Optional[str]],
+                 extract: Callable[[str], Tuple[int, List[tuple]]],
+                 embed: Callable[[List[str]], List[List[float]]],
+                 write: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]],
+                 prepare: Optional[Callable[[FileJob], None]] = None,
+                 make_row: Callable[[FileJob, int, str, List[float], Optional[Dict[str, Any]]],
+                                    Dict[str, Any]] = default_row,
+                 on_file_done: Optional[Callable[[FileJob], None]] = None,
+                 extract_format: Optional[Callable[[FileJob], Optional[str]]] = None,
+                 download_workers: int = 4,
+                 extract_workers: int = 2,
+                 batch_size: int = 64,
+                 queue_size: int = 8,
+                 cleanup: Union[bool, Callable[[str], bool]] = True,
+                 timer: Optional[StageTimer] = None):
+        self.download = download
+        self.extract = extract
+        self.embed = embed
+        self.write = write
+        self.prepare = prepare
+        self.make_row = make_row
+        self.on_file_done = on_file_done
+        self.extract_format = extract_format
+        self.download_workers = max(1, download_workers)
+        self.extract_workers = max(0, extract_workers)
+        self.batch_size = max(1, batch_size)
+        self.queue_size = max(1, queue_size)
+        self.cleanup = cleanup
+        self.timer = timer or StageTimer()
+        self.stats = {"files": 0, "failed": 0, "chunks": 0, "inserted": 0}
+
+    def run(self, files: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Procesa todos los archivos y devuelve contadores de archivos, chunks e inserciones. Si recorrer `files`
+        falla, termina de procesar los archivos ya recibidos y relanza el error.
+        """
+        files_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        extracted_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        feed_errors: List[Exception] = []
+        pool = ProcessPoolExecutor(max_workers=self.extract_workers) if self.extract_workers else None
+
+        def put(q: queue.Queue, item: Any) -> bool:
+            # put con timeout para no quedar bloqueado si el consumidor se detuvo por un error
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def feed():
+            try:
+                for file in files:
+                    if not put(files_q, FileJob(file=file)):
+                        return
+            except Exception as e:
+                logger.error(f"Error listing files to ingest: {str(e)}")
+                feed_errors.append(e)
+            finally:
+                # Los descargadores terminan aunque el listado se haya interrumpido
+                for _ in range(self.download_workers):
+                    put(files_q, _DONE)
+
+        def download_worker():
+            while not stop.is_set():
+                try:
+                    job = files_q.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if job is _DONE:
+                    return
+                try:
+                    with self.timer.stage("download"):
+                        job.path = self.download(job.file)
+                except Exception as e:
+                    logger.error(f"Error downloading {job.file.get('name', 'unknown')}: {str(e)}")
+                    job.path = None
+                if not job.path:
+                    job.failed = True
+                    put(extracted_q, (job, None))
+                    continue
+                if pool is not None:
+                    future = pool.submit(_timed_call, self.extract, job.path)
+                else:
+                    future = Future()
+                    try:
+                        future.set_result(_timed_call(self.extract, job.path))
+                    except Exception as e:
+                        future.set_exception(e)
+                put(extracted_q, (job, future))
+
+        def close_extracted():
+            for worker in downloaders:
+                worker.join()
+            put(extracted_q, _DONE)
+
+        feeder = threading.Thread(target=feed, name="ingest-feed", daemon=True)
+        downloaders = [
+            threading.Thread(target=download_worker, name=f"ingest-download-{i}", daemon=True)
+            for i in range(self.download_workers)
+        ]
+        closer = threading.Thread(target=close_extracted, name="ingest-close", daemon=True)
+        for thread in [feeder, *downloaders, closer]:
+            thread.start()
+
+        try:
+            self._embed_loop(extracted_q)
+        finally:
+            stop.set()
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+        if feed_errors:
+            raise feed_errors[0]
+        return dict(self.stats)
+
+    def _embed_loop(self, extracted_q: queue.Queue) -> None:
+        """Etapa de embeddings: consume archivos extraídos, arma lotes entre archivos y los escribe."""
+        batch: List[Tuple[FileJob, int, str, Optional[Dict[str, Any]]]] = []
+        while True:
+            try:
+                item = extracted_q.get(timeout=0.5)
+            except queue.Empty:
+                # Sin trabajo entrante: vaciar el lote parcial para no retener archivos casi terminados
+                if batch:
+                    self._flush(batch)
+                    batch = []
+                continue
+            if item is _DONE:
+                break
+            job, future = item
+            self.stats["files"] += 1
+            if job.failed or not self._collect(job, future):
+                self.stats["failed"] += 1
+                continue
+            if not job.chunks:
+                self._finish(job)
+                continue
+            job.pending = len(job.chunks)
+            self.stats["chunks"] += len(job.chunks)
+            for index, text, *chunk_metadata in job.chunks:
+                batch.append((job, index, text, chunk_metadata[0] if chunk_metadata else None))
+                if len(batch) >= self.batch_size:
+                    self._flush(batch)
+                    batch = []
+        if batch:
+            self._flush(batch)
+
+    def _collect(self, job: FileJob, future: Future) -> bool:
+        """
+        Obtiene el resultado de la extracción de un archivo y aplica el hook `prepare`. Si alguno de los dos
+        falla, el archivo cuenta como fallido y el resto del pipeline sigue.
+        """
+        try:
+            elapsed, (job.total_chunks, job.chunks) = future.result()
+            self.timer.add(self._extract_stage(job), elapsed, items=len(job.chunks))
+        except Exception as e:
+            logger.error(f"Error extracting {job.file.get('name', 'unknown')}: {str(e)}")
+            return False
+        finally:
+            self._remove(job)
+        if self.prepare is not None:
+            try:
+                self.prepare(job)
+            except Exception as e:
+                logger.error(f"Error preparing {job.file.get('name', 'unknown')}: {str(e)}")
+                return False
+        return True
+
+    def _extract_stage(self, job: FileJob) -> str:
+        fmt = self.extract_format(job) if self.extract_format is not None else None
+        return f"extract:{fmt}" if fmt else "extract"
+
+    def _flush(self, batch: List[Tuple[FileJob, int, str, Optional[Dict[str, Any]]]]) -> None:
+        """Genera los embeddings de un lote y escribe sus filas."""
+        with self.timer.stage("embed", items=len(batch)):
+            embeddings = self.embed([text for _, _, text, _ in batch])
+        if len(embeddings) != len(batch):
+            logger.warning(f"Could not generate embeddings for a batch of {len(batch)} chunks")
+            embeddings = []
+            rows = []
+        else:
+            rows = [self.make_row(job, index, text, embedding, chunk_metadata)
+                    for (job, index, text, chunk_metadata), embedding in zip(batch, embeddings)]
+        with self.timer.stage("write", items=len(rows)):
+            inserted = self.write(rows) if rows else []
+        self.stats["inserted"] += len(inserted)
+
+        inserted_ids = {id(row) for row in inserted}
+        for (job, _, _, _), row in zip(batch, rows or [None] * len(batch)):
+            if row is not None and id(row) in inserted_ids:
+                job.inserted.append(row)
+            job.pending -= 1
+            if job.pending == 0:
+                self._finish(job)
+
+    def _finish(self, job: FileJob) -> None:
+        if self.on_file_done is not None:
+            try:
+                self.on_file_done(job)
+            except Exception as e:
+                logger.error(f"Error finishing {job.file.get('name', 'unknown')}: {str(e)}")
+
+    def _remove(self, job: FileJob) -> None:
+        remove = self.cleanup(job.path) if callable(self.cleanup) and job.path else self.cleanup
+        if remove and job.path:
+            try:
+                os.unlink(job.path)
+            except OSError as e:
+                logger.error(f"Error removing temp file {job.path}: {str(e)}")
@@ -0,0 +1,218 @@
+"""
+Instrumentación del camino caliente de la búsqueda.
+
+- `log_event`: eventos de log estructurados (una línea JSON por evento) con nivel. Los eventos por debajo de
+  WARNING se muestrean con `INSTRUMENTATION_SAMPLE_RATE`; las advertencias y errores se registran siempre.
+  `will_log` indica de antemano si un evento se registrará, para no calcular campos costosos en vano.
+- `span`: mide un bloque (embed, rpc, format, search) y lo registra en el histograma
+  `search_stage_seconds{stage, category}`. Los spans anidados comparten la decisión de muestreo y el
+  `trace_id` del span exterior, así que una búsqueda muestreada queda completa en el log.
+- `registry`: métricas en memoria expuestas en formato de texto de Prometheus (`registry.render()`), que
+  main.py publica en `/metrics`.
+
+Los volcados de depuración (payload completo, respuesta cruda del backend) son eventos DEBUG: no se
+serializan salvo que el logger `search` tenga nivel DEBUG (`SEARCH_LOG_LEVEL=DEBUG`).
+"""
+import contextvars
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger("search")
+# Con SEARCH_LOG_LEVEL=DEBUG se registran también los volcados de depuración
+if os.getenv("SEARCH_LOG_LEVEL"):
+    logger.setLevel(os.getenv("SEARCH_LOG_LEVEL").upper())
+
+SAMPLE_RATE = float(os.getenv("INSTRUMENTATION_SAMPLE_RATE", "0.1"))
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (muestreado, trace_id) del span exterior en curso; los contextvars se propagan a las tareas de asyncio
+_trace: contextvars.ContextVar[Optional[Tuple[bool, str]]] = contextvars.ContextVar("search_trace", default=None)
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    """Contador monótono con etiquetas."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            return self._values.get(key, 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {value:g}" for key, value in values]
+
+
+class Histogram:
+    """Histograma con buckets acumulativos, suma y cantidad por combinación de etiquetas."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Iterable[str] = (),
+                 buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # Por etiquetas: [conteo por bucket (el último es +Inf), suma]
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._series.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def count(self, **labels) -> int:
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            return sum(series[0]) if series else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, list(counts), total[0]) for key, (counts, total) in self._series.items())
+        lines = []
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                labels = _format_labels(self.label_names, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {total:g}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Conjunto de métricas del proceso."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, label_names: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, label_names))
+
+    def histogram(self, name: str, documentation: str, label_names: Iterable[str] = (),
+                  buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def render(self) -> str:
+        """Todas las métricas en el formato de texto de Prometheus (versión 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+STAGE_SECONDS = registry.histogram(
+    "search_stage_seconds", "Duración de cada etapa de la búsqueda en segundos", ("stage", "category"))
+STAGE_ERRORS = registry.counter(
+    "search_stage_errors_total", "Errores por etapa de la búsqueda", ("stage", "category"))
+RESULT_TOKENS = registry.counter(
+    "search_result_tokens_total", "Tokens de contenido antes (in) y después (out) de compactar resultados",
+    ("kind",))
+
+
+def will_log(level: int = logging.INFO, sample: bool = True) -> bool:
+    """
+    Si un evento de nivel `level` se registraría. Con `sample`, los eventos por debajo de WARNING se registran
+    solo si la traza actual está muestreada (o, fuera de una traza, con probabilidad `SAMPLE_RATE`).
+    """
+    if not logger.isEnabledFor(level):
+        return False
+    if sample and logging.DEBUG < level < logging.WARNING:
+        trace = _trace.get()
+        return trace[0] if trace else random.random() < SAMPLE_RATE
+    return True
+
+
+def log_event(event: str, level: int = logging.INFO, sample: bool = True, **fields) -> None:
+    """
+    Registra un evento estructurado, si `will_log(level, sample)`. Quien ya consultó `will_log` (para armar
+    los campos solo si hace falta) lo llama con `sample=False`, así la decisión de muestreo no se repite.
+    """
+    if not will_log(level, sample):
+        return
+    trace = _trace.get()
+    if trace:
+        fields["trace_id"] = trace[1]
+    logger.log(level, json.dumps({"event": event, **fields}, ensure_ascii=False, default=str))
+
+
+@contextmanager
+def span(stage: str, category: Optional[str] = None, **fields):
+    """
+    Mide el bloque como la etapa `stage` de la búsqueda (por `category`, "all" si no hay). Si el bloque
+    lanza una excepción, cuenta el error y lo registra siempre.
+    """
+    trace = _trace.get()
+    token = None
+    if trace is None:
+        token = _trace.set((random.random() < SAMPLE_RATE, uuid.uuid4().hex[:16]))
+    category = category or "all"
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        seconds = time.perf_counter() - start
+        STAGE_SECONDS.observe(seconds, stage=stage, category=category)
+        STAGE_ERRORS.inc(stage=stage, category=category)
+        log_event("span_error", logging.ERROR, stage=stage, category=category, ms=round(seconds * 1000, 2),
+                  error=f"{type(e).__name__}: {e}", **fields)
+        raise
+    else:
+        seconds = time.perf_counter() - start
+        STAGE_SECONDS.observe(seconds, stage=stage, category=category)
+        log_event("span", stage=stage, category=category, ms=round(seconds * 1000, 2), **fields)
+    finally:
+        if token is not None:
+            _trace.reset(token)
@@ -1,20 +1,36 @@
 import os
 import json
 import sys
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import io
-import PyPDF2
-from supabase import create_client
-from sentence_transformers import SentenceTransformer
 from tqdm import tqdm
 import logging
 from dotenv import load_dotenv
-import re
 import tempfile
-from google.oauth2 import service_account
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+import argparse
+from functools import partial
+from datetime import datetime, timezone
 from googleapiclient.http import MediaIoBaseDownload
+from stage_timer import StageTimer
+from index_manifest import IndexManifest, content_hash, file_md5
+from extraction_cache import ExtractionCache
+from ingest_pipeline import IngestPipeline, default_row
+from index_state import bump_index_version, get_index_version
+from vector_snapshot import SUPPORTED_DTYPES, write_snapshot
+from embedding_batcher import MicroBatcher
+from embedding_engines import create_engine, embedding_dimension
+from index_registry import ACTIVE, BUILDING, EmbeddingSpec, IndexInfo, IndexRegistry, legacy_index
+from chunking import CharChunker, Chunk, create_chunker
+import numpy as np
+
+# Agregar la ruta del directorio utils al path para compartir los helpers de Drive
+utils_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'utils')
+if utils_path not in sys.path:
+    sys.path.append(utils_path)
+
+from drive_crawler import DriveCrawler
+from extractors import get_extractor, iter_pages, supported_extensions, supported_mime_types
+import clients
 
 # Configuración de logging
 logging.basicConfig(
@@ -36,8 +52,6 @@ supabase_key = os.getenv("SUPABASE_KEY")
 if not supabase_url or not supabase_key:
     raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set as environment variables")
 
-supabase = create_client(supabase_url, supabase_key)
-
 # Importar el diccionario de productos bancarios
 try:
     from productos_bancarios import PRODUCTOS_BANCARIOS
@@ -46,72 +60,91 @@ except ImportError:
     logger.warning("No se pudo importar PRODUCTOS_BANCARIOS desde productos_bancarios.py")
     PRODUCTOS_BANCARIOS = {}
 
-# Inicializar el modelo de embeddings de sentence-transformers
-model = SentenceTransformer("all-MiniLM-L6-v2")
-logger.info("Modelo de embeddings cargado: all-MiniLM-L6-v2")
+# Inicializar el modelo de embeddings con el motor de EMBEDDING_ENGINE (torch u onnx, ver embedding_engines.py)
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+model = create_engine(model_name=EMBEDDING_MODEL_NAME)
+# Versión del modelo (distingue pesos distintos bajo un mismo nombre); se guarda en la metadata de cada chunk
+# y decide en qué índice se escribe (ver index_registry.py)
+embedding_spec = EmbeddingSpec(EMBEDDING_MODEL_NAME, os.getenv("EMBEDDING_MODEL_VERSION", "1"), embedding_dimension(model))
+index_registry = IndexRegistry()
+# Tabla en la que se escriben los chunks: la del índice activo, elegida en select_write_index
+documents_table = "documents"
 
-# Configuración para Google Drive API
-SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
-SERVICE_ACCOUNT_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'service-account.json')
+# Chunker de los documentos: "tokens" (por oraciones, sin superar la ventana de tokens del modelo) o "chars"
+# (ventanas de CHUNK_SIZE caracteres, el algoritmo anterior). El manifiesto guarda la configuración del chunker
+# de cada archivo: al cambiarla, la siguiente reindexación incremental vuelve a dividir todos los archivos,
+# aunque no hayan cambiado, y reemplaza sus chunks
+CHUNKER = os.getenv("CHUNKER", "tokens")
+text_chunker = create_chunker(
+    CHUNKER,
+    tokenizer=model.tokenizer,
+    tokenizer_path=model.tokenizer_path,
+    max_tokens=int(os.getenv("CHUNK_MAX_TOKENS", str(model.max_seq_length))),
+    overlap_tokens=int(os.getenv("CHUNK_OVERLAP_TOKENS", "32")),
+    chunk_size=int(os.getenv("CHUNK_SIZE", "1000")),
+    overlap=int(os.getenv("CHUNK_OVERLAP", "200")),
+)
 
-def get_drive_service():
-    """Autentica y devuelve un servicio de Google Drive usando service account."""
-    try:
-        credentials = service_account.Credentials.from_service_account_file(
-            SERVICE_ACCOUNT_FILE, scopes=SCOPES)
-        service = build('drive', 'v3', credentials=credentials)
-        return service
-    except Exception as e:
-        logger.error(f"Error building Drive service: {str(e)}")
-        raise
 
-def list_drive_files(service, folder_id=None, mime_type=None):
-    """Lista archivos en Drive, opcionalmente filtrando por carpeta y tipo MIME."""
-    query_parts = []
-    
-    if folder_id:
-        query_parts.append(f"'{folder_id}' in parents")
-    
-    if mime_type:
-        query_parts.append(f"mimeType='{mime_type}'")
-    else:
-        # Por defecto, excluir carpetas
-        query_parts.append("mimeType!='application/vnd.google-apps.folder'")
-    
-    # Archivos que no están en la papelera
-    query_parts.append("trashed=false")
-    
-    query = " and ".join(query_parts)
-    
-    try:
-        results = []
-        page_token = None
-        while True:
-            response = service.files().list(
-                q=query,
-                spaces='drive',
-                fields='nextPageToken, files(id, name, mimeType, parents)',
-                pageToken=page_token
-            ).execute()
-            
-            results.extend(response.get('files', []))
-            page_token = response.get('nextPageToken')
-            
-            if not page_token:
-                break
-        
-        return results
-    except Exception as e:
-        logger.error(f"Error listing Drive files: {str(e)}")
-        return []
+def resolve_chunker(chunker=None, chunk_size: Optional[int] = None, overlap: Optional[int] = None):
+    """
+    Chunker de una llamada: `chunker` si se indica; si no, con `chunk_size`/`overlap` (la firma anterior de
+    process_pdf y compañía) un CharChunker de esos tamaños; y si no, el chunker configurado (CHUNKER).
+    """
+    if chunker is not None:
+        return chunker
+    if chunk_size is not None or overlap is not None:
+        return CharChunker(chunk_size if chunk_size is not None else 1000, overlap if overlap is not None else 200)
+    return text_chunker
+
+# Tamaños de lote para la ingesta: chunks por llamada a model.encode y filas por insert en Supabase
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+INSERT_BATCH_SIZE = int(os.getenv("INSERT_BATCH_SIZE", "100"))
+
+# Micro-batcher para embeddings de textos sueltos (generate_embedding): agrupa llamadas concurrentes
+embedding_batcher = MicroBatcher(
+    lambda texts: model.encode(texts, batch_size=len(texts), show_progress_bar=False),
+    max_batch=int(os.getenv("EMBEDDING_MAX_BATCH", "32")),
+    max_wait_ms=float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5")),
+)
+
+# Pipeline de ingesta desde Drive: threads de descarga, procesos de extracción y tamaño de las colas entre etapas
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "4"))
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "8"))
+# Carpetas de Drive que se listan en paralelo al recorrer subcarpetas
+DRIVE_CRAWL_WORKERS = int(os.getenv("DRIVE_CRAWL_WORKERS", "4"))
+
+# Manifiesto local con los archivos indexados y los hashes de sus chunks (reindexación incremental)
+INDEX_MANIFEST_PATH = os.getenv("INDEX_MANIFEST_PATH", os.path.join(os.path.dirname(__file__), 'index_manifest.json'))
+
+# Caché local de la extracción: las páginas de texto de cada archivo por su MD5, para no volver a descargar ni
+# parsear archivos sin cambios (p. ej. al cambiar el chunker o el modelo). EXTRACTION_CACHE_DIR vacío la desactiva
+EXTRACTION_CACHE_DIR = os.getenv("EXTRACTION_CACHE_DIR", os.path.join(os.path.dirname(__file__), 'extraction_cache'))
+EXTRACTION_CACHE_MAX_MB = int(os.getenv("EXTRACTION_CACHE_MAX_MB", "512"))
+extraction_cache = ExtractionCache(EXTRACTION_CACHE_DIR, EXTRACTION_CACHE_MAX_MB * 1024 ** 2) if EXTRACTION_CACHE_DIR else None
 
-def download_drive_file(service, file_id, file_name):
-    """Descarga un archivo de Google Drive."""
+def get_drive_service():
+    """Devuelve el servicio de Google Drive del thread actual, reutilizado desde el registro de clientes."""
+    return clients.get_drive_service()
+
+def download_drive_file(service, file_id, file_name, mime_type=None):
+    """
+    Descarga un archivo de Google Drive. Los documentos de Google Workspace se exportan al formato de su
+    extractor (Docs a DOCX, Sheets a CSV, Slides a texto). El archivo temporal lleva la extensión del formato.
+    """
     try:
-        request = service.files().get_media(fileId=file_id)
+        extractor = get_extractor(mime_type)
+        suffix = '_' + file_name
+        if extractor is not None and extractor.export_mime_type:
+            request = service.files().export_media(fileId=file_id, mimeType=extractor.export_mime_type)
+        else:
+            request = service.files().get_media(fileId=file_id)
+        if extractor is not None and not suffix.lower().endswith(extractor.extension):
+            suffix += extractor.extension
         
         # Crear un archivo temporal
-        with tempfile.NamedTemporaryFile(delete=False, suffix='_' + file_name) as temp_file:
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
             downloader = MediaIoBaseDownload(temp_file, request)
             done = False
             while not done:
@@ -123,18 +156,22 @@ def download_drive_file(service, file_id, file_name):
         logger.error(f"Error downloading file {file_name} (ID: {file_id}): {str(e)}")
         return None
 
-def extract_text_from_pdf(pdf_path: str) -> str:
-    """Extrae el texto de un archivo PDF."""
+def iter_document_pages(file_path: str, record=None) -> Iterator[Tuple[int, str]]:
+    """
+    Recorre las páginas de un documento y entrega `(número de página, texto)` de a una, sin armar el texto
+    completo, con el extractor de su extensión (ver utils/extractors.py). Con `record`, las páginas pasan por
+    `record(pages)` (p. ej. para guardarlas en la caché de extracción). Los errores de lectura se registran
+    y terminan el recorrido.
+    """
     try:
-        with open(pdf_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
-        return text
+        pages = iter_pages(file_path)
+        yield from (record(pages) if record is not None else pages)
     except Exception as e:
-        logger.error(f"Error extracting text from {pdf_path}: {str(e)}")
-        return ""
+        logger.error(f"Error extracting text from {file_path}: {str(e)}")
+
+def extract_text_from_pdf(pdf_path: str) -> str:
+    """Extrae el texto de un archivo PDF."""
+    return "".join(text for _, text in iter_document_pages(pdf_path))
 
 def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
     """Divide el texto en chunks con overlap."""
@@ -149,150 +186,430 @@ def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> List[st
     return chunks
 
 def generate_embedding(text: str) -> List[float]:
-    """Genera embedding para un texto usando sentence-transformers."""
+    """Genera embedding para un texto usando sentence-transformers, agrupado con otras llamadas concurrentes."""
     try:
-        embedding = model.encode(text)
+        embedding = embedding_batcher.encode(text)
         return embedding.tolist()
     except Exception as e:
         logger.error(f"Error generando embedding con sentence-transformers: {str(e)}")
         return []
 
-def limpiar_texto(texto: str) -> str:
-    # Une palabras separadas por saltos de línea o espacios extraños
-    texto = re.sub(r'(\w)\s+\n\s*(\w)', r'\1 \2', texto)
-    texto = re.sub(r'\n+', ' ', texto)
-    texto = re.sub(r'\s{2,}', ' ', texto)
-    texto = texto.strip()
-    return texto
+def generate_embeddings(texts: List[str], batch_size: int = EMBEDDING_BATCH_SIZE) -> List[List[float]]:
+    """Genera embeddings para una lista de textos en lotes de `batch_size`."""
+    if not texts:
+        return []
+    try:
+        embeddings = model.encode(texts, batch_size=batch_size, show_progress_bar=False)
+        return embeddings.tolist()
+    except Exception as e:
+        logger.error(f"Error generando embeddings en lote con sentence-transformers: {str(e)}")
+        return []
+
+def insert_documents(rows: List[Dict[str, Any]], batch_size: int = INSERT_BATCH_SIZE) -> List[Dict[str, Any]]:
+    """Inserta filas en la tabla de documentos con inserts multi-fila. Devuelve las filas que se insertaron."""
+    inserted = []
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        try:
+            response = clients.get_supabase_client().table(documents_table).insert(batch).execute()
+            if hasattr(response, 'error') and response.error:
+                logger.error(f"Error inserting batch {start}-{start + len(batch)}: {response.error}")
+                continue
+            inserted.extend(batch)
+        except Exception as e:
+            logger.error(f"Error inserting batch {start}-{start + len(batch)}: {str(e)}")
+    return inserted
+
+def delete_file_chunks(file_id: str, hashes: Optional[List[str]] = None, batch_size: int = INSERT_BATCH_SIZE) -> bool:
+    """
+    Elimina de la tabla de documentos los chunks de un archivo. Si se indican `hashes`, solo los chunks con esos
+    content_hash; si no, todos los chunks del archivo. Devuelve True si no hubo errores.
+    """
+    try:
+        if hashes is None:
+            clients.get_supabase_client().table(documents_table).delete().eq("metadata->>file_id", file_id).execute()
+            return True
+        for start in range(0, len(hashes), batch_size):
+            clients.get_supabase_client().table(documents_table).delete() \
+                .eq("metadata->>file_id", file_id) \
+                .in_("metadata->>content_hash", hashes[start:start + batch_size]) \
+                .execute()
+        return True
+    except Exception as e:
+        logger.error(f"Error deleting chunks of file {file_id}: {str(e)}")
+        return False
+
+def local_file_record(file_path: str, directory_path: str) -> Dict[str, Any]:
+    """Describe un documento local con los mismos campos que un archivo de Drive (id, modifiedTime, md5Checksum)."""
+    stat = os.stat(file_path)
+    return {
+        "id": os.path.relpath(file_path, directory_path),
+        "name": os.path.basename(file_path),
+        "path": file_path,
+        "modifiedTime": datetime.fromtimestamp(stat.st_mtime, timezone.utc).isoformat(),
+        "md5Checksum": file_md5(file_path),
+    }
 
-def process_pdf_directory(directory_path: str, chunk_size: int = 1000, overlap: int = 200) -> None:
-    """Procesa todos los PDFs en un directorio y sus subdirectorios."""
+def process_pdf_directory(directory_path: str, chunk_size: Optional[int] = None, overlap: Optional[int] = None,
+                          embedding_batch_size: int = EMBEDDING_BATCH_SIZE,
+                          insert_batch_size: int = INSERT_BATCH_SIZE,
+                          manifest: Optional[IndexManifest] = None, *, chunker=None) -> None:
+    """
+    Procesa todos los documentos de formatos soportados (ver utils/extractors.py) en un directorio y sus subdirectorios.
+    Con `manifest`, solo reindexa los archivos y chunks que cambiaron desde la última ejecución.
+    El chunker se elige con `resolve_chunker`.
+    """
+    chunker = resolve_chunker(chunker, chunk_size, overlap)
+    timer = StageTimer()
+    seen_ids = set()
+    extensions = tuple(supported_extensions())
     for root, _, files in os.walk(directory_path):
-        pdf_files = [f for f in files if f.lower().endswith('.pdf')]
-        for filename in tqdm(pdf_files, desc=f"Processing {root}"):
+        document_files = [f for f in files if f.lower().endswith(extensions)]
+        for filename in tqdm(document_files, desc=f"Processing {root}"):
             file_path = os.path.join(root, filename)
             try:
-                process_pdf(file_path, chunk_size, overlap)
+                if manifest is None:
+                    process_pdf(file_path, chunker=chunker,
+                                embedding_batch_size=embedding_batch_size,
+                                insert_batch_size=insert_batch_size,
+                                timer=timer)
+                    continue
+                file_record = local_file_record(file_path, directory_path)
+                seen_ids.add(file_record["id"])
+                if manifest.is_unchanged(file_record, chunker.config()):
+                    continue
+                sync_pdf(file_path, file_record, manifest, chunker=chunker,
+                         embedding_batch_size=embedding_batch_size,
+                         insert_batch_size=insert_batch_size,
+                         timer=timer)
             except Exception as e:
                 logger.error(f"Error processing {file_path}: {str(e)}")
+    if manifest is not None:
+        tombstone_missing_files(manifest, seen_ids)
+        manifest.save()
+    if extraction_cache is not None:
+        extraction_cache.evict()
+    timer.log_summary()
 
-def process_pdf(pdf_path: str, chunk_size: int = 1000, overlap: int = 200, category: str = None) -> None:
-    """Procesa un solo PDF y lo guarda en Supabase."""
-    # Extraer texto del PDF
-    text = extract_text_from_pdf(pdf_path)
-    if not text:
-        logger.warning(f"No text extracted from {pdf_path}")
-        return
+def document_pages(file_path: str, cache: Optional[ExtractionCache] = None) -> Tuple[Iterator[Tuple[int, str]], bool]:
+    """
+    Páginas de un documento e indicación de si su formato tiene páginas. Con `cache`, las páginas se leen de
+    la caché de extracción si `file_path` es una entrada de la caché o si el archivo (por su MD5) ya se extrajo;
+    si no, se extraen y se guardan en ella.
+    """
+    if cache is not None and cache.owns(file_path):
+        header, pages = cache.read(file_path)
+        return pages, header["paginated"]
+    extractor = get_extractor(path=file_path)
+    if extractor is None or cache is None:
+        return iter_document_pages(file_path), extractor is None or extractor.paginated
+    checksum = file_md5(file_path)
+    cached = cache.get(checksum, extractor.format)
+    if cached is not None:
+        return cache.read(cached)[1], extractor.paginated
+    record = partial(cache.record, checksum, extractor.format, paginated=extractor.paginated)
+    return iter_document_pages(file_path, record), extractor.paginated
+
+def extract_chunks(file_path: str, chunker=None, cache: Optional[ExtractionCache] = None) -> Tuple[int, List[Chunk]]:
+    """
+    Extrae, divide y limpia el texto de un documento página por página: las páginas alimentan al chunker a
+    medida que se leen, sin armar el texto completo del documento. Devuelve el total de chunks y los
+    (índice, chunk limpio, {page_start, page_end}) no vacíos; los formatos sin páginas (DOCX, planillas)
+    no llevan páginas. Con `cache`, usa la caché de extracción (ver `document_pages`).
+    Se ejecuta en los procesos de extracción del pipeline de ingesta.
+    """
+    pages, paginated = document_pages(file_path, cache)
+    total, chunks_limpios = (chunker or text_chunker).chunk_document(pages)
+    if not total:
+        logger.warning(f"No text extracted from {file_path}")
+    if not paginated:
+        chunks_limpios = [(i, chunk, {}) for i, chunk, _ in chunks_limpios]
+    return total, chunks_limpios
+
+def file_format(mime_type: Optional[str] = None, path: Optional[str] = None) -> Optional[str]:
+    """Formato del extractor de un archivo (pdf, docx, gdoc, ...), con el que se mide la extracción por formato."""
+    extractor = get_extractor(mime_type, path)
+    return extractor.format if extractor is not None else None
+
+def prepare_chunks(pdf_path: str, chunker, timer: StageTimer) -> Tuple[int, List[Chunk]]:
+    """Extrae, divide y limpia el texto de un documento. Devuelve el total de chunks y los (índice, chunk limpio, páginas) no vacíos."""
+    # La lectura de páginas, el chunking y la limpieza se intercalan, así que se miden como una sola etapa
+    fmt = file_format(path=pdf_path)
+    with timer.stage(f"extract:{fmt}" if fmt else "extract"):
+        total_chunks, chunks_limpios = extract_chunks(pdf_path, chunker, extraction_cache)
+    if total_chunks and not chunks_limpios:
+        logger.warning(f"No chunks generated for {pdf_path}")
+    return total_chunks, chunks_limpios
+
+def embed_and_insert(chunks: List[Chunk], base_metadata: Dict[str, Any],
+                     embedding_batch_size: int, insert_batch_size: int,
+                     timer: StageTimer) -> List[Dict[str, Any]]:
+    """Genera los embeddings de los chunks en lotes y los inserta en Supabase. Devuelve las filas insertadas."""
+    if not chunks:
+        return []
+    
+    # Generar todos los embeddings del documento en lotes
+    with timer.stage("embed", items=len(chunks)):
+        embeddings = generate_embeddings([chunk for _, chunk, _ in chunks], embedding_batch_size)
+    if len(embeddings) != len(chunks):
+        logger.warning(f"Could not generate embeddings for {base_metadata.get('path')}")
+        return []
+    
+    rows = []
+    for (i, chunk, chunk_metadata), embedding in zip(chunks, embeddings):
+        metadata = {**base_metadata, **chunk_metadata, "chunk_index": i, **embedding_spec.metadata()}
+        if "file_id" in base_metadata:
+            metadata["content_hash"] = content_hash(chunk)
+        rows.append({
+            "content": chunk,
+            "metadata": metadata,
+            "embedding": embedding
+        })
     
-    # Dividir en chunks
-    chunks = chunk_text(text, chunk_size, overlap)
+    # Insertar en Supabase con inserts multi-fila
+    with timer.stage("write", items=len(rows)):
+        return insert_documents(rows, insert_batch_size)
+
+def process_pdf(pdf_path: str, chunk_size: Optional[int] = None, overlap: Optional[int] = None,
+                category: str = None,
+                embedding_batch_size: int = EMBEDDING_BATCH_SIZE,
+                insert_batch_size: int = INSERT_BATCH_SIZE,
+                timer: Optional[StageTimer] = None, *, chunker=None) -> None:
+    """
+    Procesa un solo documento y lo guarda en Supabase, generando embeddings e insertando en lotes.
+    El chunker se elige con `resolve_chunker`.
+    """
+    chunker = resolve_chunker(chunker, chunk_size, overlap)
+    timer = timer or StageTimer()
+    total_chunks, chunks = prepare_chunks(pdf_path, chunker, timer)
+    if not chunks:
+        return
     
     # Metadata básica
     base_metadata = {
         "source": os.path.basename(pdf_path),
         "path": pdf_path,
-        "total_chunks": len(chunks),
+        "total_chunks": total_chunks,
         "category": category or os.path.basename(os.path.dirname(pdf_path))  # Añade la categoría del documento
     }
     
-    # Procesar y guardar cada chunk
-    for i, chunk in enumerate(chunks):
-        try:
-            chunk_limpio = limpiar_texto(chunk)
-            metadata = {**base_metadata, "chunk_index": i}
-            embedding = generate_embedding(chunk_limpio)
-            
-            if not embedding:
-                logger.warning(f"Could not generate embedding for chunk {i} in {pdf_path}")
-                continue
-            
-            # Insertar en Supabase
-            response = supabase.table("documents").insert({
-                "content": chunk_limpio,
-                "metadata": metadata,
-                "embedding": embedding
-            }).execute()
-            
-            if hasattr(response, 'error') and response.error:
-                logger.error(f"Error inserting chunk {i} from {pdf_path}: {response.error}")
-                
-        except Exception as e:
-            logger.error(f"Error processing chunk {i} from {pdf_path}: {str(e)}")
+    inserted = embed_and_insert(chunks, base_metadata, embedding_batch_size, insert_batch_size, timer)
+    logger.info(f"Procesado: {pdf_path} - {total_chunks} chunks ({len(inserted)} insertados)")
+
+def select_new_chunks(file_id: str, chunks: List[Chunk],
+                      manifest: IndexManifest) -> Tuple[Dict[str, int], List[Chunk]]:
+    """
+    Compara los chunks de un archivo con los del manifiesto. Devuelve los hashes actuales
+    (hash -> chunk_index) y los chunks cuyo contenido no está indexado todavía.
+    """
+    previous = manifest.chunk_hashes(file_id)
+    current = {}
+    new_chunks = []
+    for i, chunk, chunk_metadata in chunks:
+        h = content_hash(chunk)
+        if h in current:
+            continue  # Chunk repetido dentro del mismo documento
+        current[h] = i
+        if h not in previous:
+            new_chunks.append((i, chunk, chunk_metadata))
+    return current, new_chunks
+
+def finish_sync(file_record: Dict[str, Any], manifest: IndexManifest, category: str,
+                current: Dict[str, int], new_chunks: List[Chunk],
+                inserted: List[Dict[str, Any]], insert_batch_size: int,
+                timer: StageTimer, chunker_config: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Completa la sincronización de un archivo una vez insertados sus chunks nuevos: elimina los chunks
+    que ya no existen y actualiza el manifiesto, con la configuración del chunker que generó `current`.
+    """
+    file_id = file_record["id"]
+    previous = manifest.chunk_hashes(file_id)
+    inserted_hashes = {row["metadata"]["content_hash"]: row["metadata"]["chunk_index"] for row in inserted}
+    complete = len(inserted) == len(new_chunks)
+    
+    removed = [h for h in previous if h not in current]
+    if removed and complete:
+        with timer.stage("delete", items=len(removed)):
+            if not delete_file_chunks(file_id, removed, insert_batch_size):
+                complete = False
+    if not complete:
+        logger.warning(f"Sincronización incompleta de {file_record.get('name')}; se reintentará en la próxima ejecución")
+    
+    # Chunks indexados: los que se mantienen, los nuevos insertados y los obsoletos que no se pudieron eliminar
+    indexed = {h: i for h, i in previous.items() if h in current or not complete}
+    indexed.update(inserted_hashes)
+    manifest.record_file(file_record, indexed, category=category, complete=complete, chunker=chunker_config)
+    logger.info(f"Sincronizado: {file_record.get('name')} - {len(inserted)} chunks nuevos, "
+                f"{len(removed) if complete else 0} eliminados, {len(current) - len(new_chunks)} sin cambios")
+
+def sync_pdf(pdf_path: str, file_record: Dict[str, Any], manifest: IndexManifest,
+             chunker=None, category: str = None,
+             embedding_batch_size: int = EMBEDDING_BATCH_SIZE,
+             insert_batch_size: int = INSERT_BATCH_SIZE,
+             timer: Optional[StageTimer] = None) -> None:
+    """
+    Sincroniza un documento modificado con Supabase: inserta solo los chunks cuyo contenido es nuevo y luego
+    elimina los que ya no existen, de modo que el documento sigue siendo consultable durante la sincronización.
+    """
+    timer = timer or StageTimer()
+    chunker = resolve_chunker(chunker)
+    category = category or os.path.basename(os.path.dirname(pdf_path))
+    total_chunks, chunks = prepare_chunks(pdf_path, chunker, timer)
+    current, new_chunks = select_new_chunks(file_record["id"], chunks, manifest)
     
-    logger.info(f"Procesado: {pdf_path} - {len(chunks)} chunks")
+    base_metadata = {
+        "source": file_record.get("name") or os.path.basename(pdf_path),
+        "path": pdf_path,
+        "total_chunks": total_chunks,
+        "category": category,
+        "file_id": file_record["id"],
+    }
+    inserted = embed_and_insert(new_chunks, base_metadata, embedding_batch_size, insert_batch_size, timer)
+    finish_sync(file_record, manifest, category, current, new_chunks, inserted, insert_batch_size, timer,
+                chunker.config())
+
+def tombstone_missing_files(manifest: IndexManifest, seen_ids: set, crawl_errors: List[Any] = ()) -> None:
+    """
+    Elimina de Supabase los chunks de archivos que ya no existen en el origen y los marca como tombstones.
+    Si hubo carpetas que no se pudieron listar (`crawl_errors`) no elimina nada.
+    """
+    if crawl_errors:
+        # Con carpetas sin listar no se puede saber qué archivos se eliminaron realmente
+        logger.warning(f"{len(crawl_errors)} carpetas no se pudieron listar; se omite la eliminación de archivos")
+        return
+    missing = [file_id for file_id in manifest.active_file_ids() if file_id not in seen_ids]
+    if missing and not seen_ids:
+        # Un listado vacío suele indicar un error de acceso, no que se borraron todos los documentos
+        logger.warning(f"No se encontró ningún archivo en el origen; se omite la eliminación de {len(missing)} archivos")
+        return
+    for file_id in missing:
+        if delete_file_chunks(file_id):
+            manifest.tombstone(file_id)
+            logger.info(f"Archivo eliminado del origen, chunks borrados: {file_id}")
 
-def process_drive_files(drive_folder_id: str = None, chunk_size: int = 1000, overlap: int = 200) -> None:
-    """Procesa archivos PDF desde Google Drive, incluyendo subcarpetas."""
+def process_drive_files(drive_folder_id: str = None, chunk_size: Optional[int] = None,
+                        overlap: Optional[int] = None,
+                        embedding_batch_size: int = EMBEDDING_BATCH_SIZE,
+                        insert_batch_size: int = INSERT_BATCH_SIZE,
+                        manifest: Optional[IndexManifest] = None,
+                        download_workers: int = DOWNLOAD_WORKERS,
+                        extract_workers: int = EXTRACT_WORKERS,
+                        queue_size: int = PIPELINE_QUEUE_SIZE,
+                        crawl_workers: int = DRIVE_CRAWL_WORKERS, *, chunker=None) -> None:
+    """
+    Procesa los documentos de Google Drive de formatos soportados (PDF, DOCX y Google Docs, Sheets y
+    Slides; ver utils/extractors.py), incluyendo subcarpetas.
+    Las descargas (`download_workers` threads), la extracción (`extract_workers` procesos) y los embeddings
+    se ejecutan en paralelo con colas acotadas a `queue_size` archivos entre etapas.
+    Con `manifest`, solo descarga y reindexa los archivos cuyo md5Checksum/modifiedTime cambió,
+    y elimina los chunks de los archivos que ya no están en Drive. El chunker se elige con `resolve_chunker`.
+    """
+    chunker = resolve_chunker(chunker, chunk_size, overlap)
+    timer = StageTimer()
     try:
-        # Obtener servicio de Drive
-        service = get_drive_service()
+        # Recorrer la carpeta principal y sus subcarpetas en paralelo, con paginación
+        crawler = DriveCrawler(get_drive_service, max_workers=crawl_workers)
+        all_files = []
+        for item in crawler.crawl_folder(drive_folder_id, mime_types=supported_mime_types()):
+            all_files.append(item)
+            logger.info(f"Archivo encontrado: {item['path']}{item['name']} ({item['mimeType']})")
+        crawl_errors = list(crawler.errors)
         
-        # Lista para almacenar todos los PDFs encontrados
-        all_pdfs = []
+        # Si no se encontraron archivos en la carpeta principal, intentar con todas las carpetas de productos
+        if not all_files and PRODUCTOS_BANCARIOS:
+            logger.info("No se encontraron archivos en la carpeta principal. Procesando carpetas de productos bancarios...")
+            roots = [(folder_id, f"/{producto}/") for producto, folder_id in PRODUCTOS_BANCARIOS.items()]
+            for item in crawler.crawl(roots, mime_types=supported_mime_types()):
+                all_files.append(item)
+                logger.info(f"Archivo encontrado: {item['path']}{item['name']} ({item['mimeType']})")
+            crawl_errors.extend(crawler.errors)
         
-        # Función recursiva para buscar PDFs en carpetas y subcarpetas
-        def search_pdfs_recursive(folder_id, path="/"):
-            # Listar todos los archivos en esta carpeta
-            items = list_drive_files(service, folder_id=folder_id)
-            
-            for item in items:
-                if item['mimeType'] == 'application/vnd.google-apps.folder':
-                    # Es una carpeta, buscar recursivamente
-                    folder_name = item['name']
-                    logger.info(f"Explorando subcarpeta: {path}{folder_name}/")
-                    search_pdfs_recursive(item['id'], path=f"{path}{folder_name}/")
-                elif item['mimeType'] == 'application/pdf':
-                    # Es un PDF, añadirlo a la lista
-                    item['path'] = path
-                    all_pdfs.append(item)
-                    logger.info(f"PDF encontrado: {path}{item['name']}")
+        if not all_files:
+            logger.warning(f"No se encontraron archivos soportados en ninguna carpeta")
+            return
         
-        # Iniciar búsqueda recursiva en la carpeta principal
-        search_pdfs_recursive(drive_folder_id)
+        logger.info(f"Se encontraron {len(all_files)} archivos en Drive")
         
-        # Si no se encontraron PDFs en la carpeta principal, intentar con todas las carpetas de productos
-        if not all_pdfs and PRODUCTOS_BANCARIOS:
-            logger.info("No se encontraron PDFs en la carpeta principal. Procesando carpetas de productos bancarios...")
-            for producto, folder_id in PRODUCTOS_BANCARIOS.items():
-                logger.info(f"Procesando producto: {producto} (Folder ID: {folder_id})")
-                search_pdfs_recursive(folder_id, path=f"/{producto}/")
+        if manifest is not None:
+            seen_ids = {file['id'] for file in all_files}
+            all_files = [file for file in all_files if not manifest.is_unchanged(file, chunker.config())]
+            logger.info(f"{len(all_files)} archivos nuevos o modificados desde la última sincronización")
         
-        if not all_pdfs:
-            logger.warning(f"No se encontraron archivos PDF en ninguna carpeta")
-            return
+        # get_drive_service devuelve un servicio por thread: los clientes de googleapiclient no son thread-safe
+        cache_hits = []
         
-        logger.info(f"Se encontraron {len(all_pdfs)} archivos PDF en Drive")
+        def download(file):
+            # Un archivo ya extraído no se descarga: el pipeline recibe su entrada en la caché de extracción
+            if extraction_cache is not None:
+                cached = extraction_cache.get(file.get('md5Checksum'), file_format(file.get('mimeType')))
+                if cached is not None:
+                    cache_hits.append(file['id'])
+                    return cached
+            return download_drive_file(get_drive_service(), file['id'], file['name'], file.get('mimeType'))
         
-        temp_files = []
+        def extract_format(job):
+            if extraction_cache is not None and extraction_cache.owns(job.path):
+                return "cache"
+            return file_format(job.file.get('mimeType'))
         
-        # Descargar y procesar cada archivo
-        for pdf in tqdm(all_pdfs, desc="Processing Drive files"):
-            try:
-                file_id = pdf['id']
-                file_name = pdf['name']
-                file_path = pdf['path']
-                
-                # Descargar el archivo
-                temp_path = download_drive_file(service, file_id, file_name)
-                if temp_path:
-                    temp_files.append(temp_path)
-                    
-                    # Obtener categoría desde la estructura de Drive
-                    category = os.path.basename(file_path.rstrip('/'))
-                    if not category:
-                        category = "default"
-                    
-                    # Procesar el PDF
-                    process_pdf(temp_path, chunk_size, overlap, category=category)
-            except Exception as e:
-                logger.error(f"Error processing Drive file {pdf.get('name', 'unknown')}: {str(e)}")
+        def prepare(job):
+            # Obtener categoría desde la estructura de Drive
+            category = os.path.basename(job.file['path'].rstrip('/')) or "default"
+            job.metadata = {
+                "source": job.file['name'],
+                "path": job.path,
+                "total_chunks": job.total_chunks,
+                "category": category,
+                **embedding_spec.metadata(),
+            }
+            if manifest is not None:
+                job.metadata["file_id"] = job.file['id']
+                job.state["current"], job.chunks = select_new_chunks(job.file['id'], job.chunks, manifest)
         
-        # Limpiar archivos temporales
-        for temp_file in temp_files:
-            try:
-                os.unlink(temp_file)
-            except Exception as e:
-                logger.error(f"Error removing temp file {temp_file}: {str(e)}")
+        def make_row(job, index, text, embedding, chunk_metadata):
+            row = default_row(job, index, text, embedding, chunk_metadata)
+            if manifest is not None:
+                row["metadata"]["content_hash"] = content_hash(text)
+            return row
+        
+        def on_file_done(job):
+            if manifest is not None:
+                finish_sync(job.file, manifest, job.metadata["category"], job.state["current"],
+                            job.chunks, job.inserted, insert_batch_size, timer, chunker.config())
+            else:
+                logger.info(f"Procesado: {job.file['name']} - {job.total_chunks} chunks ({len(job.inserted)} insertados)")
+        
+        # Descargas, extracción y embeddings se solapan en el pipeline
+        pipeline = IngestPipeline(
+            download=download,
+            extract=partial(extract_chunks, chunker=chunker, cache=extraction_cache),
+            embed=lambda texts: generate_embeddings(texts, embedding_batch_size),
+            write=lambda rows: insert_documents(rows, insert_batch_size),
+            prepare=prepare,
+            make_row=make_row,
+            on_file_done=on_file_done,
+            extract_format=extract_format,
+            download_workers=download_workers,
+            extract_workers=extract_workers,
+            batch_size=embedding_batch_size,
+            queue_size=queue_size,
+            # Las entradas de la caché de extracción no se borran después de extraerlas
+            cleanup=lambda path: extraction_cache is None or not extraction_cache.owns(path),
+            timer=timer,
+        )
+        stats = pipeline.run(all_files)
+        logger.info(f"Pipeline completado: {stats['files']} archivos ({stats['failed']} con error), "
+                    f"{stats['chunks']} chunks, {stats['inserted']} insertados")
+        if extraction_cache is not None:
+            logger.info(f"Caché de extracción: {len(cache_hits)} archivos sin descargar")
+            extraction_cache.evict()
+        
+        if manifest is not None:
+            tombstone_missing_files(manifest, seen_ids, crawl_errors)
+            manifest.save()
+        
+        timer.log_summary()
+        logger.info(f"Clientes: {clients.client_stats()}")
                 
     except Exception as e:
         logger.error(f"Error in process_drive_files: {str(e)}")
@@ -302,7 +619,7 @@ def semantic_search(query: str, limit: int = 5) -> List[Dict[str, Any]]:
     try:
         query_embedding = generate_embedding(query)
         
-        response = supabase.rpc(
+        response = clients.get_supabase_client().rpc(
             'match_documents',
             {
                 'query_embedding': query_embedding,
@@ -316,25 +633,155 @@ def semantic_search(query: str, limit: int = 5) -> List[Dict[str, Any]]:
         logger.error(f"Error in semantic search: {str(e)}")
         return []
 
-if __name__ == "__main__":
-    # Borrar todos los datos existentes en la tabla 'documents' antes de insertar
-    logger.info("Eliminando todos los datos existentes en la tabla 'documents'...")
+def export_snapshot(path: str, dtype: str = "float32", page_size: int = 1000,
+                    index_version: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Exporta todos los chunks de la tabla de documentos a un snapshot versionado en `path` (ver vector_snapshot.py),
+    con su índice BM25, leyendo la tabla en páginas de `page_size` filas. Devuelve el manifiesto del snapshot.
+    """
+    ids, contents, metadatas, embeddings = [], [], [], []
+    start = 0
+    while True:
+        response = clients.get_supabase_client().table(documents_table) \
+            .select("id, content, metadata, embedding") \
+            .order("id") \
+            .range(start, start + page_size - 1) \
+            .execute()
+        page = response.data or []
+        for row in page:
+            embedding = row["embedding"]
+            if isinstance(embedding, str):
+                # PostgREST devuelve las columnas pgvector como texto "[0.1,0.2,...]"
+                embedding = json.loads(embedding)
+            ids.append(row["id"])
+            contents.append(row["content"])
+            metadatas.append(row.get("metadata") or {})
+            embeddings.append(np.asarray(embedding, dtype=np.float32))
+        logger.info(f"Exportando snapshot: {start + len(page)} chunks leídos")
+        if len(page) < page_size:
+            break
+        start += page_size
+    
+    matrix = np.stack(embeddings) if embeddings else np.zeros((0, 0), dtype=np.float32)
+    return write_snapshot(path, ids, contents, metadatas, matrix, dtype=dtype, extra_manifest={
+        "model": EMBEDDING_MODEL_NAME,
+        "embedding": {"model": embedding_spec.model, "version": embedding_spec.version, "dim": embedding_spec.dim},
+        "index": documents_table,
+        "index_version": index_version,
+    })
+
+def delete_all_documents() -> None:
+    """Borra todos los datos existentes en la tabla de documentos."""
+    logger.info(f"Eliminando todos los datos existentes en la tabla '{documents_table}'...")
     try:
-        supabase.table("documents").delete().neq("id", 0).execute()
+        clients.get_supabase_client().table(documents_table).delete().neq("id", 0).execute()
         logger.info("Datos eliminados correctamente.")
     except Exception as e:
-        logger.error(f"Error al eliminar datos de la tabla 'documents': {str(e)}")
+        logger.error(f"Error al eliminar datos de la tabla '{documents_table}': {str(e)}")
+
+def select_write_index(registry: IndexRegistry) -> Tuple[IndexInfo, bool]:
+    """
+    Índice en que escribe la ingesta: el activo del registro, o la tabla `documents` si no hay ninguno
+    registrado. Devuelve también si el registro está vacío. Lanza ValueError si hay un índice en construcción
+    (`reembed.py` copia el activo y no vería los cambios) o si el índice activo es de otro modelo.
+    """
+    try:
+        indexes = registry.list()
+    except Exception as e:
+        logger.warning(f"No se pudo leer el registro de índices ({str(e)}); se usa la tabla 'documents'")
+        return legacy_index(embedding_spec), False
+    building = [index.name for index in indexes if index.status == BUILDING]
+    if building:
+        raise ValueError(f"Hay índices en construcción ({', '.join(building)}); espera a que reembed.py termine")
+    active = next((index for index in indexes if index.status == ACTIVE), None)
+    if active is None:
+        return legacy_index(embedding_spec), not indexes
+    if not active.embedding.matches(embedding_spec):
+        raise ValueError(f"El índice activo {active.name} es del modelo {active.embedding} y el modelo configurado "
+                         f"es {embedding_spec}; ajusta EMBEDDING_MODEL_NAME / EMBEDDING_MODEL_VERSION")
+    return active, False
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Indexa documentos (PDF, DOCX y Google Workspace) en el índice activo de Supabase (por defecto, la tabla 'documents').")
+    parser.add_argument(
+        "--mode", choices=["incremental", "full"], default="incremental",
+        help="incremental: solo reindexa archivos y chunks modificados (por defecto); "
+             "full: borra la tabla y reconstruye todo el índice"
+    )
+    parser.add_argument(
+        "--manifest", default=INDEX_MANIFEST_PATH,
+        help="Ruta del manifiesto local con el estado del índice"
+    )
+    parser.add_argument(
+        "--export-snapshot", metavar="PATH", default=os.getenv("SNAPSHOT_EXPORT_PATH"),
+        help="Al terminar, exporta el índice activo a un snapshot para el backend de búsqueda local"
+    )
+    parser.add_argument(
+        "--snapshot-dtype", choices=SUPPORTED_DTYPES, default=os.getenv("SNAPSHOT_DTYPE", "float32"),
+        help="Tipo de los embeddings en el snapshot (float16/int8 reducen memoria)"
+    )
+    parser.add_argument(
+        "--no-index", action="store_true",
+        help="No procesa documentos; solo exporta el snapshot"
+    )
+    args = parser.parse_args()
+    
+    try:
+        write_index, unregistered = select_write_index(index_registry)
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(1)
+    documents_table = write_index.table
+    logger.info(f"Índice de escritura: {write_index.name} ({embedding_spec})")
+    
+    if args.no_index:
+        if not args.export_snapshot:
+            parser.error("--no-index requiere --export-snapshot")
+        try:
+            index_version = get_index_version()
+        except Exception as e:
+            logger.warning(f"No se pudo obtener la versión del índice: {str(e)}")
+            index_version = None
+        export_snapshot(args.export_snapshot, args.snapshot_dtype, index_version=index_version)
+        sys.exit(0)
+    
+    manifest = IndexManifest(args.manifest)
+    if args.mode == "incremental" and not manifest.exists:
+        # Sin manifiesto no se sabe qué filas existen: se reconstruye todo para no duplicar chunks
+        logger.warning(f"No existe el manifiesto {args.manifest}; se realizará una reindexación completa")
+        args.mode = "full"
+    
+    if args.mode == "full":
+        delete_all_documents()
+        manifest.reset()
     
     # Comprobar si se debe procesar desde Drive o localmente
     drive_folder_id = os.getenv("DRIVE_FOLDER_ID")
     
     if drive_folder_id:
         logger.info(f"Procesando documentos desde Google Drive folder: {drive_folder_id}")
-        process_drive_files(drive_folder_id)
+        process_drive_files(drive_folder_id, manifest=manifest)
     else:
-        # Procesar todos los PDFs en la carpeta 'documents' y subcarpetas
+        # Procesar todos los documentos en la carpeta 'documents' y subcarpetas
         docs_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'documents')
         logger.info(f"Procesando documentos locales desde: {docs_dir}")
-        process_pdf_directory(docs_dir)
+        process_pdf_directory(docs_dir, manifest=manifest)
+
+    if unregistered and index_registry.enabled:
+        # Primera ingesta con el registro: se registra la tabla `documents` con el modelo que la construyó
+        try:
+            index_registry.register(write_index)
+        except Exception as e:
+            logger.warning(f"No se pudo registrar el índice {write_index.name}: {str(e)}")
+    
+    # Publicar una nueva versión del índice para invalidar las cachés de resultados del agente
+    index_version = None
+    try:
+        index_version = bump_index_version()
+    except Exception as e:
+        logger.error(f"Error al actualizar la versión del índice: {str(e)}")
+    
+    if args.export_snapshot:
+        export_snapshot(args.export_snapshot, args.snapshot_dtype, index_version=index_version)
 
-    logger.info("Procesamiento de documentos completado")
\ No newline at end of file
+    logger.info("Procesamiento de documentos completado")
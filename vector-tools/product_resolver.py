@@ -0,0 +1,157 @@
+import re
+import threading
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from embedding_cache import normalizar_consulta
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def clave_producto(texto: str) -> str:
+    """Forma normalizada de un nombre de producto: minúsculas, sin tildes y solo letras y números."""
+    return _NON_ALNUM.sub(" ", normalizar_consulta(texto or "")).strip()
+
+
+def trigramas(clave: str) -> Set[str]:
+    """Trigramas de una clave normalizada, con relleno para que el inicio y el final de cada palabra cuenten."""
+    texto = f"  {clave} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def dice(a: Set[str], b: Set[str]) -> float:
+    return 2 * len(a & b) / (len(a) + len(b)) if a or b else 0.0
+
+
+class ProductResolver:
+    """
+    Resuelve el producto que menciona el agente a las categorías de la metadata (carpetas de Drive).
+
+    Se construye una vez con las categorías y sus alias. Cada nombre y alias se guarda normalizado
+    (`clave_producto`) en una tabla exacta y en un índice invertido de trigramas. Para resolver un nombre:
+
+    1. Coincidencia exacta de la clave (puntaje 1).
+    2. Clave contenida como palabras completas en el nombre, p. ej. "transferencias LBTR de hoy" (0.9).
+    3. Similitud por trigramas (promedio de Dice y de la fracción de trigramas del nombre presentes en la
+       clave), que tolera errores de tipeo y palabras de menos. Se multiplica por la fracción de palabras del
+       nombre (de más de 3 letras) que aparecen en la clave, con o sin errores de tipeo: así "tarjeta debito"
+       no se resuelve a "Tarjeta de Crédito" por compartir la primera palabra.
+    4. Si nada supera `min_score` y hay embeddings, la categoría cuyo centroide (promedio de los embeddings
+       del nombre y los alias) es más similar a la consulta, si supera `embedding_min_score`.
+
+    Devuelve una lista de (categoría, puntaje) de mayor a menor, así la búsqueda filtra por la partición
+    correcta en vez de caer en la búsqueda sin categoría. `best` solo elige una categoría si la segunda
+    queda a más de `ambiguity_margin` de la primera (p. ej. "credito" o "dólares" no eligen ninguna).
+    """
+
+    def __init__(self, categories: Iterable[str], aliases: Optional[Dict[str, str]] = None,
+                 embed: Optional[Callable[[str], List[float]]] = None,
+                 centroids: Optional[Dict[str, List[float]]] = None,
+                 min_score: float = 0.5, embedding_min_score: float = 0.3, ambiguity_margin: float = 0.05):
+        self.categories = list(categories)
+        self.aliases = dict(aliases or {})
+        self.embed = embed
+        self.min_score = min_score
+        self.embedding_min_score = embedding_min_score
+        self.ambiguity_margin = ambiguity_margin
+
+        index = {category: i for i, category in enumerate(self.categories)}
+        self._exact: Dict[str, int] = {}
+        # (clave, categoría, cantidad de trigramas, trigramas de cada palabra de la clave)
+        self._keys: List[Tuple[str, int, int, List[Set[str]]]] = []
+        self._postings: Dict[str, List[int]] = {}
+        names = [(category, category) for category in self.categories] + list(self.aliases.items())
+        for name, category in names:
+            if category not in index:
+                raise ValueError(f"El alias '{name}' apunta a una categoría desconocida: {category}")
+            key = clave_producto(name)
+            if not key or key in self._exact:
+                continue
+            self._exact[key] = index[category]
+            grams = trigramas(key)
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(len(self._keys))
+            self._keys.append((key, index[category], len(grams), [trigramas(word) for word in key.split()]))
+
+        self._centroids: Optional[np.ndarray] = None
+        if centroids is not None:
+            self._centroids = self._unit_rows([centroids[category] for category in self.categories])
+        self._centroids_lock = threading.Lock()
+
+    @staticmethod
+    def _unit_rows(vectors) -> np.ndarray:
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        return matrix / np.where(norms > 0, norms, 1)
+
+    def _lexical_scores(self, key: str) -> Dict[int, float]:
+        scores: Dict[int, float] = {}
+        exact = self._exact.get(key)
+        if exact is not None:
+            scores[exact] = 1.0
+        padded = f" {key} "
+        grams = trigramas(key)
+        words = [trigramas(word) for word in key.split() if len(word) > 3]
+        shared = Counter(k for gram in grams for k in self._postings.get(gram, ()))
+        for k, common in shared.items():
+            candidate, category, size, candidate_words = self._keys[k]
+            score = (2 * common / (len(grams) + size) + common / len(grams)) / 2
+            if words:
+                matched = sum(1 for word in words if any(dice(word, other) >= 0.5 for other in candidate_words))
+                score *= matched / len(words)
+            if f" {candidate} " in padded:
+                score = max(score, 0.9)
+            if score > scores.get(category, 0.0):
+                scores[category] = score
+        return scores
+
+    def centroids(self) -> Optional[np.ndarray]:
+        """Centroides de las categorías (uno por fila), calculados con `embed` en el primer uso."""
+        if self._centroids is None and self.embed is not None:
+            with self._centroids_lock:
+                if self._centroids is None:
+                    names: Dict[str, List[str]] = {category: [category] for category in self.categories}
+                    for alias, category in self.aliases.items():
+                        names[category].append(alias)
+                    self._centroids = self._unit_rows([
+                        self._unit_rows([self.embed(name) for name in names[category]]).mean(axis=0)
+                        for category in self.categories
+                    ])
+        return self._centroids
+
+    def resolve(self, producto: str, query_embedding: Optional[List[float]] = None,
+                limit: int = 3) -> List[Tuple[str, float]]:
+        """
+        Categorías candidatas para `producto`, de mayor a menor puntaje. `query_embedding` (por ejemplo, el
+        de la consulta completa) se usa solo si no hay coincidencia léxica; si no se entrega, se calcula el
+        embedding de `producto` con `embed`.
+        """
+        key = clave_producto(producto)
+        scores = self._lexical_scores(key) if key else {}
+        ranked = sorted(((c, s) for c, s in scores.items() if s >= self.min_score), key=lambda item: -item[1])
+        if ranked:
+            return [(self.categories[c], round(s, 4)) for c, s in ranked[:limit]]
+
+        if query_embedding is None and (not key or self.embed is None):
+            return []
+        centroids = self.centroids()
+        if centroids is None:
+            return []
+        if query_embedding is None:
+            query_embedding = self.embed(producto)
+        similarities = centroids @ self._unit_rows(query_embedding)
+        order = np.argsort(-similarities, kind="stable")[:limit]
+        return [(self.categories[c], round(float(similarities[c]), 4))
+                for c in order if similarities[c] >= self.embedding_min_score]
+
+    def best(self, producto: str, query_embedding: Optional[List[float]] = None) -> Optional[str]:
+        """
+        La categoría con mayor puntaje, o None si ninguna alcanza el mínimo o si la segunda queda a menos de
+        `ambiguity_margin` (en ese caso la búsqueda sin categoría cubre a ambas).
+        """
+        ranked = self.resolve(producto, query_embedding, limit=2)
+        if not ranked or (len(ranked) > 1 and ranked[0][1] - ranked[1][1] < self.ambiguity_margin):
+            return None
+        return ranked[0][0]
@@ -20,4 +20,33 @@ PRODUCTOS_BANCARIOS = {
     "Pac Multibanco": "1bLrR6ihm-n87BLa-PZHro7fw5nLgDmfA",
     "LBTR": "10YaJIXypa3mztrl7i20ta6qtCJmlQYBh",
     "Cartola FFMM": "1qRsY5jnky_rVKNC0kQc8MC-q-Lol2ACF"
-} 
\ No newline at end of file
+} 
+
+# Otros nombres con los que usuarios y agente se refieren a cada producto (clave: alias, valor: categoría)
+ALIAS_PRODUCTOS = {
+    "Compra de Dólares": "Compra Dolares",
+    "Venta de Dólares": "Venta Dolares",
+    "Depósito a Plazo": "DAP",
+    "Depósitos a Plazo": "DAP",
+    "Tarjeta de Crédito": "Tarjetas de Crédito",
+    "App Empresas": "APP Empresa",
+    "Aplicación Empresa": "APP Empresa",
+    "Reset de Clave": "Reset y Recuperacion Clave",
+    "Recuperar Clave": "Reset y Recuperacion Clave",
+    "Actualización de Datos": "Datos Clientes",
+    "Pagos Masivos": "abonos Masivos",
+    "FOGAPE": "Crédito Comercial FOGAPE",
+    "Onboarding": "Onboarding Empresas",
+    "LAC": "Aumento LAC",
+    "Línea de Crédito": "Aumento LAC",
+    "Aumento de Línea de Crédito": "Aumento LAC",
+    "Botón de Pago": "Manual Boton de Pago",
+    "Crédito de Consumo": "Consulta Credito Consumo",
+    "Crédito Hipotecario": "Consulta Credito Hipotecario",
+    "Hipotecario": "Consulta Credito Hipotecario",
+    "Pago de Línea de Crédito": "Pago de Linea",
+    "PAC": "Pac Multibanco",
+    "Transferencias LBTR": "LBTR",
+    "Fondos Mutuos": "Cartola FFMM",
+    "FFMM": "Cartola FFMM",
+}
@@ -0,0 +1,174 @@
+"""
+Reconstruye el índice vectorial con otro modelo de embeddings sin cortar el servicio (ver index_registry.py).
+
+1. Registra el índice nuevo (`building`) y vacía su tabla, que se crea antes en Supabase (ver README).
+2. Copia los chunks del índice activo en páginas, con los embeddings del modelo nuevo. Mientras tanto el
+   agente sigue consultando el índice activo y process_docs.py no indexa, para que la copia no quede atrás.
+3. Verifica que la copia tenga todos los chunks y marca el índice como `ready`.
+4. Con `--activate`, lo activa (el anterior queda `retired`) y publica una nueva versión del índice para
+   invalidar las cachés de resultados. Las instancias del agente con el modelo nuevo consultan el índice
+   nuevo; las que siguen con el anterior, el retirado, hasta que se actualizan.
+
+Sin `--activate`, el índice queda `ready`: se activa después con `--activate-only`.
+
+    python vector-tools/reembed.py --model intfloat/multilingual-e5-small --version 1 --activate
+    python vector-tools/reembed.py --activate-only documents_multilingual_e5_small_v1
+"""
+import argparse
+import logging
+import os
+import sys
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+# Agregar la ruta del directorio utils al path para usar el registro compartido de clientes
+utils_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'utils')
+if utils_path not in sys.path:
+    sys.path.append(utils_path)
+
+# Antes de importar los módulos que leen la configuración
+load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env'))
+
+from clients import get_supabase_client
+from embedding_engines import create_engine, embedding_dimension
+from index_registry import BUILDING, READY, EmbeddingSpec, IndexInfo, IndexRegistry, legacy_index
+from index_state import bump_index_version
+from stage_timer import StageTimer
+
+logger = logging.getLogger(__name__)
+
+
+def source_index(registry: IndexRegistry, client) -> IndexInfo:
+    """
+    Índice del que se copian los chunks: el activo. Sin índices registrados, la tabla `documents` con el
+    modelo que indica la metadata de sus chunks (o EMBEDDING_MODEL_NAME si son anteriores al registro).
+    """
+    active = registry.active()
+    if active is not None:
+        return active
+    rows = client.table("documents").select("metadata").limit(1).execute().data or []
+    metadata = (rows[0].get("metadata") or {}) if rows else {}
+    spec = EmbeddingSpec.from_env()
+    if metadata.get("embedding_model"):
+        spec = EmbeddingSpec(metadata["embedding_model"], str(metadata.get("embedding_version", "1")),
+                             metadata.get("embedding_dim"))
+    return legacy_index(spec)
+
+
+def count_rows(client, table: str) -> int:
+    return client.table(table).select("id", count="exact").limit(1).execute().count or 0
+
+
+def copy_with_new_embeddings(client, source: IndexInfo, target: IndexInfo,
+                             encode: Callable[[List[str]], np.ndarray],
+                             batch_size: int = 64, page_size: int = 500,
+                             timer: Optional[StageTimer] = None) -> int:
+    """
+    Copia los chunks de la tabla de `source` a la de `target` con los embeddings de `encode`, leyendo en páginas
+    de `page_size` filas por id y codificando en lotes de `batch_size`. Devuelve las filas copiadas.
+    """
+    timer = timer or StageTimer()
+    embedding_metadata = target.embedding.metadata()
+    copied, start = 0, 0
+    while True:
+        with timer.stage("read"):
+            page = client.table(source.table) \
+                .select("id, content, metadata") \
+                .order("id") \
+                .range(start, start + page_size - 1) \
+                .execute().data or []
+        for offset in range(0, len(page), batch_size):
+            batch = page[offset:offset + batch_size]
+            with timer.stage("embed", items=len(batch)):
+                embeddings = encode([row["content"] for row in batch])
+            rows: List[Dict[str, Any]] = [{
+                "content": row["content"],
+                "metadata": {**(row.get("metadata") or {}), **embedding_metadata},
+                "embedding": embedding.tolist(),
+            } for row, embedding in zip(batch, embeddings)]
+            with timer.stage("write", items=len(rows)):
+                client.table(target.table).insert(rows).execute()
+            copied += len(rows)
+        logger.info(f"Reindexando {source.table} -> {target.table}: {copied} chunks copiados")
+        if len(page) < page_size:
+            return copied
+        start += page_size
+
+
+def rebuild_index(target: IndexInfo, encode: Callable[[List[str]], np.ndarray],
+                  registry: Optional[IndexRegistry] = None, client=None,
+                  activate: bool = False, batch_size: int = 64, page_size: int = 500,
+                  bump_version: Callable[[], str] = bump_index_version,
+                  timer: Optional[StageTimer] = None) -> int:
+    """Construye `target` a partir del índice activo y, con `activate`, lo activa. Devuelve los chunks copiados."""
+    registry = registry or IndexRegistry()
+    client = client or get_supabase_client()
+    source = source_index(registry, client)
+    if source.table == target.table:
+        raise ValueError(f"El índice {target.name} usa la tabla del índice activo ({source.table})")
+    if registry.get(source.name) is None:
+        # El índice `documents` anterior al registro se registra para que quede como `retired` al activar
+        # el nuevo y las instancias con el modelo anterior lo sigan encontrando
+        registry.register(source)
+
+    target.status = BUILDING
+    registry.register(target)
+    # Restos de una construcción interrumpida
+    client.table(target.table).delete().neq("id", 0).execute()
+    copied = copy_with_new_embeddings(client, source, target, encode, batch_size, page_size, timer)
+
+    expected, actual = count_rows(client, source.table), count_rows(client, target.table)
+    if actual != expected:
+        raise RuntimeError(f"El índice {target.name} tiene {actual} chunks y {source.name} {expected}; "
+                           f"queda en estado '{BUILDING}', vuelve a ejecutar reembed.py")
+    registry.set_status(target.name, READY)
+    logger.info(f"Índice {target.name} completo: {copied} chunks con {target.embedding}")
+
+    if activate:
+        registry.activate(target.name)
+        bump_version()
+    return copied
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Reconstruye el índice vectorial con otro modelo de embeddings")
+    parser.add_argument("--model", help="Modelo de embeddings nuevo (nombre o ruta de sentence-transformers)")
+    parser.add_argument("--version", default="1", help="Versión del modelo nuevo")
+    parser.add_argument("--name", help="Nombre del índice (por defecto, documents_<modelo>_v<versión>)")
+    parser.add_argument("--table", help="Tabla del índice (por defecto, el nombre)")
+    parser.add_argument("--match-function", help="Función RPC de búsqueda (por defecto, match_<nombre>)")
+    parser.add_argument("--match-by-category-function",
+                        help="Función RPC de búsqueda por categoría (por defecto, match_<nombre>_by_category)")
+    parser.add_argument("--engine", help="Motor de embeddings (por defecto, EMBEDDING_ENGINE)")
+    parser.add_argument("--batch-size", type=int, default=int(os.getenv("EMBEDDING_BATCH_SIZE", "64")))
+    parser.add_argument("--page-size", type=int, default=500, help="Filas leídas por consulta")
+    parser.add_argument("--activate", action="store_true", help="Activa el índice al terminar")
+    parser.add_argument("--activate-only", metavar="NAME", help="Solo activa un índice ya construido (ready)")
+    args = parser.parse_args()
+
+    registry = IndexRegistry()
+    if args.activate_only:
+        index = registry.get(args.activate_only)
+        if index is None or index.status != READY:
+            parser.error(f"El índice {args.activate_only} no existe o no está completo (ready)")
+        registry.activate(index.name)
+        bump_index_version()
+        sys.exit(0)
+    if not args.model:
+        parser.error("--model es obligatorio")
+
+    engine = create_engine(args.engine, model_name=args.model)
+    spec = EmbeddingSpec(args.model, args.version, embedding_dimension(engine))
+    target = IndexInfo.for_spec(spec, args.name)
+    target.table = args.table or target.table
+    target.match_function = args.match_function or target.match_function
+    target.match_by_category_function = args.match_by_category_function or target.match_by_category_function
+
+    timer = StageTimer()
+    rebuild_index(target, lambda texts: engine.encode(texts, batch_size=args.batch_size),
+                  registry, activate=args.activate, batch_size=args.batch_size, page_size=args.page_size,
+                  timer=timer)
+    timer.log_summary("Reindexación")
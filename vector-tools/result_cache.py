@@ -0,0 +1,123 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from embedding_cache import normalizar_consulta
+
+logger = logging.getLogger(__name__)
+
+# Versión todavía no consultada
+_UNSET = object()
+
+
+class SemanticResultCache:
+    """
+    Caché de resultados de búsqueda por (categoría, embedding de la consulta).
+
+    Una consulta acierta si, dentro de su categoría, hay una entrada vigente cuya similitud coseno con el
+    embedding de la consulta es al menos `threshold`, así que preguntas casi idénticas reutilizan el
+    resultado sin volver a llamar a Supabase. Las entradas expiran a los `ttl` segundos y toda la caché
+    se descarta cuando cambia la versión del índice que informa `version_provider` (consultada como
+    máximo cada `version_check_interval` segundos). `clock` es la fuente de tiempo (por defecto `time.monotonic`).
+    """
+
+    def __init__(self, threshold: float = 0.95, ttl: float = 600, max_entries_per_category: int = 256,
+                 version_provider: Optional[Callable[[], Optional[str]]] = None,
+                 version_check_interval: float = 30, clock: Callable[[], float] = time.monotonic):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries_per_category = max_entries_per_category
+        self.version_provider = version_provider
+        self.version_check_interval = version_check_interval
+        self.clock = clock
+        self._entries: Dict[str, "OrderedDict[int, Tuple[np.ndarray, object, float]]"] = {}
+        self._next_id = 0
+        self._version = _UNSET
+        self._version_checked_at = float("-inf")
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _category_key(categoria: Optional[str]) -> str:
+        return normalizar_consulta(categoria or "")
+
+    @staticmethod
+    def _unit(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_version(self) -> None:
+        """Descarta la caché si el índice cambió de versión desde la última comprobación."""
+        if self.version_provider is None:
+            return
+        now = self.clock()
+        if now - self._version_checked_at < self.version_check_interval:
+            return
+        self._version_checked_at = now
+        try:
+            version = self.version_provider()
+        except Exception as e:
+            logger.warning(f"No se pudo obtener la versión del índice: {str(e)}")
+            return
+        with self._lock:
+            if version != self._version:
+                if self._version is not _UNSET:
+                    logger.info(f"Versión del índice cambió ({self._version} -> {version}); se invalida la caché")
+                    self._entries.clear()
+                    self.invalidations += 1
+                self._version = version
+
+    def get(self, categoria: Optional[str], embedding) -> Optional[object]:
+        """Devuelve el resultado cacheado más similar, o None si ninguno supera el umbral."""
+        self._check_version()
+        query = self._unit(embedding)
+        now = self.clock()
+        with self._lock:
+            entries = self._entries.get(self._category_key(categoria))
+            if entries:
+                for entry_id in [i for i, (_, _, created) in entries.items() if now - created > self.ttl]:
+                    del entries[entry_id]
+            if not entries:
+                self.misses += 1
+                return None
+            ids = list(entries.keys())
+            similarities = np.stack([entries[i][0] for i in ids]) @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+            entries.move_to_end(ids[best])
+            self.hits += 1
+            return entries[ids[best]][1]
+
+    def put(self, categoria: Optional[str], embedding, result: object) -> None:
+        with self._lock:
+            entries = self._entries.setdefault(self._category_key(categoria), OrderedDict())
+            entries[self._next_id] = (self._unit(embedding), result, self.clock())
+            self._next_id += 1
+            while len(entries) > self.max_entries_per_category:
+                entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": sum(len(entries) for entries in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / total if total else 0.0,
+                "index_version": None if self._version is _UNSET else self._version,
+            }
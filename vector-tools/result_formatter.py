@@ -0,0 +1,154 @@
+import math
+import re
+from typing import Any, Callable, Dict, List, Tuple
+
+# Caracteres por token aproximados de Gemini para texto en español; basta para presupuestar el contexto
+CHARS_PER_TOKEN = 4
+# Largo del prefijo que se busca para detectar el solapamiento entre chunks consecutivos
+_OVERLAP_PROBE = 32
+_SENTENCE_END = re.compile(r"[.!?:;]\s")
+
+
+def estimar_tokens(texto: str) -> int:
+    """Tokens aproximados de un texto para el modelo del agente (~4 caracteres por token)."""
+    return math.ceil(len(texto) / CHARS_PER_TOKEN)
+
+
+def unir_textos(a: str, b: str) -> str:
+    """
+    Une dos chunks consecutivos del mismo documento sin repetir el texto que comparten: busca el sufijo más
+    largo de `a` que es prefijo de `b` (el solapamiento del chunker). Si no lo hay, los separa con un salto.
+    """
+    if b in a:
+        return a
+    probe = b[:_OVERLAP_PROBE]
+    start = a.find(probe)
+    while start != -1:
+        if b.startswith(a[start:]):
+            return a + b[len(a) - start:]
+        start = a.find(probe, start + 1)
+    return f"{a}\n{b}"
+
+
+class Pasaje:
+    """Uno o más chunks consecutivos de un documento, con el texto unido y el puntaje de sus chunks."""
+
+    def __init__(self, result: Dict[str, Any]):
+        metadata = result.get("metadata") or {}
+        self.metadata = metadata
+        self.source = metadata.get("source")
+        self.first_index = self.last_index = metadata.get("chunk_index")
+        self.page_start = metadata.get("page_start")
+        self.page_end = metadata.get("page_end")
+        self.content = result.get("content") or ""
+        self.similarity = result["similarity"]
+        self.score = result["similarity"]
+        self.chunks = 1
+        self.trimmed = False
+
+    def covers(self, result: Dict[str, Any]) -> bool:
+        metadata = result.get("metadata") or {}
+        index = metadata.get("chunk_index")
+        return (self.source is not None and metadata.get("source") == self.source
+                and None not in (index, self.first_index) and self.first_index <= index <= self.last_index)
+
+    def follows(self, result: Dict[str, Any]) -> bool:
+        metadata = result.get("metadata") or {}
+        return (self.source is not None and metadata.get("source") == self.source
+                and self.last_index is not None and metadata.get("chunk_index") == self.last_index + 1)
+
+    def extend(self, result: Dict[str, Any]) -> None:
+        metadata = result.get("metadata") or {}
+        self.content = unir_textos(self.content, result.get("content") or "")
+        self.last_index = metadata.get("chunk_index")
+        if metadata.get("page_end") is not None:
+            self.page_end = metadata["page_end"]
+        self.similarity = max(self.similarity, result["similarity"])
+        self.score += result["similarity"]
+        self.chunks += 1
+
+    def density(self, count_tokens: Callable[[str], int]) -> float:
+        """Puntaje por token: prioriza los pasajes que más aportan por cada token de contexto."""
+        return self.score / max(count_tokens(self.content), 1)
+
+
+def _recortar(texto: str, tokens: int, count_tokens: Callable[[str], int]) -> str:
+    """Recorta `texto` a `tokens` por palabras completas y, si se puede, en el último fin de oración."""
+    words = texto.split(" ")
+    lo, hi = 0, len(words)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(" ".join(words[:mid]) + " …") <= tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    cut = " ".join(words[:lo])
+    ends = list(_SENTENCE_END.finditer(cut + " "))
+    if ends and ends[-1].start() + 1 >= len(cut) // 2:
+        return cut[:ends[-1].start() + 1]
+    return f"{cut} …"
+
+
+def compactar_resultados(results: List[Dict[str, Any]], token_budget: int,
+                         count_tokens: Callable[[str], int] = estimar_tokens,
+                         min_passage_tokens: int = 40) -> Tuple[List[Pasaje], Dict[str, int]]:
+    """
+    Prepara las filas del backend para el contexto del agente:
+
+    1. Une los chunks consecutivos (`chunk_index` seguido) de un mismo documento en un pasaje, sin repetir
+       el texto solapado; su puntaje es la suma de las similitudes de sus chunks.
+    2. Ordena los pasajes por densidad de puntaje (puntaje / tokens).
+    3. Los agrega en ese orden hasta `token_budget` tokens (`count_tokens`). Un pasaje que no cabe se
+       recorta si quedan al menos `min_passage_tokens` tokens; si no, se descarta. El primero siempre entra.
+
+    Devuelve los pasajes y las estadísticas de la llamada (tokens de entrada y salida, tokens ahorrados,
+    chunks unidos, pasajes recortados y descartados).
+    """
+    stats = {"tokens_in": sum(count_tokens(r.get("content") or "") for r in results),
+             "tokens_out": 0, "tokens_saved": 0, "merged": 0, "trimmed": 0, "dropped": 0}
+
+    by_position = sorted(
+        results,
+        key=lambda r: ((r.get("metadata") or {}).get("source") or "", (r.get("metadata") or {}).get("chunk_index") or 0),
+    )
+    passages: List[Pasaje] = []
+    for result in by_position:
+        if passages and passages[-1].covers(result):
+            # El mismo chunk devuelto dos veces (p. ej. por búsquedas de varios productos)
+            passages[-1].similarity = max(passages[-1].similarity, result["similarity"])
+            stats["merged"] += 1
+        elif passages and passages[-1].follows(result):
+            passages[-1].extend(result)
+            stats["merged"] += 1
+        else:
+            passages.append(Pasaje(result))
+    passages.sort(key=lambda p: -p.density(count_tokens))
+
+    selected = []
+    remaining = token_budget
+    for passage in passages:
+        tokens = count_tokens(passage.content)
+        if tokens > remaining:
+            if remaining < min_passage_tokens and selected:
+                stats["dropped"] += 1
+                continue
+            passage.content = _recortar(passage.content, max(remaining, min_passage_tokens), count_tokens)
+            passage.trimmed = True
+            stats["trimmed"] += 1
+            tokens = count_tokens(passage.content)
+        selected.append(passage)
+        remaining -= tokens
+
+    stats["tokens_out"] = sum(count_tokens(p.content) for p in selected)
+    stats["tokens_saved"] = stats["tokens_in"] - stats["tokens_out"]
+    return selected, stats
+
+
+def describir_fuente(passage: Pasaje) -> str:
+    """Fuente de un pasaje, con sus páginas si la metadata las incluye (p. ej. "manual.pdf, págs. 3-4")."""
+    source = passage.source or "desconocida"
+    if passage.page_start is None:
+        return source
+    if passage.page_end in (None, passage.page_start):
+        return f"{source}, pág. {passage.page_start}"
+    return f"{source}, págs. {passage.page_start}-{passage.page_end}"
@@ -0,0 +1,301 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from vector_snapshot import Snapshot, load_snapshot
+
+# Agregar la ruta del directorio utils al path para usar el registro compartido de clientes
+utils_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'utils')
+if utils_path not in sys.path:
+    sys.path.append(utils_path)
+
+from clients import get_supabase_async_http, get_supabase_client
+from index_registry import EmbeddingSpec, IndexInfo, IndexRegistry, legacy_index
+
+logger = logging.getLogger(__name__)
+
+
+class SupabaseBackend:
+    """
+    Búsqueda vectorial con las funciones RPC de un índice de Supabase (`match_documents` /
+    `match_documents_by_category` para la tabla `documents`).
+    """
+
+    name = "supabase"
+
+    def __init__(self, index: Optional[IndexInfo] = None):
+        self.index = index or legacy_index()
+
+    @classmethod
+    def for_model(cls, spec: EmbeddingSpec, registry: Optional[IndexRegistry] = None) -> "SupabaseBackend":
+        """Backend sobre el índice registrado que corresponde al modelo `spec` (ver index_registry.py)."""
+        index = (registry or IndexRegistry()).resolve(spec)
+        logger.info(f"Índice de búsqueda: {index.name} ({index.embedding}, {index.status})")
+        return cls(index)
+
+    def match(self, query_embedding: List[float], match_threshold: float, match_count: int,
+              category: Optional[str] = None, query_text: Optional[str] = None) -> List[Dict[str, Any]]:
+        payload = {
+            'query_embedding': query_embedding,
+            'match_threshold': match_threshold,
+            'match_count': match_count
+        }
+        if category:
+            response = get_supabase_client().rpc(
+                self.index.match_by_category_function,
+                {**payload, 'category_name': category}
+            ).execute()
+        else:
+            response = get_supabase_client().rpc(self.index.match_function, payload).execute()
+        return response.data or []
+
+    async def amatch(self, query_embedding: List[float], match_threshold: float, match_count: int,
+                     category: Optional[str] = None, query_text: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Igual que `match`, pero llama a la RPC con el cliente HTTP asíncrono."""
+        payload = {
+            'query_embedding': query_embedding,
+            'match_threshold': match_threshold,
+            'match_count': match_count
+        }
+        if category:
+            function, payload = self.index.match_by_category_function, {**payload, 'category_name': category}
+        else:
+            function = self.index.match_function
+        response = await get_supabase_async_http().post(f"/rpc/{function}", json=payload)
+        response.raise_for_status()
+        return response.json() or []
+
+
+def _normalize(query_embedding: List[float]) -> np.ndarray:
+    query = np.asarray(query_embedding, dtype=np.float32)
+    norm = np.linalg.norm(query)
+    return query / norm if norm else query
+
+
+class LocalBackend:
+    """
+    Búsqueda vectorial en memoria sobre un snapshot de la tabla 'documents'.
+
+    Los embeddings están normalizados y agrupados por categoría en una matriz contigua (float32, float16 o
+    int8 con escala por fila), así que una búsqueda por categoría es un producto matriz-vector sobre su rango
+    de filas. Devuelve las mismas filas que las RPC de Supabase: `id`, `content`, `metadata` y `similarity`.
+    """
+
+    name = "local"
+
+    # Filas que se convierten a float32 por bloque al puntuar matrices float16/int8
+    block_size = 8192
+
+    def __init__(self, snapshot: Snapshot):
+        self.snapshot = snapshot
+
+    @classmethod
+    def from_path(cls, path: str, spec: Optional[EmbeddingSpec] = None) -> "LocalBackend":
+        """Carga el snapshot de `path`. Con `spec`, lanza ValueError si el snapshot es de otro modelo de embeddings."""
+        snapshot = load_snapshot(path, mmap=True)
+        if spec is not None:
+            check_snapshot_embedding(snapshot, spec, path)
+        logger.info(f"Índice local cargado desde {path}: {len(snapshot.rows)} chunks, "
+                    f"{len(snapshot.categories)} categorías ({snapshot.embeddings.dtype})")
+        return cls(snapshot)
+
+    def category_range(self, category: Optional[str]) -> Optional[Tuple[int, int]]:
+        """Rango `[inicio, fin)` de filas de la categoría (todas sin categoría), o None si no existe."""
+        if not category:
+            return 0, len(self.snapshot.rows)
+        return self.snapshot.categories.get(category)
+
+    def similarities(self, positions: List[int], query_embedding: List[float]) -> np.ndarray:
+        """Similitud coseno entre la consulta y las filas `positions` del snapshot."""
+        positions = np.asarray(positions, dtype=np.int64)
+        scores = self.snapshot.embeddings[positions].astype(np.float32) @ _normalize(query_embedding)
+        if self.snapshot.scales is not None:
+            scores *= self.snapshot.scales[positions]
+        return scores
+
+    def _scores(self, start: int, end: int, query: np.ndarray) -> np.ndarray:
+        embeddings = self.snapshot.embeddings
+        if embeddings.dtype == np.float32:
+            return embeddings[start:end] @ query
+        scores = np.empty(end - start, dtype=np.float32)
+        for block_start in range(start, end, self.block_size):
+            block_end = min(block_start + self.block_size, end)
+            block = embeddings[block_start:block_end].astype(np.float32) @ query
+            if self.snapshot.scales is not None:
+                block *= self.snapshot.scales[block_start:block_end]
+            scores[block_start - start:block_end - start] = block
+        return scores
+
+    def match(self, query_embedding: List[float], match_threshold: float, match_count: int,
+              category: Optional[str] = None, query_text: Optional[str] = None) -> List[Dict[str, Any]]:
+        bounds = self.category_range(category)
+        if bounds is None:
+            return []
+        start, end = bounds
+        if end <= start or match_count <= 0:
+            return []
+
+        scores = self._scores(start, end, _normalize(query_embedding))
+
+        candidates = np.flatnonzero(scores > match_threshold)
+        if len(candidates) > match_count:
+            candidates = candidates[np.argpartition(scores[candidates], -match_count)[-match_count:]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [
+            {**self.snapshot.rows[start + i], "similarity": float(scores[i])}
+            for i in candidates
+        ]
+
+    async def amatch(self, query_embedding: List[float], match_threshold: float, match_count: int,
+                     category: Optional[str] = None, query_text: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Igual que `match`, ejecutado en un thread (NumPy libera el GIL durante el producto matricial)."""
+        return await asyncio.to_thread(self.match, query_embedding, match_threshold, match_count, category)
+
+
+def snapshot_embedding(snapshot: Snapshot) -> EmbeddingSpec:
+    """Modelo de embeddings de un snapshot. Los exportados antes del registro de índices solo guardan el nombre."""
+    embedding = snapshot.manifest.get("embedding") or {}
+    return EmbeddingSpec(embedding.get("model") or snapshot.manifest.get("model") or EmbeddingSpec.from_env().model,
+                         str(embedding.get("version", "1")), snapshot.manifest.get("dim"))
+
+
+def check_snapshot_embedding(snapshot: Snapshot, spec: EmbeddingSpec, path: str) -> None:
+    """Lanza ValueError si el snapshot no es del modelo `spec`: sus embeddings no se pueden comparar con las consultas."""
+    if not snapshot_embedding(snapshot).matches(spec):
+        raise ValueError(f"El snapshot {path} es del modelo {snapshot_embedding(snapshot)} y el modelo cargado "
+                         f"es {spec}; vuelve a exportarlo desde el índice de ese modelo")
+
+
+def reciprocal_rank_fusion(rankings: List[List[Any]], k: int = 60) -> List[Tuple[Any, float]]:
+    """
+    Fusiona rankings con Reciprocal Rank Fusion: cada clave suma 1 / (k + posición) en cada ranking donde
+    aparece. Devuelve pares (clave, puntaje) de mayor a menor; los empates conservan el orden de llegada.
+    """
+    scores: Dict[Any, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, 1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])
+
+
+class HybridBackend:
+    """
+    Búsqueda híbrida: fusiona con Reciprocal Rank Fusion los resultados de un backend vectorial con los del
+    índice BM25 del snapshot.
+
+    Las siglas y códigos de producto ("LBTR", "FOGAPE") quedan mal representados en los embeddings, pero el
+    índice léxico los encuentra de forma exacta. Cada lista aporta hasta `candidates` filas y la fusión
+    devuelve solo `match_count`, así que mejora la calidad sin agrandar el contexto que recibe el agente.
+
+    Las filas que aporta solo BM25 no pasan por `match_threshold`; su `similarity` es la similitud coseno
+    calculada con los embeddings del snapshot. Todas las filas incluyen además `rrf_score`.
+    """
+
+    def __init__(self, vector_backend, snapshot: Snapshot, rrf_k: int = 60, candidates: int = 20):
+        if snapshot.bm25 is None:
+            raise ValueError("El snapshot no tiene índice BM25; vuelve a exportarlo para usar la búsqueda híbrida")
+        self.vector_backend = vector_backend
+        self.snapshot = snapshot
+        self.local = vector_backend if isinstance(vector_backend, LocalBackend) else LocalBackend(snapshot)
+        self.rrf_k = rrf_k
+        self.candidates = candidates
+        self.name = f"hybrid({vector_backend.name})"
+
+    def _lexical(self, query_text: Optional[str], category: Optional[str]) -> List[int]:
+        bounds = self.local.category_range(category)
+        if not query_text or bounds is None:
+            return []
+        return [row for row, _ in self.snapshot.bm25.search(query_text, self.candidates, *bounds)]
+
+    def _fuse(self, vector_rows: List[Dict[str, Any]], lexical: List[int], query_embedding: List[float],
+              match_count: int) -> List[Dict[str, Any]]:
+        rows = {row["id"]: row for row in vector_rows}
+        lexical_ids = [int(self.snapshot.rows.ids[position]) for position in lexical]
+        missing = [(row_id, position) for row_id, position in zip(lexical_ids, lexical) if row_id not in rows]
+        if missing:
+            similarities = self.local.similarities([position for _, position in missing], query_embedding)
+            for (row_id, position), similarity in zip(missing, similarities):
+                rows[row_id] = {**self.snapshot.rows[position], "similarity": float(similarity)}
+        fused = reciprocal_rank_fusion([[row["id"] for row in vector_rows], lexical_ids], self.rrf_k)
+        return [{**rows[row_id], "rrf_score": score} for row_id, score in fused[:match_count]]
+
+    def match(self, query_embedding: List[float], match_threshold: float, match_count: int,
+              category: Optional[str] = None, query_text: Optional[str] = None) -> List[Dict[str, Any]]:
+        vector_rows = self.vector_backend.match(query_embedding, match_threshold,
+                                                max(match_count, self.candidates), category=category)
+        return self._fuse(vector_rows, self._lexical(query_text, category), query_embedding, match_count)
+
+    async def amatch(self, query_embedding: List[float], match_threshold: float, match_count: int,
+                     category: Optional[str] = None, query_text: Optional[str] = None) -> List[Dict[str, Any]]:
+        vector_rows, lexical = await asyncio.gather(
+            self.vector_backend.amatch(query_embedding, match_threshold,
+                                       max(match_count, self.candidates), category=category),
+            asyncio.to_thread(self._lexical, query_text, category),
+        )
+        return self._fuse(vector_rows, lexical, query_embedding, match_count)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def create_backend(name: str, local_index_path: Optional[str] = None, mode: str = "vector",
+                   rrf_k: int = 60, candidates: int = 20, embedding: Optional[EmbeddingSpec] = None):
+    """
+    Crea el backend de búsqueda indicado: "supabase" o "local". Con `mode="hybrid"` lo combina con el
+    índice BM25 del snapshot en `local_index_path`. Con `embedding` (el modelo de las consultas), Supabase
+    consulta el índice registrado de ese modelo y el snapshot local debe ser de ese modelo.
+    """
+    if name == "supabase":
+        backend = SupabaseBackend.for_model(embedding) if embedding is not None else SupabaseBackend()
+    elif name == "local":
+        if not local_index_path:
+            raise ValueError("LOCAL_INDEX_PATH must be set to use the local retrieval backend")
+        backend = LocalBackend.from_path(local_index_path, embedding)
+    else:
+        raise ValueError(f"Backend de búsqueda desconocido: {name}")
+    if mode == "vector":
+        return backend
+    if mode != "hybrid":
+        raise ValueError(f"Modo de búsqueda desconocido: {mode}")
+    if not local_index_path:
+        raise ValueError("LOCAL_INDEX_PATH must be set to use hybrid retrieval")
+    if isinstance(backend, LocalBackend):
+        snapshot = backend.snapshot
+    else:
+        snapshot = load_snapshot(local_index_path, mmap=True)
+        if embedding is not None:
+            check_snapshot_embedding(snapshot, embedding, local_index_path)
+    return HybridBackend(backend, snapshot, rrf_k=rrf_k, candidates=candidates)
+
+
+def get_retrieval_backend():
+    """
+    Backend de búsqueda configurado con RETRIEVAL_BACKEND (por defecto "supabase") y RETRIEVAL_MODE
+    ("vector" o "hybrid"), creado en el primer uso sobre el índice del modelo EMBEDDING_MODEL_NAME /
+    EMBEDDING_MODEL_VERSION.
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_backend(
+                os.getenv("RETRIEVAL_BACKEND", "supabase"),
+                os.getenv("LOCAL_INDEX_PATH"),
+                mode=os.getenv("RETRIEVAL_MODE", "vector"),
+                rrf_k=int(os.getenv("HYBRID_RRF_K", "60")),
+                candidates=int(os.getenv("HYBRID_CANDIDATES", "20")),
+                embedding=EmbeddingSpec.from_env(),
+            )
+        return _backend
+
+
+def set_retrieval_backend(backend) -> None:
+    """Reemplaza el backend de búsqueda del proceso (benchmarks y pruebas sin Supabase)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
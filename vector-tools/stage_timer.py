@@ -0,0 +1,60 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+
+class StageTimer:
+    """Acumula el tiempo y la cantidad de elementos procesados por etapa del pipeline."""
+
+    def __init__(self):
+        self._seconds = defaultdict(float)
+        self._items = defaultdict(int)
+        self._calls = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float, items: int = 0) -> None:
+        """Suma una medición a la etapa indicada."""
+        with self._lock:
+            self._seconds[stage] += seconds
+            self._items[stage] += items
+            self._calls[stage] += 1
+
+    @contextmanager
+    def stage(self, name: str, items: int = 0):
+        """Mide el bloque como parte de la etapa `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start, items)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Devuelve segundos, llamadas y elementos acumulados por etapa."""
+        with self._lock:
+            return {
+                stage: {
+                    "seconds": self._seconds[stage],
+                    "calls": self._calls[stage],
+                    "items": self._items[stage],
+                }
+                for stage in self._seconds
+            }
+
+    def log_summary(self, title: str = "Tiempos por etapa") -> None:
+        """Escribe en el log el resumen de tiempos, de la etapa más lenta a la más rápida."""
+        summary = self.summary()
+        if not summary:
+            return
+        total = sum(s["seconds"] for s in summary.values()) or 1.0
+        logger.info(f"{title}:")
+        for stage, stats in sorted(summary.items(), key=lambda kv: kv[1]["seconds"], reverse=True):
+            rate = f", {stats['items'] / stats['seconds']:.1f} elem/s" if stats["items"] and stats["seconds"] else ""
+            logger.info(
+                f"  {stage:<10} {stats['seconds']:8.2f}s ({100 * stats['seconds'] / total:5.1f}%) "
+                f"- {stats['calls']} llamadas, {stats['items']} elementos{rate}"
+            )
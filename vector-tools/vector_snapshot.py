@@ -0,0 +1,232 @@
+import json
+import logging
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from bm25_index import BM25Index
+
+logger = logging.getLogger(__name__)
+
+# Versión del formato en disco; load_snapshot rechaza snapshots de otra versión
+FORMAT_VERSION = 1
+SUPPORTED_DTYPES = ("float32", "float16", "int8")
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Normaliza cada fila a norma 1, para que el producto punto sea la similitud coseno."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def quantize(matrix: np.ndarray, dtype: str = "float32") -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Convierte una matriz de embeddings normalizados al tipo indicado. Para int8 usa una escala simétrica
+    por fila y devuelve también las escalas (valor real = entero * escala).
+    """
+    if dtype not in SUPPORTED_DTYPES:
+        raise ValueError(f"Tipo de snapshot no soportado: {dtype}")
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if dtype == "float32":
+        return matrix, None
+    if dtype == "float16":
+        return matrix.astype(np.float16), None
+    max_abs = np.abs(matrix).max(axis=1) if len(matrix) else np.zeros(0, dtype=np.float32)
+    scales = np.where(max_abs > 0, max_abs / 127.0, 1.0).astype(np.float32)
+    quantized = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+    return quantized, scales
+
+
+class StringColumn(Sequence):
+    """
+    Columna de textos UTF-8 concatenados en un archivo con sus offsets. Con mmap, cada valor se decodifica
+    recién al accederlo, así que abrir la columna no lee su contenido.
+    """
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self._data = data
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        return bytes(self._data[self._offsets[i]:self._offsets[i + 1]]).decode("utf-8")
+
+    @staticmethod
+    def write(path: str, values: Iterable[str]) -> None:
+        offsets = [0]
+        with open(f"{path}.bin", "wb") as f:
+            for value in values:
+                encoded = value.encode("utf-8")
+                f.write(encoded)
+                offsets.append(offsets[-1] + len(encoded))
+        np.save(f"{path}_offsets.npy", np.asarray(offsets, dtype=np.int64))
+
+    @classmethod
+    def open(cls, path: str, mmap: bool = True) -> "StringColumn":
+        offsets = np.load(f"{path}_offsets.npy", mmap_mode="r" if mmap else None)
+        if os.path.getsize(f"{path}.bin") == 0:
+            data = np.zeros(0, dtype=np.uint8)
+        elif mmap:
+            data = np.memmap(f"{path}.bin", dtype=np.uint8, mode="r")
+        else:
+            data = np.fromfile(f"{path}.bin", dtype=np.uint8)
+        return cls(data, offsets)
+
+
+class SnapshotRows(Sequence):
+    """Vista de las filas del snapshot con el formato de las RPC de Supabase (`id`, `content`, `metadata`)."""
+
+    def __init__(self, ids: np.ndarray, contents: StringColumn, metadatas: StringColumn):
+        self.ids = ids
+        self.contents = contents
+        self.metadatas = metadatas
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return {
+            "id": int(self.ids[i]),
+            "content": self.contents[i],
+            "metadata": json.loads(self.metadatas[i]),
+        }
+
+
+class Snapshot:
+    """Snapshot de la tabla 'documents': embeddings en una matriz contigua ordenada por categoría y columnas de texto."""
+
+    def __init__(self, manifest: Dict[str, Any], embeddings: np.ndarray, scales: Optional[np.ndarray],
+                 rows: SnapshotRows, categories: Dict[str, Tuple[int, int]], bm25: Optional[BM25Index] = None):
+        self.manifest = manifest
+        self.embeddings = embeddings
+        self.scales = scales
+        self.rows = rows
+        self.categories = categories
+        self.bm25 = bm25
+
+
+def write_snapshot(path: str, ids: Sequence[int], contents: Sequence[str], metadatas: Sequence[Dict[str, Any]],
+                   embeddings: np.ndarray, dtype: str = "float32",
+                   extra_manifest: Optional[Dict[str, Any]] = None, bm25: bool = True) -> Dict[str, Any]:
+    """
+    Escribe un snapshot versionado en el directorio `path`:
+
+    - `embeddings.npy` (y `scales.npy` para int8): matriz contigua de embeddings normalizados.
+    - `ids.npy`, `content.bin`/`content_offsets.npy`, `metadata.bin`/`metadata_offsets.npy`: columnas de las filas.
+    - `categories.json`: rango `[inicio, fin)` de filas de cada `metadata.category`.
+    - `bm25*.json`/`bm25_*.npy` (con `bm25`): índice léxico BM25 del contenido, con las mismas filas.
+    - `manifest.json`: versión del formato, cantidad de filas, dimensión, tipo y datos de `extra_manifest`.
+
+    Las filas se ordenan por categoría. El directorio se reemplaza completo al final, de modo que un
+    proceso que lea `path` nunca ve un snapshot a medio escribir.
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    count = len(ids)
+    if not (len(contents) == len(metadatas) == len(embeddings) == count):
+        raise ValueError("ids, contents, metadatas y embeddings deben tener el mismo largo")
+    category_names = [(metadata or {}).get("category") or "" for metadata in metadatas]
+    order = sorted(range(count), key=lambda i: category_names[i])
+
+    categories: Dict[str, List[int]] = {}
+    for position, i in enumerate(order):
+        start, _ = categories.get(category_names[i], (position, position))
+        categories[category_names[i]] = [start, position + 1]
+
+    matrix, scales = quantize(normalize_rows(embeddings[order]) if count else embeddings, dtype)
+    manifest = {
+        **(extra_manifest or {}),
+        "format_version": FORMAT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "count": count,
+        "dim": int(embeddings.shape[1]) if embeddings.ndim == 2 else 0,
+        "dtype": dtype,
+    }
+
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, "embeddings.npy"), matrix)
+    if scales is not None:
+        np.save(os.path.join(tmp_path, "scales.npy"), scales)
+    np.save(os.path.join(tmp_path, "ids.npy"), np.asarray([ids[i] for i in order], dtype=np.int64))
+    StringColumn.write(os.path.join(tmp_path, "content"), (contents[i] for i in order))
+    StringColumn.write(os.path.join(tmp_path, "metadata"),
+                       (json.dumps(metadatas[i] or {}, ensure_ascii=False) for i in order))
+    with open(os.path.join(tmp_path, "categories.json"), "w", encoding="utf-8") as f:
+        json.dump(categories, f, ensure_ascii=False)
+    if bm25:
+        index = BM25Index.build(contents[i] for i in order)
+        index.save(tmp_path)
+        manifest["bm25"] = {"terms": index.params["terms"], "postings": index.params["postings"]}
+    # El manifiesto se escribe al final: un directorio sin manifest.json está incompleto
+    with open(os.path.join(tmp_path, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+
+    old_path = f"{path}.old-{os.getpid()}"
+    if os.path.exists(path):
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    logger.info(f"Snapshot escrito en {path}: {count} chunks, {len(categories)} categorías ({dtype})")
+    return manifest
+
+
+def write_snapshot_rows(path: str, rows: List[Dict[str, Any]], dtype: str = "float32",
+                        extra_manifest: Optional[Dict[str, Any]] = None, bm25: bool = True) -> Dict[str, Any]:
+    """Escribe un snapshot a partir de filas de la tabla 'documents' (`id`, `content`, `metadata`, `embedding`)."""
+    dim = len(rows[0]["embedding"]) if rows else 0
+    return write_snapshot(
+        path,
+        [row.get("id", i) for i, row in enumerate(rows)],
+        [row["content"] for row in rows],
+        [row.get("metadata") or {} for row in rows],
+        np.array([row["embedding"] for row in rows], dtype=np.float32).reshape(len(rows), dim),
+        dtype=dtype,
+        extra_manifest=extra_manifest,
+        bm25=bm25,
+    )
+
+
+def load_snapshot(path: str, mmap: bool = True) -> Snapshot:
+    """
+    Abre un snapshot. Con `mmap` las matrices y columnas se mapean en memoria sin copiarlas, así que abrirlo
+    solo lee el manifiesto y el índice de categorías.
+    """
+    start = time.perf_counter()
+    manifest_path = os.path.join(path, "manifest.json")
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError(f"No existe un snapshot completo en {path}")
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Versión de snapshot no soportada en {path}: {manifest.get('format_version')}")
+
+    mmap_mode = "r" if mmap else None
+    embeddings = np.load(os.path.join(path, "embeddings.npy"), mmap_mode=mmap_mode)
+    scales_path = os.path.join(path, "scales.npy")
+    scales = np.load(scales_path, mmap_mode=mmap_mode) if os.path.exists(scales_path) else None
+    rows = SnapshotRows(
+        np.load(os.path.join(path, "ids.npy"), mmap_mode=mmap_mode),
+        StringColumn.open(os.path.join(path, "content"), mmap),
+        StringColumn.open(os.path.join(path, "metadata"), mmap),
+    )
+    with open(os.path.join(path, "categories.json"), encoding="utf-8") as f:
+        categories = {name: tuple(bounds) for name, bounds in json.load(f).items()}
+    bm25 = BM25Index.load(path, mmap)
+    logger.info(f"Snapshot abierto desde {path} en {(time.perf_counter() - start) * 1000:.1f} ms: "
+                f"{manifest['count']} chunks ({manifest['dtype']}{', BM25' if bm25 else ''})")
+    return Snapshot(manifest, embeddings, scales, rows, categories, bm25)